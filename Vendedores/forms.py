@@ -85,4 +85,94 @@ class ProductoForm(forms.ModelForm):
         fields = [
             'name', 'description', 'category', 'material', 'cantidad_material', 'color',
             'price', 'stock', 'imagen', 'horas', 'experiencia'
-        ]
\ No newline at end of file
+        ]
+
+class ImportarProductosForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo CSV",
+        help_text="Columnas: name, description, category, material, color, stock, price u horas/experiencia, imagen",
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".csv,text/csv"}),
+    )
+    imagenes = forms.FileField(
+        label="Imágenes (ZIP, opcional)",
+        required=False,
+        help_text="La columna imagen del CSV indica el nombre del archivo dentro del ZIP",
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".zip,application/zip"}),
+    )
+
+    def clean_imagenes(self):
+        import zipfile
+        imagenes = self.cleaned_data.get("imagenes")
+        if imagenes and not zipfile.is_zipfile(imagenes):
+            raise forms.ValidationError("El archivo de imágenes no es un ZIP válido.")
+        return imagenes
+
+
+class FilaImportacionForm(forms.Form):
+    """Valida una fila del CSV de importación (mismas reglas que ProductoForm)."""
+
+    name = forms.CharField(max_length=120)
+    description = forms.CharField(required=False)
+    category = forms.CharField(max_length=50, required=False)
+    material = forms.ChoiceField(choices=ProductoForm.MATERIAL_CHOICES)
+    color = forms.CharField(max_length=30, required=False)
+    stock = forms.IntegerField(min_value=0)
+    price = forms.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    horas = forms.IntegerField(min_value=1, required=False)
+    experiencia = forms.ChoiceField(choices=ProductoForm.EXPERIENCE_CHOICES, required=False)
+    imagen = forms.CharField(max_length=255, required=False)
+
+    def validar(self, datos) -> bool:
+        """Valida otra fila con este mismo formulario.
+
+        Crear un formulario por fila copia todos sus campos (deepcopy), que
+        con miles de filas es la mayor parte del tiempo de la importación.
+        """
+        self.data = datos
+        self.is_bound = True
+        self._errors = None
+        return self.is_valid()
+
+    def clean(self):
+        datos = super().clean()
+        if datos.get("price") is None and not datos.get("horas") and not self.has_error("horas"):
+            raise forms.ValidationError("Indica el precio o las horas invertidas para calcularlo.")
+        return datos
+
+
+class AccionMasivaForm(forms.Form):
+    ACCIONES = [
+        ("activar", "Activar"),
+        ("desactivar", "Desactivar"),
+        ("porcentaje", "Ajustar precio (%)"),
+        ("precio", "Fijar precio"),
+        ("eliminar", "Eliminar"),
+    ]
+    ALCANCES = [
+        ("seleccion", "Productos seleccionados"),
+        ("filtro", "Todos los que coinciden con el filtro"),
+    ]
+
+    accion = forms.ChoiceField(choices=ACCIONES)
+    alcance = forms.ChoiceField(choices=ALCANCES, initial="seleccion")
+    # Los ids se acotan a los productos del vendedor en la vista
+    ids = forms.Field(required=False, widget=forms.MultipleHiddenInput)
+    porcentaje = forms.DecimalField(min_value=-99, max_value=1000, decimal_places=2, required=False)
+    precio = forms.DecimalField(min_value=0, max_digits=10, decimal_places=2, required=False)
+
+    def clean_ids(self):
+        try:
+            return [int(i) for i in self.cleaned_data.get("ids") or []]
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Selección inválida.")
+
+    def clean(self):
+        datos = super().clean()
+        accion = datos.get("accion")
+        if datos.get("alcance") == "seleccion" and not datos.get("ids"):
+            raise forms.ValidationError("No seleccionaste ningún producto.")
+        if accion == "porcentaje" and datos.get("porcentaje") is None:
+            self.add_error("porcentaje", "Indica el porcentaje.")
+        if accion == "precio" and datos.get("precio") is None:
+            self.add_error("precio", "Indica el precio.")
+        return datos
@@ -0,0 +1,219 @@
+"""Importación masiva de productos desde un CSV (y un ZIP opcional de imágenes).
+
+El CSV se lee y valida fila a fila, sin cargarlo entero. Las filas válidas
+se insertan con `bulk_create` en lotes de `LOTE`. Las inválidas quedan en
+el reporte de errores con su número de línea y no frenan al resto.
+
+`bulk_create` no pasa por `Product.save` ni por las señales, así que cada
+lote hace a mano lo mismo en bloque: indexa la búsqueda y encola las
+imágenes nuevas en la cola de imágenes. Al terminar se invalidan las
+facetas, el grid y la versión del catálogo. Las estadísticas del vendedor
+las mantienen los triggers (ver productos/services/estadisticas.py).
+"""
+import csv
+import io
+import posixpath
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from PIL import Image
+
+from productos.models import EstadoImagen, Product
+from productos.services import images, precios, search
+from productos.services.acciones import avisar_cambios
+from productos.validators import validar_pixeles
+
+from .forms import FilaImportacionForm
+
+LOTE = 500
+COLUMNAS_REQUERIDAS = ("name", "material", "stock")
+# Tamaño máximo de cada imagen dentro del ZIP
+MAX_BYTES_IMAGEN = 10 * 1024 * 1024
+ERRORES_TIMEOUT = 60 * 60
+
+
+@dataclass
+class ErrorFila:
+    fila: int
+    campo: str
+    error: str
+
+
+@dataclass
+class ResultadoImportacion:
+    creados: int = 0
+    imagenes: int = 0
+    errores: List[ErrorFila] = field(default_factory=list)
+    clave_errores: Optional[str] = None
+
+    @property
+    def filas_con_error(self) -> int:
+        return len({e.fila for e in self.errores})
+
+
+class _ZipImagenes:
+    """Imágenes del ZIP indexadas por nombre de archivo (sin carpetas)."""
+
+    def __init__(self, archivo):
+        self.zip = zipfile.ZipFile(archivo) if archivo else None
+        self.miembros = {}
+        if self.zip:
+            for info in self.zip.infolist():
+                if not info.is_dir():
+                    self.miembros[posixpath.basename(info.filename)] = info
+
+    def abrir(self, nombre: str) -> File:
+        """Archivo de la imagen listo para asignar al campo; ValidationError si no sirve."""
+        info = self.miembros.get(posixpath.basename(nombre))
+        if info is None:
+            raise ValidationError(f"No está en el ZIP de imágenes: {nombre}")
+        if info.file_size > MAX_BYTES_IMAGEN:
+            raise ValidationError(f"La imagen pesa más de {MAX_BYTES_IMAGEN // 2**20} MB: {nombre}")
+        archivo = File(self.zip.open(info), name=posixpath.basename(info.filename))
+        try:
+            with Image.open(archivo) as img:
+                img.verify()
+        except Exception:
+            raise ValidationError(f"No es una imagen válida: {nombre}")
+        archivo.seek(0)
+        validar_pixeles(archivo)
+        return archivo
+
+
+def _errores_de(numero, form) -> List[ErrorFila]:
+    return [
+        ErrorFila(numero, "" if campo == "__all__" else campo, mensaje)
+        for campo, mensajes in form.errors.items()
+        for mensaje in mensajes
+    ]
+
+
+def _producto(seller, datos, precio_sugerido) -> Product:
+    precio, horas, experiencia = datos["price"], None, ""
+    if precio is None:
+        # Se guardan los datos del cálculo para poder recalcularlo después
+        horas, experiencia = datos["horas"], datos["experiencia"] or precios.EXPERIENCIA_POR_DEFECTO
+        precio = precio_sugerido(datos["material"], horas, experiencia)
+    return Product(
+        seller=seller,
+        name=datos["name"],
+        description=datos["description"],
+        category=datos["category"],
+        material=datos["material"],
+        color=datos["color"],
+        price=precio,
+        horas=horas,
+        experiencia=experiencia,
+        stock=datos["stock"],
+        # Lo mismo que la señal pre_save: sin stock no se muestra
+        is_active=datos["stock"] > 0,
+    )
+
+
+def _guardar_lote(productos: List[Product], con_imagen: List[Product]) -> int:
+    """Inserta el lote, lo indexa y encola sus imágenes. Devuelve cuántas encoló."""
+    with transaction.atomic():
+        # Las imágenes nuevas se escriben al guardar (FileField.pre_save)
+        Product.objects.bulk_create(productos)
+        search.indexar_productos(productos)
+        pendientes = [p for p in con_imagen if p.imagen_estado != EstadoImagen.LISTA]
+        images.encolar_imagenes(pendientes, "imagen")
+    return len(pendientes)
+
+
+def importar_csv(seller, archivo, imagenes=None, precio_sugerido=None, lote: int = LOTE) -> ResultadoImportacion:
+    """Importa los productos de `archivo` (CSV subido) para `seller`.
+
+    `precio_sugerido(material, horas, experiencia)` calcula el precio de las
+    filas que no lo traen.
+    """
+    if precio_sugerido is None:
+        precio_sugerido = precios.precio_sugerido
+
+    resultado = ResultadoImportacion()
+    texto = io.TextIOWrapper(archivo.file, encoding="utf-8-sig", newline="")
+    lector = csv.DictReader(texto)
+    visibles = set()
+    try:
+        columnas = [(c or "").strip().lower() for c in (lector.fieldnames or [])]
+        faltantes = [c for c in COLUMNAS_REQUERIDAS if c not in columnas]
+        if faltantes:
+            resultado.errores.append(ErrorFila(1, "", f"Faltan columnas: {', '.join(faltantes)}"))
+        else:
+            lector.fieldnames = columnas
+            _importar_filas(lector, seller, _ZipImagenes(imagenes), precio_sugerido, lote, resultado, visibles)
+    except (UnicodeDecodeError, csv.Error) as e:
+        resultado.errores.append(ErrorFila(lector.line_num, "", f"No se pudo leer el CSV: {e}"))
+    finally:
+        texto.detach()
+
+    if resultado.creados:
+        avisar_cambios(visibles, [seller.pk])
+    if resultado.errores:
+        resultado.clave_errores = guardar_errores(seller, resultado.errores)
+    return resultado
+
+
+def _importar_filas(lector, seller, zip_imagenes, precio_sugerido, lote, resultado, visibles):
+    productos, con_imagen = [], []
+
+    def guardar():
+        if productos:
+            resultado.imagenes += _guardar_lote(productos, con_imagen)
+            resultado.creados += len(productos)
+        productos.clear()
+        con_imagen.clear()
+
+    form = FilaImportacionForm()
+    try:
+        for fila in lector:
+            # Línea del archivo donde termina la fila (la 1 es la cabecera)
+            numero = lector.line_num
+            if not form.validar({k: (v or "").strip() for k, v in fila.items() if k}):
+                resultado.errores.extend(_errores_de(numero, form))
+                continue
+            datos = form.cleaned_data
+            producto = _producto(seller, datos, precio_sugerido)
+            if datos["imagen"]:
+                try:
+                    producto.imagen = zip_imagenes.abrir(datos["imagen"])
+                except ValidationError as e:
+                    resultado.errores.extend(ErrorFila(numero, "imagen", m) for m in e.messages)
+                    continue
+                # Una imagen ya procesada (de otro producto) se reutiliza sin encolar
+                images.reutilizar_procesada(producto, "imagen")
+                con_imagen.append(producto)
+            productos.append(producto)
+            if producto.is_active:
+                visibles.add((producto.material, producto.color))
+            if len(productos) >= lote:
+                guardar()
+    except (UnicodeDecodeError, csv.Error):
+        # Lo leído antes del error de lectura también se guarda
+        guardar()
+        raise
+    guardar()
+
+
+# ────────── reporte de errores ──────────
+
+def _clave_cache(seller, clave):
+    return f"importacion:errores:{seller.pk}:{clave}"
+
+
+def guardar_errores(seller, errores: List[ErrorFila]) -> str:
+    """Guarda el reporte de errores una hora para descargarlo; devuelve su clave."""
+    clave = uuid.uuid4().hex
+    filas = [{"fila": e.fila, "campo": e.campo, "error": e.error} for e in errores]
+    cache.set(_clave_cache(seller, clave), filas, ERRORES_TIMEOUT)
+    return clave
+
+
+def errores_guardados(seller, clave) -> Optional[list]:
+    return cache.get(_clave_cache(seller, clave))
@@ -4,6 +4,9 @@ from . import views
 urlpatterns = [
     path('agregar/', views.agregar_producto, name='agregar_producto'),
     path('mis-productos/', views.mis_productos, name='mis_productos'),
+    path('mis-productos/acciones/', views.acciones_masivas, name='acciones_masivas'),
     path('eliminar/<int:producto_id>/', views.eliminar_producto, name='eliminar_producto'),
     path('editar/<int:producto_id>/', views.editar_producto, name='editar_producto'),
+    path('importar/', views.importar_productos, name='importar_productos'),
+    path('importar/errores/<str:clave>/', views.importar_errores, name='importar_errores'),
 ]
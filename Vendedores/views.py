@@ -1,23 +1,22 @@
+from urllib.parse import urlencode
+
+from django.contrib import messages
+from django.http import Http404
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from .forms import ProductoForm
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from .forms import AccionMasivaForm, ImportarProductosForm, ProductoForm
 from productos.models import Product
+from productos.services import acciones
+from productos.services.estadisticas import estadisticas_de
+from productos.services.paginacion import KeysetPaginator
+from productos.services.precios import precio_sugerido
+from productos.services.search import buscar_productos
 
 def calcular_precio_sugerido(material, horas, experiencia):
-    base = 1000
-    material_factor = {
-        'algodon': 1.0,
-        'lana': 1.2,
-        'cuero': 1.5,
-    }
-    experiencia_factor = {
-        'principiante': 1.0,
-        'intermedio': 1.2,
-        'experto': 1.5,
-    }
-    precio = base * material_factor.get(material, 1) * experiencia_factor.get(experiencia, 1) + (horas * 500)
-    return round(precio, 2)
+    """Precio sugerido con los factores de la tabla (ver productos/services/precios.py)."""
+    return precio_sugerido(material, horas, experiencia)
 
 @login_required
 def agregar_producto(request):
@@ -37,17 +36,20 @@ def agregar_producto(request):
         form = ProductoForm()
     return render(request, "forms/agregar_productos.html", {"form": form})
 
-@login_required
-def mis_productos(request):
-    productos = Product.objects.filter(seller=request.user)
+FILTROS_MIS_PRODUCTOS = ("search", "estado", "precio_min", "precio_max")
+
+
+def _filtrar_mis_productos(user, params):
+    """Productos de `user` con los filtros del listado (los mismos para las acciones masivas)."""
+    productos = Product.objects.filter(seller=user)
     
     # Búsqueda por nombre
-    search_query = request.GET.get('search', '')
+    search_query = params.get('search', '')
     if search_query:
-        productos = productos.filter(name__icontains=search_query)
+        productos = buscar_productos(productos, search_query, campos=("name",))
     
     # Filtro por estado
-    estado_filter = request.GET.get('estado', '')
+    estado_filter = params.get('estado', '')
     if estado_filter == 'activo':
         productos = productos.filter(is_active=True, stock__gt=0)
     elif estado_filter == 'inactivo':
@@ -56,33 +58,41 @@ def mis_productos(request):
         productos = productos.filter(stock=0)
     
     # Filtro por rango de precio
-    precio_min = request.GET.get('precio_min', '')
-    precio_max = request.GET.get('precio_max', '')
+    precio_min = params.get('precio_min', '')
+    precio_max = params.get('precio_max', '')
     if precio_min:
         productos = productos.filter(price__gte=precio_min)
     if precio_max:
         productos = productos.filter(price__lte=precio_max)
+    return productos
+
+@login_required
+def mis_productos(request):
+    productos = _filtrar_mis_productos(request.user, request.GET)
+    search_query = request.GET.get('search', '')
+    estado_filter = request.GET.get('estado', '')
+    precio_min = request.GET.get('precio_min', '')
+    precio_max = request.GET.get('precio_max', '')
     
     # Ordenamiento
     orden = request.GET.get('orden', '-created_at')
-    if orden in ['-created_at', 'created_at', '-price', 'price', '-stock', 'stock', 'name']:
-        productos = productos.order_by(orden)
+    if orden not in ['-created_at', 'created_at', '-price', 'price', '-stock', 'stock', 'name']:
+        orden = '-created_at'
     
-    # Paginación
-    paginator = Paginator(productos, 15)  # 15 productos por página
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginación por cursor sobre (orden, id)
+    paginator = KeysetPaginator(productos, 15, ordering=[orden])
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
-    total_productos = Product.objects.filter(seller=request.user).count()
-    productos_activos = Product.objects.filter(seller=request.user, is_active=True, stock__gt=0).count()
-    valor_inventario = sum([p.price * p.stock for p in Product.objects.filter(seller=request.user)])
+    # Totales del encabezado: una fila por vendedor, mantenida al escribir productos
+    estadisticas = estadisticas_de(request.user)
     
     return render(request, "manejoProductos/mis_productos.html", {
         "page_obj": page_obj,
         "productos": page_obj,
-        "total_productos": total_productos,
-        "productos_activos": productos_activos,
-        "valor_inventario": valor_inventario,
+        "total_productos": estadisticas.productos,
+        "productos_activos": estadisticas.activos,
+        "productos_sin_stock": estadisticas.sin_stock,
+        "valor_inventario": estadisticas.valor_inventario,
         "search_query": search_query,
         "estado_filter": estado_filter,
         "precio_min": precio_min,
@@ -90,6 +100,48 @@ def mis_productos(request):
         "orden": orden,
     })
 
+@login_required
+@require_POST
+def acciones_masivas(request):
+    """Activa, desactiva, cambia el precio o elimina varios productos a la vez.
+
+    Actúa sobre los ids elegidos o sobre todo lo que coincide con el filtro
+    del listado, siempre dentro de los productos del vendedor, con un solo
+    UPDATE/DELETE (ver productos/services/acciones.py).
+    """
+    filtros = {k: request.POST[k] for k in FILTROS_MIS_PRODUCTOS if request.POST.get(k)}
+    # El orden no filtra, pero el listado vuelve tal como estaba
+    listado = dict(filtros, orden=request.POST["orden"]) if request.POST.get("orden") else filtros
+    volver = reverse("mis_productos") + (f"?{urlencode(listado)}" if listado else "")
+    form = AccionMasivaForm(request.POST)
+    if not form.is_valid():
+        for errores in form.errors.values():
+            messages.error(request, errores[0])
+        return redirect(volver)
+
+    datos = form.cleaned_data
+    if datos["alcance"] == "filtro":
+        productos = _filtrar_mis_productos(request.user, filtros)
+    else:
+        productos = Product.objects.filter(seller=request.user, pk__in=datos["ids"])
+
+    accion = datos["accion"]
+    if accion == "activar":
+        activados, sin_stock = acciones.activar(productos)
+        mensaje = f"{activados} producto(s) activado(s)."
+        if sin_stock:
+            mensaje += f" {sin_stock} sin stock quedaron inactivos."
+    elif accion == "desactivar":
+        mensaje = f"{acciones.desactivar(productos)} producto(s) desactivado(s)."
+    elif accion == "porcentaje":
+        mensaje = f"Precio ajustado en {acciones.cambiar_precio(productos, porcentaje=datos['porcentaje'])} producto(s)."
+    elif accion == "precio":
+        mensaje = f"Precio cambiado en {acciones.cambiar_precio(productos, precio=datos['precio'])} producto(s)."
+    else:
+        mensaje = f"{acciones.eliminar(productos)} producto(s) eliminado(s)."
+    messages.success(request, mensaje)
+    return redirect(volver)
+
 @login_required
 def eliminar_producto(request, producto_id):
     producto = get_object_or_404(Product, id=producto_id, seller=request.user)
@@ -115,3 +167,40 @@ def editar_producto(request, producto_id):
     else:
         form = ProductoForm(instance=producto)
     return render(request, "forms/editar_producto.html", {"form": form, "producto": producto})
+
+
+@login_required
+def importar_productos(request):
+    """Carga masiva desde un CSV (y un ZIP opcional con las imágenes)."""
+    from .importacion import importar_csv
+    resultado = None
+    if request.method == "POST":
+        form = ImportarProductosForm(request.POST, request.FILES)
+        if form.is_valid():
+            resultado = importar_csv(
+                request.user,
+                form.cleaned_data["archivo"],
+                form.cleaned_data.get("imagenes"),
+                precio_sugerido=calcular_precio_sugerido,
+            )
+            form = ImportarProductosForm()
+    else:
+        form = ImportarProductosForm()
+    return render(request, "forms/importar_productos.html", {
+        "form": form,
+        "resultado": resultado,
+        "errores": resultado.errores[:100] if resultado else [],
+    })
+
+
+@login_required
+def importar_errores(request, clave):
+    """Descarga en CSV el reporte de errores de una importación."""
+    from productos.services.exportacion import respuesta_reporte
+    from productos.services.reporting import CsvReportGenerator
+    from .importacion import errores_guardados
+    filas = errores_guardados(request.user, clave)
+    if filas is None:
+        raise Http404("El reporte de errores ya no está disponible.")
+    generator = CsvReportGenerator(columns=("fila", "campo", "error"))
+    return respuesta_reporte(generator, filas, "errores_importacion.csv")
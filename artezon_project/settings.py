@@ -92,6 +92,8 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "productos.context_processors.get_random_quote",
+                "productos.context_processors.resumen_carrito",
+                "productos.context_processors.resumen_favoritos",
             ],
         },
     },
@@ -112,6 +114,25 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# En producción, con varios procesos, usar un backend compartido (Redis/Memcached)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'artezon',
+    }
+}
+
+# Segundos que viven los conteos de facetas del catálogo (se ajustan por señales)
+FACETAS_TIMEOUT = 60 * 60
+
+# Segundos que vive la grilla renderizada de `home` (se invalida por señales;
+# el tope solo acota la etiqueta "Nuevo", que depende de la fecha)
+GRID_CACHE_TIMEOUT = 60 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -162,6 +183,42 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'productos' / 'media'
 
+# Media por contenido: cada imagen se guarda una sola vez (ver productos/storage.py)
+STORAGES = {
+    "default": {"BACKEND": "productos.storage.ContentHashStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# Sesiones: "db", "cached_db" (caché + tabla; requiere una caché compartida
+# entre procesos, no LocMem) o "signed_cookies" (todo en la cookie, sin
+# escrituras en la base). La sesión solo guarda ids pequeños (carrito,
+# favoritos); en todos los modos se escribe solo si cambió.
+SESSION_MODO = os.environ.get("ARTEZON_SESSION_MODO", "db")
+SESSION_ENGINE = f"productos.sesiones.{SESSION_MODO}"
+
+# Las subidas van siempre a un archivo temporal, nunca enteras a memoria
+FILE_UPLOAD_HANDLERS = ["django.core.files.uploadhandler.TemporaryFileUploadHandler"]
+
+# Presupuesto de píxeles por imagen subida (50 MP)
+IMAGEN_MAX_PIXELES = 50_000_000
+# Minutos tras los que una imagen 'procesando' se da por abandonada (worker caído) y se retoma
+IMAGENES_MINUTOS_PROCESANDO = 10
+
+# Productos con este stock o menos cuentan como "poco stock" en los reportes agregados
+STOCK_BAJO = 5
+
+# Precio sugerido: PRECIO_BASE x factor de material x factor de experiencia
+# + PRECIO_HORA por hora de trabajo. Los factores están en FactorPrecio
+PRECIO_BASE = 1000
+PRECIO_HORA = 500
+
+# Minutos que el stock queda apartado al comprar (ver services/inventario.py)
+RESERVA_STOCK_MINUTOS = 15
+
+# SQLite en modo WAL: las lecturas no bloquean las compras concurrentes.
+# Queda guardado en el archivo de la base, por eso se activa explícitamente
+SQLITE_WAL = os.environ.get("ARTEZON_SQLITE_WAL") == "1"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -169,8 +226,24 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 WHATSAPP_NUMBER = "573205306403"
 
+# Frases de la barra de navegación: un hilo las refresca cada
+# QUOTES_REFRESH_SECONDS. Con QUOTES_API_URL = None solo se usa el corpus local.
+QUOTES_API_URL = "http://api.quotable.io/quotes/random?maxLength=50"
+QUOTES_REFRESH_SECONDS = 600
+
 REPORT_IMPL = "pdf"
 
+# Reportes generados en segundo plano (privados: no se sirven como media)
+REPORTES_ROOT = BASE_DIR / "reportes"
+# Días que se guarda un reporte generado antes de que `procesar_reportes --purgar` lo borre
+REPORTES_DIAS = 7
+# Reportes que cada usuario puede tener esperando al worker (más: 429)
+REPORTES_MAX_EN_COLA = 3
+# Minutos tras los que un reporte 'procesando' se da por abandonado (worker caído) y se retoma
+REPORTES_MINUTOS_PROCESANDO = 30
+# Procesos para dibujar los PDF grandes (1 = en el mismo proceso)
+REPORT_PDF_WORKERS = int(os.environ.get("ARTEZON_PDF_WORKERS", "1"))
+
 # Email Configuration (Development - Console Backend)
 # Para producción, cambiar a SMTP real
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import FactorPrecio
+
+
+@admin.register(FactorPrecio)
+class FactorPrecioAdmin(admin.ModelAdmin):
+    list_display = ("tipo", "clave", "factor")
+    list_filter = ("tipo",)
+    list_editable = ("factor",)
@@ -1,20 +1,21 @@
-import time
-import requests
+from .services import favoritos
+from .services.carrito import CLAVE_SESION, Carrito
+from .services.quotes import obtener_pool
 
-def random_quote():
-    try:
-        response = requests.get("http://api.quotable.io/quotes/random?maxLength=50", timeout=4)
-        response.raise_for_status()
-        return response.json()[0]["content"]
-    except:
-        return None
 
 def get_random_quote(request):
-    last_time = request.session.get("quote_time")
-    now = int(time.time())
+    """Frase del pool del proceso: sin red ni escrituras de sesión en el request."""
+    return {"quote": obtener_pool().cita_actual()}
 
-    if not last_time or now - last_time > 600:
-        request.session["quote"] = random_quote()
-        request.session["quote_time"] = now
 
-    return {"quote": request.session.get("quote")}
+def resumen_carrito(request):
+    """Cantidad de productos en el carrito, leída de la caché (sin revalidar)."""
+    if not hasattr(request, "session") or CLAVE_SESION not in request.session:
+        return {"carrito_cantidad": 0}
+    return {"carrito_cantidad": len(Carrito(request))}
+
+
+def resumen_favoritos(request):
+    if not hasattr(request, "session"):
+        return {"favoritos_cantidad": 0}
+    return {"favoritos_cantidad": favoritos.cantidad(request)}
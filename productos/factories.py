@@ -1,29 +1,43 @@
 from django.conf import settings
-from .services.reporting import CsvReportGenerator, JsonReportGenerator, ReportGenerator
+from .services.reporting import CsvReportGenerator, JsonReportGenerator, NdjsonReportGenerator, ReportGenerator
 
+FORMATOS = ("csv", "json", "ndjson", "excel", "pdf")
 
-def get_report_generator() -> ReportGenerator:
-    """Devuelve una implementación de ReportGenerator según `settings.REPORT_IMPL`.
 
-    Soporta por defecto 'csv' y 'json'. Para 'excel' y 'pdf' hace importaciones
-    perezosas y lanza un error claro si falta la dependencia (por ejemplo `openpyxl`).
+def formato_reporte(impl: str = None) -> str:
+    """Formato pedido si es conocido; si no, el de `settings.REPORT_IMPL` (o 'csv')."""
+    impl = (impl or "").lower()
+    if impl not in FORMATOS:
+        impl = (getattr(settings, "REPORT_IMPL", "csv") or "csv").lower()
+    return impl if impl in FORMATOS else "csv"
+
+
+def get_report_generator(impl: str = None, columns=None, title: str = None) -> ReportGenerator:
+    """Devuelve una implementación de ReportGenerator según `impl` o `settings.REPORT_IMPL`.
+
+    `columns` y `title` sirven para reportes que no son de productos (por
+    ejemplo los agregados): CSV, Excel y PDF muestran esas columnas.
+
+    Soporta por defecto 'csv', 'json' y 'ndjson'. Para 'excel' y 'pdf' hace importaciones
+    perezosas y lanza un error claro si falta la dependencia (por ejemplo `reportlab`).
     """
-    impl = getattr(settings, "REPORT_IMPL", "csv") or "csv"
-    impl = impl.lower()
+    impl = formato_reporte(impl)
+
+    opciones = {"columns": columns} if columns else {}
 
     if impl == "json":
         return JsonReportGenerator()
 
+    if impl == "ndjson":
+        return NdjsonReportGenerator()
+
     if impl == "excel":
         # importación perezosa: solo si el usuario pidió excel
         try:
             from .services.reporting_excel import ExcelReportGenerator
         except Exception as e:  # ImportError u otros
-            raise RuntimeError(
-                "No se pudo cargar el generador Excel. Instala 'openpyxl' y vuelve a intentar. "
-                f"Detalle: {e}"
-            )
-        return ExcelReportGenerator()
+            raise RuntimeError(f"No se pudo cargar el generador Excel. Detalle: {e}")
+        return ExcelReportGenerator(**opciones)
 
     if impl == "pdf":
         try:
@@ -33,7 +47,9 @@ def get_report_generator() -> ReportGenerator:
                 "No se pudo cargar el generador PDF. Instala 'reportlab' y vuelve a intentar. "
                 f"Detalle: {e}"
             )
-        return PDFReportGenerator()
+        if title:
+            opciones["title"] = title
+        return PDFReportGenerator(workers=getattr(settings, "REPORT_PDF_WORKERS", 1), **opciones)
 
     # por defecto -> csv
-    return CsvReportGenerator()
+    return CsvReportGenerator(**opciones)
@@ -0,0 +1,30 @@
+"""Utilidades compartidas por los comandos `bench_*`.
+
+Los benchmarks corren sobre una base de datos de prueba desechable (la misma
+que crea `manage.py test`), nunca sobre db.sqlite3.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def base_de_datos_temporal(en_archivo=False):
+    """Crea la base de prueba y la destruye al salir.
+
+    Con `en_archivo` la base SQLite va a un archivo temporal en lugar de a
+    memoria, para que varios hilos la compartan como en producción.
+    """
+    nombre_original = connection.settings_dict["NAME"]
+    test = connection.settings_dict.setdefault("TEST", {})
+    nombre_test = test.get("NAME")
+    if en_archivo:
+        test["NAME"] = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        test["NAME"] = nombre_test
@@ -0,0 +1,83 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from productos.models import Product
+from productos.services import search
+
+from ._bench import base_de_datos_temporal
+
+NOMBRES = ["Bufanda", "Gorro", "Cojín", "Bolso", "Cinturón", "Monedero", "Cárdigan", "Manta", "Tapete", "Guantes"]
+MATERIALES = ["algodón", "lana", "cuero", "acrílico", "fique", "seda"]
+COLORES = ["rojo", "beige", "verde", "azul", "negro", "café", "rosado"]
+CONSULTAS = ["algodon", "bufanda roja", "cuero", "cardigan lana", "monedero fique tejido"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la búsqueda FTS5 contra el filtro icontains sobre un catálogo sintético "
+        "en una base de datos temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--productos", type=int, default=100_000)
+        parser.add_argument("--repeticiones", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options["seed"])
+        with base_de_datos_temporal():
+            seller = User.objects.create(username="bench")
+            self._poblar(seller, options["productos"], rnd)
+            # bulk_create no dispara señales: se indexa todo de una vez
+            search.reconstruir_indice()
+
+            base = Product.objects.all()
+            self.stdout.write(
+                f"{'consulta':<24}{'icontains (ms)':>16}{'filas':>8}{'fts (ms)':>12}{'filas':>8}"
+            )
+            for consulta in CONSULTAS:
+                t_like, n_like = self._medir(
+                    lambda: base.filter(Q(name__icontains=consulta) | Q(description__icontains=consulta)),
+                    options["repeticiones"],
+                )
+                t_fts, n_fts = self._medir(
+                    lambda: search.buscar_productos(base, consulta), options["repeticiones"]
+                )
+                self.stdout.write(f"{consulta:<24}{t_like:>16.1f}{n_like:>8}{t_fts:>12.1f}{n_fts:>8}")
+
+    def _poblar(self, seller, total, rnd):
+        lote = []
+        for i in range(total):
+            nombre = rnd.choice(NOMBRES)
+            material = rnd.choice(MATERIALES)
+            color = rnd.choice(COLORES)
+            lote.append(Product(
+                seller=seller,
+                name=f"{nombre} {color} #{i}",
+                description=f"{nombre} tejida a mano en {material}, color {color}.",
+                category="Accesorios",
+                material=material,
+                color=color,
+                price=rnd.randint(10, 300) * 1000,
+                stock=rnd.randint(0, 20),
+            ))
+            if len(lote) == 5000:
+                Product.objects.bulk_create(lote)
+                lote = []
+        if lote:
+            Product.objects.bulk_create(lote)
+
+    def _medir(self, construir_qs, repeticiones):
+        """ms promedio de lo que hace `home`: COUNT del paginador + página de 20."""
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            qs = construir_qs()
+            total = qs.count()
+            list(qs[:20])
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return sum(tiempos) / len(tiempos), total
@@ -0,0 +1,91 @@
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from productos.factories import get_report_generator
+from productos.models import Product
+from productos.services.agregados import AGRUPACIONES, filas_agregadas
+from productos.services.exportacion import filas_productos
+
+from ._bench import base_de_datos_temporal
+
+FORMATOS = ("csv", "json", "ndjson", "excel")
+
+
+class Command(BaseCommand):
+    help = (
+        "Memoria pico (tracemalloc) y tiempo de la exportación de productos: lista completa + "
+        "archivo completo (como antes) contra streaming, por tamaño de catálogo. También el "
+        "tiempo de los reportes agregados (GROUP BY en la base)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tamanos", default="1000,10000,100000",
+            help="Cantidades de productos separadas por coma (p. ej. 1000,100000,1000000).",
+        )
+        parser.add_argument("--sin-anterior", action="store_true", help="Medir solo el streaming.")
+
+    def handle(self, *args, **options):
+        tamanos = sorted(int(t) for t in options["tamanos"].split(","))
+        with base_de_datos_temporal():
+            seller = User.objects.create(username="bench")
+            self.stdout.write(
+                f"{'productos':>10}  {'formato':<10}{'modo':<12}{'pico (MB)':>10}{'tiempo (s)':>12}{'MB salida':>11}"
+            )
+            creados = 0
+            for tamano in tamanos:
+                creados = self._completar(seller, creados, tamano)
+                for formato in FORMATOS:
+                    modos = ("streaming",) if options["sin_anterior"] else ("anterior", "streaming")
+                    for modo in modos:
+                        pico, segundos, total = self._medir(formato, modo)
+                        self.stdout.write(
+                            f"{tamano:>10}  {formato:<10}{modo:<12}{pico / 2**20:>10.1f}"
+                            f"{segundos:>12.2f}{total / 2**20:>11.1f}"
+                        )
+                for agrupacion in AGRUPACIONES:
+                    pico, segundos, total = self._medir_agregado(agrupacion)
+                    self.stdout.write(
+                        f"{tamano:>10}  {agrupacion:<10}{'agregado':<12}{pico / 2**20:>10.1f}"
+                        f"{segundos:>12.2f}{f'{total} grupos':>11}"
+                    )
+
+    def _completar(self, seller, creados, tamano):
+        lote = 5000
+        descripcion = "Tejido a mano en telar, lana de oveja, tintes naturales. " * 3
+        while creados < tamano:
+            n = min(lote, tamano - creados)
+            Product.objects.bulk_create([
+                Product(
+                    seller=seller, name=f"Ruana {creados + i}", price=90000 + i, stock=i % 20,
+                    description=descripcion, category="Ropa", material="Lana", color="Gris",
+                )
+                for i in range(n)
+            ])
+            creados += n
+        return creados
+
+    def _medir(self, formato, modo):
+        generator = get_report_generator(formato)
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        if modo == "anterior":
+            total = len(generator.generate(list(filas_productos())))
+        else:
+            total = sum(len(pedazo) for pedazo in generator.stream(filas_productos()))
+        segundos = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return pico, segundos, total
+
+    def _medir_agregado(self, agrupacion):
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        grupos = len(list(filas_agregadas(agrupacion)))
+        segundos = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return pico, segundos, grupos
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+TAMANOS_MP = (2, 12, 24, 48)
+MAX_SIZE = (1200, 1200)
+
+
+def _crear_jpeg(ruta, megapixeles):
+    from PIL import Image
+
+    ancho = int((megapixeles * 1_000_000 * 4 / 3) ** 0.5)
+    alto = megapixeles * 1_000_000 // ancho
+    canal = Image.linear_gradient("L")
+    img = Image.merge("RGB", (
+        canal.resize((ancho, alto)),
+        canal.rotate(90).resize((ancho, alto)),
+        canal.transpose(Image.Transpose.FLIP_LEFT_RIGHT).resize((ancho, alto)),
+    ))
+    img.save(ruta, format="JPEG", quality=90)
+    return ancho, alto
+
+
+def _memoria_mb(campo):
+    # VmHWM es el pico de RSS del proceso; a diferencia de ru_maxrss no se
+    # hereda del padre a través de fork/exec
+    with open("/proc/self/status") as status:
+        for linea in status:
+            if linea.startswith(campo + ":"):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+def _medir(ruta, modo, cola):
+    """Corre en un proceso nuevo para que el pico de RSS sea solo de esta imagen."""
+    import time
+
+    import django
+    django.setup()
+    from PIL import Image
+    from productos.services.images import comprimir_imagen
+
+    base = _memoria_mb("VmHWM")
+    inicio = time.perf_counter()
+    with open(ruta, "rb") as archivo:
+        if modo == "reducido":
+            comprimir_imagen(archivo, MAX_SIZE)
+        else:
+            # Camino anterior: convertir (decodifica todo) y después reducir
+            img = Image.open(archivo).convert("RGB")
+            img.thumbnail(MAX_SIZE, Image.Resampling.LANCZOS)
+    ms = (time.perf_counter() - inicio) * 1000
+    cola.put((ms, base, _memoria_mb("VmHWM")))
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia y pico de RSS al comprimir JPEGs de distintos megapíxeles, "
+        "decodificando completo contra con draft (reducido). Solo Linux (lee /proc)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--megapixeles", type=int, nargs="+", default=list(TAMANOS_MP))
+
+    def handle(self, *args, **options):
+        contexto = multiprocessing.get_context("spawn")
+        self.stdout.write(
+            f"{'MP':>4}{'MB archivo':>12}{'modo':>10}{'ms':>10}{'RSS pico (MB)':>15}{'sobre base (MB)':>17}"
+        )
+        with tempfile.TemporaryDirectory() as carpeta:
+            for mp in options["megapixeles"]:
+                ruta = os.path.join(carpeta, f"{mp}mp.jpg")
+                _crear_jpeg(ruta, mp)
+                peso = os.path.getsize(ruta) / 1024 / 1024
+                for modo in ("completo", "reducido"):
+                    cola = contexto.Queue()
+                    proceso = contexto.Process(target=_medir, args=(ruta, modo, cola))
+                    proceso.start()
+                    ms, base, pico = cola.get()
+                    proceso.join()
+                    self.stdout.write(
+                        f"{mp:>4}{peso:>12.1f}{modo:>10}{ms:>10.0f}{pico:>15.0f}{pico - base:>17.0f}"
+                    )
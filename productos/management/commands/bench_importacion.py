@@ -0,0 +1,37 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+
+from productos.models import Product
+from Vendedores.importacion import importar_csv
+
+from ._bench import base_de_datos_temporal
+
+
+class Command(BaseCommand):
+    help = "Tiempo de la importación masiva de productos desde CSV (validación + bulk_create por lotes)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=10000, help="Filas del CSV.")
+        parser.add_argument("--lote", type=int, default=500, help="Filas por bulk_create.")
+
+    def handle(self, *args, **options):
+        descripcion = "Tejido a mano en telar, lana de oveja, tintes naturales."
+        lineas = ["name,description,category,material,color,stock,horas,experiencia"]
+        for i in range(options["filas"]):
+            lineas.append(f"Ruana {i},\"{descripcion}\",Ropa,lana,Gris,{i % 20},{1 + i % 30},intermedio")
+        contenido = ("\n".join(lineas) + "\n").encode("utf-8")
+
+        with base_de_datos_temporal():
+            seller = User.objects.create(username="bench")
+            archivo = SimpleUploadedFile("productos.csv", contenido, content_type="text/csv")
+            inicio = time.perf_counter()
+            resultado = importar_csv(seller, archivo, lote=options["lote"])
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(
+                f"{resultado.creados} productos importados en {segundos:.2f} s "
+                f"({resultado.creados / segundos:.0f} filas/s), {len(resultado.errores)} errores, "
+                f"{Product.objects.count()} en la base"
+            )
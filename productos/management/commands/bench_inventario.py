@@ -0,0 +1,124 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test import override_settings
+
+from productos.models import Cart, Product, StockReservation
+from productos.services import inventario
+
+from ._bench import base_de_datos_temporal
+
+
+class Command(BaseCommand):
+    help = (
+        "Compradores concurrentes peleando por el mismo stock: verifica que no se venda "
+        "de más y mide intentos de compra por segundo con SQLite en modo WAL y en modo DELETE. "
+        "Usa una base SQLite temporal en archivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=8)
+        parser.add_argument("--compradores", type=int, default=400)
+        parser.add_argument("--stock", type=int, default=150)
+        parser.add_argument("--productos", type=int, default=5, help="Productos por carrito.")
+        parser.add_argument("--lectores", type=int, default=4, help="Hilos que leen el catálogo a la vez.")
+
+    def handle(self, *args, **options):
+        with base_de_datos_temporal(en_archivo=True):
+            seller = User.objects.create(username="bench")
+            self.stdout.write(
+                f"{'modo':<8}{'compras':>9}{'rechazos':>10}{'bloqueos':>10}{'vendido':>9}"
+                f"{'stock':>7}{'intentos/s':>12}{'p99 (ms)':>10}{'lecturas/s':>12}"
+            )
+            for modo in ("wal", "delete"):
+                productos = [
+                    Product.objects.create(seller=seller, name=f"Ruana {modo} {i}", price=90000, stock=options["stock"])
+                    for i in range(options["productos"])
+                ]
+                carritos = [Cart.objects.create().pk for _ in range(options["compradores"])]
+                with connection.cursor() as cursor:
+                    cursor.execute(f"PRAGMA journal_mode={modo.upper()}")
+                with override_settings(SQLITE_WAL=modo == "wal"):
+                    resultado = self._carga(productos, carritos, options["hilos"], options["lectores"])
+                self._verificar(modo, productos, options["stock"], resultado)
+
+    def _carga(self, productos, carritos, hilos, lectores):
+        resultado = {"compras": 0, "rechazos": 0, "bloqueos": 0, "latencias": [], "lecturas": 0}
+        terminado = threading.Event()
+        lock = threading.Lock()
+        ids = [p.pk for p in productos]
+
+        def comprar(cart_id):
+            # Cada comprador pide 1 unidad de cada producto, como un carrito real
+            inicio = time.perf_counter()
+            try:
+                inventario.reservar(cart_id, {pid: 1 for pid in ids})
+                clave = "compras"
+            except inventario.StockInsuficiente:
+                clave = "rechazos"
+            except OperationalError:
+                clave = "bloqueos"
+            with lock:
+                resultado[clave] += 1
+                resultado["latencias"].append((time.perf_counter() - inicio) * 1000)
+
+        def trabajador(lote):
+            try:
+                for cart_id in lote:
+                    comprar(cart_id)
+            finally:
+                connection.close()
+
+        def lector(_):
+            # Lo que hace `revalidar` al mostrar carritos mientras otros compran
+            lecturas = 0
+            try:
+                while not terminado.is_set():
+                    try:
+                        list(Product.objects.filter(pk__in=ids).values_list("stock", "is_active"))
+                        lecturas += 1
+                    except OperationalError:
+                        pass
+            finally:
+                connection.close()
+            with lock:
+                resultado["lecturas"] += lecturas
+
+        lotes = [carritos[i::hilos] for i in range(hilos)]
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos + lectores) as pool:
+            leyendo = [pool.submit(lector, i) for i in range(lectores)]
+            list(pool.map(trabajador, lotes))
+            terminado.set()
+            for futuro in leyendo:
+                futuro.result()
+        resultado["segundos"] = time.perf_counter() - inicio
+        return resultado
+
+    def _verificar(self, modo, productos, stock_inicial, resultado):
+        vendido = 0
+        for producto in productos:
+            producto.refresh_from_db()
+            reservado = sum(
+                StockReservation.objects.filter(product=producto).values_list("cantidad", flat=True)
+            )
+            if producto.stock < 0 or producto.stock + reservado != stock_inicial:
+                raise CommandError(f"{modo}: stock inconsistente en {producto.name}")
+            if reservado > stock_inicial:
+                raise CommandError(f"{modo}: se vendieron {reservado} de {stock_inicial}")
+            if producto.stock == 0 and producto.is_active:
+                raise CommandError(f"{modo}: {producto.name} sin stock sigue activo")
+            vendido = max(vendido, reservado)
+        latencias = sorted(resultado["latencias"])
+        p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))]
+        if resultado["compras"] != vendido:
+            raise CommandError(f"{modo}: {resultado['compras']} compras pero {vendido} unidades reservadas")
+        self.stdout.write(
+            f"{modo:<8}{resultado['compras']:>9}{resultado['rechazos']:>10}{resultado['bloqueos']:>10}"
+            f"{vendido:>9}{producto.stock:>7}{len(latencias) / resultado['segundos']:>12.1f}{p99:>10.1f}"
+            f"{resultado['lecturas'] / resultado['segundos']:>12.1f}"
+        )
@@ -0,0 +1,36 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from productos.services.reporting_pdf import PDFReportGenerator
+
+
+class Command(BaseCommand):
+    help = "Tiempo de generar el reporte PDF según la cantidad de procesos (workers)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=20000, help="Productos del reporte.")
+        parser.add_argument("--workers", default="1,2,4", help="Cantidades de procesos separadas por coma.")
+
+    def handle(self, *args, **options):
+        ahora = timezone.now()
+        descripcion = "Tejido a mano en telar, lana de oveja, tintes naturales. " * 3
+        filas = [
+            {
+                "name": f"Ruana {i}", "price": 90000 + i, "description": descripcion,
+                "category": "Ropa", "material": "Lana", "color": "Gris", "stock": i % 20,
+                "created_at": ahora, "seller_username": "bench",
+            }
+            for i in range(options["filas"])
+        ]
+        self.stdout.write(f"CPUs: {os.cpu_count()}  filas: {len(filas)}")
+        self.stdout.write(f"{'workers':>8}{'páginas':>9}{'tiempo (s)':>12}{'MB':>8}")
+        for workers in (int(w) for w in options["workers"].split(",")):
+            generator = PDFReportGenerator(workers=workers)
+            inicio = time.perf_counter()
+            contenido = generator.generate(filas)
+            segundos = time.perf_counter() - inicio
+            paginas = contenido.count(b"/Type /Page\n")
+            self.stdout.write(f"{workers:>8}{paginas:>9}{segundos:>12.2f}{len(contenido) / 2**20:>8.1f}")
@@ -0,0 +1,56 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from productos.models import FactorPrecio, Product, TipoFactor
+from productos.services import precios
+
+from ._bench import base_de_datos_temporal
+
+
+class Command(BaseCommand):
+    help = (
+        "Tiempo del recálculo masivo de precios sugeridos (simulación y aplicado) contra "
+        "guardar producto por producto, tras subir el factor de un material."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--productos", type=int, default=20000)
+        parser.add_argument("--uno-a-uno", type=int, default=1000, help="Productos a guardar de a uno para comparar.")
+
+    def handle(self, *args, **options):
+        with base_de_datos_temporal():
+            seller = User.objects.create(username="bench")
+            materiales = ("algodon", "lana", "cuero")
+            experiencias = ("principiante", "intermedio", "experto")
+            Product.objects.bulk_create(
+                Product(
+                    seller=seller, name=f"Ruana {i}", material=materiales[i % 3], color="Gris",
+                    horas=1 + i % 30, experiencia=experiencias[i % 3], price=0, stock=1 + i % 20,
+                )
+                for i in range(options["productos"])
+            )
+            precios.recalcular(aplicar=True)
+            FactorPrecio.objects.filter(tipo=TipoFactor.MATERIAL, clave="lana").update(factor="1.35")
+            precios.descartar_tabla()
+
+            self.stdout.write(f"NumPy: {'sí' if precios.np is not None else 'no'}")
+            inicio = time.perf_counter()
+            simulado = precios.recalcular()
+            self._linea("simulación", simulado.revisados, time.perf_counter() - inicio)
+
+            uno_a_uno = list(Product.objects.filter(material="lana")[:options["uno_a_uno"]])
+            inicio = time.perf_counter()
+            for producto in uno_a_uno:
+                producto.price = precios.precio_sugerido(producto.material, producto.horas, producto.experiencia)
+                producto.save()
+            self._linea("save()", len(uno_a_uno), time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            aplicado = precios.recalcular(aplicar=True)
+            self._linea("aplicado", aplicado.revisados, time.perf_counter() - inicio)
+            self.stdout.write(f"{len(simulado.cambios)} diferencias, {len(aplicado.cambios)} aplicadas")
+
+    def _linea(self, nombre, productos, segundos):
+        self.stdout.write(f"{nombre:<12}{productos:>8} productos {segundos:>8.2f} s {productos / segundos:>10.0f} productos/s")
@@ -0,0 +1,90 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from productos.models import Product
+
+from ._bench import base_de_datos_temporal
+
+MODOS = {
+    "django db": "django.contrib.sessions.backends.db",
+    "db": "productos.sesiones.db",
+    "cached_db": "productos.sesiones.cached_db",
+    "signed_cookies": "productos.sesiones.signed_cookies",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga concurrente (carrito, favoritos, lecturas) contra cada backend de sesión: "
+        "escrituras a django_session, errores y latencia. Usa una base SQLite temporal en archivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuarios", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=60, help="Requests por usuario.")
+
+    def handle(self, *args, **options):
+        with base_de_datos_temporal(en_archivo=True):
+            seller = User.objects.create(username="bench")
+            productos = [
+                Product.objects.create(seller=seller, name=f"Gorro {i}", price=15000, stock=100)
+                for i in range(20)
+            ]
+            self.stdout.write(
+                f"{'modo':<16}{'requests':>10}{'escrituras':>12}{'errores':>9}{'p50 (ms)':>10}{'p99 (ms)':>10}"
+            )
+            for nombre, engine in MODOS.items():
+                with override_settings(SESSION_ENGINE=engine):
+                    resultado = self._carga(productos, options["usuarios"], options["requests"])
+                latencias = sorted(resultado["latencias"])
+                p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))]
+                self.stdout.write(
+                    f"{nombre:<16}{len(latencias):>10}{resultado['escrituras']:>12}{resultado['errores']:>9}"
+                    f"{statistics.median(latencias):>10.1f}{p99:>10.1f}"
+                )
+
+    def _carga(self, productos, usuarios, por_usuario):
+        resultado = {"latencias": [], "escrituras": 0, "errores": 0}
+        lock = threading.Lock()
+
+        def contar_escrituras(execute, sql, params, many, context):
+            if "django_session" in sql and sql.lstrip().upper().startswith(("INSERT", "UPDATE")):
+                with lock:
+                    resultado["escrituras"] += 1
+            return execute(sql, params, many, context)
+
+        def usuario(n):
+            client = Client(raise_request_exception=False)
+            latencias, errores = [], 0
+            with connection.execute_wrapper(contar_escrituras):
+                for i in range(por_usuario):
+                    producto = productos[(n + i) % len(productos)]
+                    paso = i % 4
+                    inicio = time.perf_counter()
+                    if paso == 0:
+                        response = client.get(reverse("agregar_al_carrito", args=[producto.pk]))
+                    elif paso == 1:
+                        response = client.post(reverse("toggle_favorite", args=[producto.pk]))
+                    elif paso == 2:
+                        response = client.get(reverse("ver_carrito"))
+                    else:
+                        response = client.get(reverse("quitar_del_carrito", args=[producto.pk]))
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+                    if response.status_code >= 500:
+                        errores += 1
+            connection.close()
+            with lock:
+                resultado["latencias"].extend(latencias)
+                resultado["errores"] += errores
+
+        with ThreadPoolExecutor(max_workers=usuarios) as pool:
+            list(pool.map(usuario, range(usuarios)))
+        return resultado
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from productos.models import EstadoImagen, Product
+from productos.services import images
+
+
+class Command(BaseCommand):
+    help = "Genera las versiones responsive (y ancho/alto) de las imágenes de productos existentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--todas", action="store_true",
+                            help="Regenera también las que ya tienen versiones.")
+
+    def handle(self, *args, **options):
+        # Las pendientes las procesa el worker y ya generan sus versiones
+        productos = (
+            Product.objects.exclude(imagen="")
+            .exclude(imagen__isnull=True)
+            .exclude(imagen_estado__in=[EstadoImagen.PENDIENTE, EstadoImagen.PROCESANDO])
+            .order_by("id")
+        )
+        if not options["todas"]:
+            productos = productos.filter(imagen_versiones={})
+
+        hechos = errores = 0
+        for producto in productos.iterator(chunk_size=100):
+            anteriores = images.nombres_de_versiones(producto.imagen_versiones)
+            try:
+                campos = images.actualizar_versiones(producto, "imagen")
+            except Exception as e:
+                errores += 1
+                self.stderr.write(f"Producto {producto.pk}: {e}")
+                continue
+            producto.save(update_fields=campos)
+            vigentes = images.nombres_de_versiones(producto.imagen_versiones)
+            images.liberar_archivos(producto.imagen.storage, set(anteriores) - set(vigentes))
+            hechos += 1
+        self.stdout.write(self.style.SUCCESS(f"Versiones generadas: {hechos}. Errores: {errores}."))
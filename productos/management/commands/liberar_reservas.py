@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from productos.services.inventario import liberar_vencidas
+
+
+class Command(BaseCommand):
+    help = (
+        "Devuelve al stock las reservas de compra vencidas. "
+        "Con --once revisa una vez y termina (para cron); si no, sigue revisando."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--intervalo", type=float, default=60.0, help="Segundos entre revisiones")
+        parser.add_argument("--once", action="store_true", help="Liberar lo vencido y salir")
+
+    def handle(self, *args, **options):
+        while True:
+            liberadas = liberar_vencidas()
+            if liberadas:
+                self.stdout.write(f"{liberadas} reserva(s) liberada(s)")
+            if options["once"]:
+                break
+            time.sleep(options["intervalo"])
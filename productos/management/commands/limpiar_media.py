@@ -0,0 +1,73 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from productos.services import images
+from productos.storage import es_nombre_por_contenido
+
+
+class Command(BaseCommand):
+    help = "Borra los archivos de media que ningún registro referencia."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Solo lista lo que borraría.")
+        parser.add_argument("--min-edad", type=int, default=60,
+                            help="Minutos de antigüedad mínima para borrar (evita subidas en curso).")
+        parser.add_argument("--deduplicar", action="store_true",
+                            help="Antes de limpiar, pasa los archivos con nombre viejo a su nombre por contenido.")
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if options["deduplicar"]:
+            movidos = self._deduplicar(storage, options["dry_run"])
+            self.stdout.write(f"Registros apuntados a su archivo por contenido: {movidos}.")
+
+        en_uso = images.archivos_en_uso()
+        limite = timezone.now() - timedelta(minutes=options["min_edad"])
+        borrados = liberado = 0
+        for nombre in self._archivos(storage, ""):
+            if nombre in en_uso or storage.get_modified_time(nombre) > limite:
+                continue
+            liberado += storage.size(nombre)
+            borrados += 1
+            if options["dry_run"]:
+                self.stdout.write(nombre)
+            else:
+                storage.delete(nombre)
+
+        accion = "Se borrarían" if options["dry_run"] else "Borrados"
+        self.stdout.write(self.style.SUCCESS(
+            f"{accion} {borrados} archivos huérfanos ({liberado / 1024:.0f} KB)."
+        ))
+
+    def _archivos(self, storage, carpeta):
+        directorios, archivos = storage.listdir(carpeta)
+        for archivo in archivos:
+            yield posixpath.join(carpeta, archivo) if carpeta else archivo
+        for directorio in directorios:
+            yield from self._archivos(storage, posixpath.join(carpeta, directorio) if carpeta else directorio)
+
+    def _deduplicar(self, storage, dry_run):
+        """Reapunta los campos con nombres anteriores al almacenamiento por contenido.
+
+        Copias idénticas terminan en el mismo archivo; las viejas quedan
+        huérfanas y las borra la limpieza que sigue.
+        """
+        movidos = 0
+        for modelo, campo in images.campos_archivo():
+            qs = modelo._base_manager.exclude(**{campo: ""}).exclude(**{f"{campo}__isnull": True})
+            for instance in qs.iterator(chunk_size=100):
+                field_file = getattr(instance, campo)
+                if es_nombre_por_contenido(field_file.name) or not storage.exists(field_file.name):
+                    continue
+                movidos += 1
+                if dry_run:
+                    continue
+                with storage.open(field_file.name, "rb") as archivo:
+                    nuevo = storage.save(field_file.name, archivo)
+                setattr(instance, campo, nuevo)
+                instance.save(update_fields=[campo])
+        return movidos
@@ -0,0 +1,38 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from productos.services.images import procesar_pendientes
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de imágenes: comprime y redimensiona las imágenes subidas. "
+        "Con --once vacía la cola y termina; si no, sigue esperando trabajos nuevos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="Hilos de procesamiento")
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre revisiones de la cola")
+        parser.add_argument("--once", action="store_true", help="Procesar lo pendiente y salir")
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                procesados = sum(pool.map(_vaciar_cola, range(workers)))
+                if procesados:
+                    self.stdout.write(f"{procesados} imagen(es) procesada(s)")
+                if options["once"]:
+                    break
+                time.sleep(options["intervalo"])
+
+
+def _vaciar_cola(_):
+    try:
+        return procesar_pendientes()
+    finally:
+        # Cada hilo tiene su propia conexión
+        connection.close()
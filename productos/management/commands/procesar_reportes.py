@@ -0,0 +1,42 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from productos.services.reportes import procesar_pendientes, purgar
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de reportes: genera los archivos pedidos en /export/. "
+        "Con --once vacía la cola y termina; si no, sigue esperando trabajos nuevos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1, help="Hilos de procesamiento")
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre revisiones de la cola")
+        parser.add_argument("--once", action="store_true", help="Procesar lo pendiente y salir")
+        parser.add_argument("--purgar", action="store_true",
+                            help="Antes de empezar, borrar los reportes sin pedir hace REPORTES_DIAS días")
+
+    def handle(self, *args, **options):
+        if options["purgar"]:
+            self.stdout.write(f"{purgar()} reporte(s) viejo(s) borrado(s)")
+        workers = max(1, options["workers"])
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                procesados = sum(pool.map(_vaciar_cola, range(workers)))
+                if procesados:
+                    self.stdout.write(f"{procesados} reporte(s) generado(s)")
+                if options["once"]:
+                    break
+                time.sleep(options["intervalo"])
+
+
+def _vaciar_cola(_):
+    try:
+        return procesar_pendientes()
+    finally:
+        # Cada hilo tiene su propia conexión
+        connection.close()
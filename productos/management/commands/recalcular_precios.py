@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from productos.factories import get_report_generator
+from productos.models import Product
+from productos.services import precios
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula el precio sugerido de los productos con los factores actuales de FactorPrecio. "
+        "Por defecto solo muestra las diferencias; con --aplicar las guarda."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--aplicar", action="store_true", help="Guardar los precios nuevos")
+        parser.add_argument("--vendedor", help="Solo los productos de este usuario")
+        parser.add_argument("--material", help="Solo los productos de este material")
+        parser.add_argument("--reporte", help="Archivo donde escribir las diferencias (csv, excel o pdf según la extensión)")
+        parser.add_argument("--mostrar", type=int, default=20, help="Diferencias a listar en pantalla")
+
+    def handle(self, *args, **options):
+        productos = Product.objects.all()
+        if options["vendedor"]:
+            productos = productos.filter(seller__username=options["vendedor"])
+        if options["material"]:
+            productos = productos.filter(material=options["material"])
+
+        resultado = precios.recalcular(productos, aplicar=options["aplicar"])
+        for cambio in resultado.cambios[:options["mostrar"]]:
+            self.stdout.write(
+                f"#{cambio.producto_id} {cambio.nombre}: {cambio.anterior} -> {cambio.nuevo} ({cambio.diferencia:+})"
+            )
+        if options["reporte"]:
+            self._escribir_reporte(options["reporte"], resultado)
+
+        verbo = "actualizados" if resultado.aplicado else "cambiarían (simulación, usa --aplicar)"
+        self.stdout.write(f"{resultado.revisados} productos revisados, {len(resultado.cambios)} {verbo}")
+
+    def _escribir_reporte(self, ruta, resultado):
+        extension = ruta.rsplit(".", 1)[-1].lower()
+        formato = {"xlsx": "excel"}.get(extension, extension)
+        generator = get_report_generator(formato, columns=precios.COLUMNAS_DIFERENCIAS, title="Recálculo de precios")
+        with open(ruta, "wb") as archivo:
+            for pedazo in generator.stream(precios.filas_diferencias(resultado)):
+                archivo.write(pedazo)
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from productos.services.estadisticas import reconciliar
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula las estadísticas de inventario por vendedor desde la tabla de productos "
+        "y corrige las que no coincidan. Con --once revisa una vez y termina (para cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--intervalo", type=float, default=3600.0, help="Segundos entre revisiones")
+        parser.add_argument("--once", action="store_true", help="Reconciliar y salir")
+
+    def handle(self, *args, **options):
+        while True:
+            corregidas = reconciliar()
+            if corregidas:
+                self.stdout.write(f"{corregidas} vendedor(es) corregido(s)")
+            if options["once"]:
+                break
+            time.sleep(options["intervalo"])
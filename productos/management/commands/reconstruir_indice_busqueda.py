@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from productos.services import search
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de texto completo de productos (FTS5)."
+
+    def handle(self, *args, **options):
+        if not search.fts_disponible():
+            self.stdout.write("La base de datos no soporta FTS5; no hay índice que reconstruir.")
+            return
+        search.crear_indice()
+        search.reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS("Índice de búsqueda reconstruido."))
@@ -0,0 +1,53 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import productos.models
+
+# SQL copiado tal como estaba al crear la migración (no depende de
+# productos.services.search, que puede cambiar)
+CREAR_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS productos_product_fts USING fts5("
+    "name, description, category, material, color, "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+PESOS_FTS = "INSERT INTO productos_product_fts (productos_product_fts, rank) VALUES ('rank', 'bm25(10.0, 2.0, 4.0, 4.0, 4.0)')"
+LLENAR_FTS = (
+    "INSERT INTO productos_product_fts (rowid, name, description, category, material, color) "
+    "SELECT id, name, description, category, material, color FROM productos_product"
+)
+
+
+def crear_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(CREAR_FTS)
+    schema_editor.execute(PESOS_FTS)
+    schema_editor.execute(LLENAR_FTS)
+
+
+def eliminar_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS productos_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0002_profile_foto_perfil'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchIndex',
+            fields=[
+                ('product', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='productos.product')),
+                ('match', productos.models.FTSMatchField(db_column='productos_product_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'productos_product_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(crear_indice_fts, eliminar_indice_fts),
+    ]
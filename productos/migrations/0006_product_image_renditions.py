@@ -0,0 +1,28 @@
+# Generated by Django 4.2.23 on 2026-10-18 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0005_image_processing_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='imagen_alto',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='imagen_ancho',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='imagen_versiones',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0006_product_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='imagen_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.23 on 2026-10-18 14:42
+
+import django.core.validators
+from django.db import migrations, models
+import productos.validators
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0007_product_image_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='imagen',
+            field=models.ImageField(blank=True, null=True, upload_to='imagenProductos/', validators=[productos.validators.validar_pixeles]),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='foto_perfil',
+            field=models.ImageField(blank=True, null=True, upload_to='perfiles/', validators=[django.core.validators.FileExtensionValidator(['jpg', 'jpeg', 'png']), productos.validators.validar_pixeles]),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.23 on 2026-10-18 14:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# SQL copiado tal como estaba al crear la migración (no depende de
+# productos.services.inventario, que puede cambiar)
+TRIGGERS = {
+    "productos_product_agotado_update": (
+        "AFTER UPDATE OF stock ON productos_product FOR EACH ROW "
+        "WHEN NEW.stock = 0 AND NEW.is_active"
+    ),
+    "productos_product_agotado_insert": (
+        "AFTER INSERT ON productos_product FOR EACH ROW "
+        "WHEN NEW.stock = 0 AND NEW.is_active"
+    ),
+}
+
+
+def crear_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for nombre, cuando in TRIGGERS.items():
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {nombre} {cuando} BEGIN "
+            "UPDATE productos_product SET is_active = 0 WHERE id = NEW.id; END"
+        )
+
+
+def eliminar_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for nombre in TRIGGERS:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0010_favorites'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('vence', models.DateTimeField(db_index=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('cart', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservas', to='productos.cart')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='productos.product')),
+            ],
+        ),
+        migrations.RunPython(crear_triggers, eliminar_triggers),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# SQL copiado tal como estaba al crear la migración (no depende de
+# productos.services.estadisticas, que puede cambiar)
+SUMAR_NUEVO = (
+    "INSERT INTO productos_sellerstats (seller_id, productos, activos, sin_stock, valor_inventario) "
+    "VALUES (NEW.seller_id, 1, NEW.is_active AND NEW.stock > 0, NEW.stock = 0, NEW.price * NEW.stock) "
+    "ON CONFLICT (seller_id) DO UPDATE SET "
+    "productos = productos + excluded.productos, "
+    "activos = activos + excluded.activos, "
+    "sin_stock = sin_stock + excluded.sin_stock, "
+    "valor_inventario = valor_inventario + excluded.valor_inventario;"
+)
+RESTAR_VIEJO = (
+    "UPDATE productos_sellerstats SET "
+    "productos = productos - 1, "
+    "activos = activos - (OLD.is_active AND OLD.stock > 0), "
+    "sin_stock = sin_stock - (OLD.stock = 0), "
+    "valor_inventario = valor_inventario - OLD.price * OLD.stock "
+    "WHERE seller_id = OLD.seller_id;"
+)
+TRIGGERS = {
+    "productos_sellerstats_insert": ("AFTER INSERT ON productos_product FOR EACH ROW", SUMAR_NUEVO),
+    "productos_sellerstats_delete": ("AFTER DELETE ON productos_product FOR EACH ROW", RESTAR_VIEJO),
+    "productos_sellerstats_update": (
+        "AFTER UPDATE OF seller_id, is_active, stock, price ON productos_product FOR EACH ROW "
+        "WHEN OLD.seller_id IS NOT NEW.seller_id OR OLD.is_active IS NOT NEW.is_active "
+        "OR OLD.stock IS NOT NEW.stock OR OLD.price IS NOT NEW.price",
+        RESTAR_VIEJO + " " + SUMAR_NUEVO,
+    ),
+}
+LLENAR = (
+    "INSERT INTO productos_sellerstats (seller_id, productos, activos, sin_stock, valor_inventario) "
+    "SELECT seller_id, COUNT(*), "
+    "SUM(CASE WHEN is_active AND stock > 0 THEN 1 ELSE 0 END), "
+    "SUM(CASE WHEN stock = 0 THEN 1 ELSE 0 END), "
+    "COALESCE(SUM(price * stock), 0) "
+    "FROM productos_product GROUP BY seller_id"
+)
+
+
+def llenar_y_crear_triggers(apps, schema_editor):
+    schema_editor.execute(LLENAR)
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for nombre, (cuando, cuerpo) in TRIGGERS.items():
+        schema_editor.execute(f"CREATE TRIGGER IF NOT EXISTS {nombre} {cuando} BEGIN {cuerpo} END")
+
+
+def eliminar_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for nombre in TRIGGERS:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('productos', '0012_report_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerStats',
+            fields=[
+                ('seller', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadisticas', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('productos', models.IntegerField(default=0)),
+                ('activos', models.IntegerField(default=0)),
+                ('sin_stock', models.IntegerField(default=0)),
+                ('valor_inventario', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+        ),
+        migrations.RunPython(llenar_y_crear_triggers, eliminar_triggers),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:33
+
+from django.db import migrations, models
+
+# Los factores que estaban fijos en Vendedores.views.calcular_precio_sugerido
+FACTORES = {
+    "material": {"algodon": "1.0", "lana": "1.2", "cuero": "1.5"},
+    "experiencia": {"principiante": "1.0", "intermedio": "1.2", "experto": "1.5"},
+}
+
+# Triggers de productos_product de las migraciones 0011 y 0013, copiados
+# tal como estaban (no dependen de productos.services, que puede cambiar)
+_SUMAR_NUEVO = (
+    "INSERT INTO productos_sellerstats (seller_id, productos, activos, sin_stock, valor_inventario) "
+    "VALUES (NEW.seller_id, 1, NEW.is_active AND NEW.stock > 0, NEW.stock = 0, NEW.price * NEW.stock) "
+    "ON CONFLICT (seller_id) DO UPDATE SET "
+    "productos = productos + excluded.productos, "
+    "activos = activos + excluded.activos, "
+    "sin_stock = sin_stock + excluded.sin_stock, "
+    "valor_inventario = valor_inventario + excluded.valor_inventario;"
+)
+_RESTAR_VIEJO = (
+    "UPDATE productos_sellerstats SET "
+    "productos = productos - 1, "
+    "activos = activos - (OLD.is_active AND OLD.stock > 0), "
+    "sin_stock = sin_stock - (OLD.stock = 0), "
+    "valor_inventario = valor_inventario - OLD.price * OLD.stock "
+    "WHERE seller_id = OLD.seller_id;"
+)
+_APAGAR = "UPDATE productos_product SET is_active = 0 WHERE id = NEW.id;"
+TRIGGERS = {
+    "productos_product_agotado_update": (
+        "AFTER UPDATE OF stock ON productos_product FOR EACH ROW WHEN NEW.stock = 0 AND NEW.is_active",
+        _APAGAR,
+    ),
+    "productos_product_agotado_insert": (
+        "AFTER INSERT ON productos_product FOR EACH ROW WHEN NEW.stock = 0 AND NEW.is_active",
+        _APAGAR,
+    ),
+    "productos_sellerstats_insert": ("AFTER INSERT ON productos_product FOR EACH ROW", _SUMAR_NUEVO),
+    "productos_sellerstats_delete": ("AFTER DELETE ON productos_product FOR EACH ROW", _RESTAR_VIEJO),
+    "productos_sellerstats_update": (
+        "AFTER UPDATE OF seller_id, is_active, stock, price ON productos_product FOR EACH ROW "
+        "WHEN OLD.seller_id IS NOT NEW.seller_id OR OLD.is_active IS NOT NEW.is_active "
+        "OR OLD.stock IS NOT NEW.stock OR OLD.price IS NOT NEW.price",
+        _RESTAR_VIEJO + " " + _SUMAR_NUEVO,
+    ),
+}
+
+
+def cargar_factores(apps, schema_editor):
+    FactorPrecio = apps.get_model("productos", "FactorPrecio")
+    FactorPrecio.objects.bulk_create(
+        FactorPrecio(tipo=tipo, clave=clave, factor=factor)
+        for tipo, factores in FACTORES.items()
+        for clave, factor in factores.items()
+    )
+
+
+def borrar_factores(apps, schema_editor):
+    apps.get_model("productos", "FactorPrecio").objects.all().delete()
+
+
+def recrear_triggers(apps, schema_editor):
+    """En SQLite, agregar o quitar columnas puede rehacer la tabla de productos y
+    perder sus triggers: se vuelven a crear (los que ya estén no se tocan)."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for nombre, (cuando, cuerpo) in TRIGGERS.items():
+        schema_editor.execute(f"CREATE TRIGGER IF NOT EXISTS {nombre} {cuando} BEGIN {cuerpo} END")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0013_seller_stats'),
+    ]
+
+    operations = [
+        # Al deshacer corre al final, después de quitar las columnas
+        migrations.RunPython(migrations.RunPython.noop, recrear_triggers),
+        migrations.CreateModel(
+            name='FactorPrecio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('material', 'Material'), ('experiencia', 'Experiencia')], max_length=12)),
+                ('clave', models.CharField(max_length=50)),
+                ('factor', models.DecimalField(decimal_places=3, max_digits=6)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='experiencia',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='horas',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='factorprecio',
+            constraint=models.UniqueConstraint(fields=('tipo', 'clave'), name='factorprecio_tipo_clave_uniq'),
+        ),
+        migrations.RunPython(cargar_factores, borrar_factores),
+        # Al agregar `experiencia` SQLite rehace la tabla de productos
+        migrations.RunPython(recrear_triggers, recrear_triggers),
+    ]
@@ -0,0 +1,31 @@
+import uuid
+
+from django.db import migrations, models
+
+
+def generar_tokens(apps, schema_editor):
+    # El default de AddField se evalúa una sola vez: cada fila necesita el suyo
+    ReportJob = apps.get_model("productos", "ReportJob")
+    for job in ReportJob.objects.only("pk"):
+        ReportJob.objects.filter(pk=job.pk).update(token=uuid.uuid4())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0014_precios_sugeridos"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportjob",
+            name="token",
+            field=models.UUIDField(null=True, editable=False),
+        ),
+        migrations.RunPython(generar_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="reportjob",
+            name="token",
+            field=models.UUIDField(default=uuid.uuid4, unique=True, editable=False),
+        ),
+    ]
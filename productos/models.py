@@ -1,12 +1,21 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.core.validators import FileExtensionValidator
-from PIL import Image
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
-import sys
+
+from .validators import validar_pixeles
+
+
+class EstadoImagen(models.TextChoices):
+    PENDIENTE = "pendiente", "Pendiente"
+    PROCESANDO = "procesando", "Procesando"
+    LISTA = "lista", "Lista"
+    ERROR = "error", "Error"
 
 
 # Perfil de vendedor
@@ -55,43 +64,85 @@ class Product(models.Model):
     stock = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    imagen = models.ImageField(upload_to="imagenProductos/", blank=True, null=True)
+    imagen = models.ImageField(upload_to="imagenProductos/", blank=True, null=True, validators=[validar_pixeles])
+    imagen_estado = models.CharField(max_length=12, choices=EstadoImagen.choices, default=EstadoImagen.LISTA)
+    # Dimensiones de la imagen optimizada y sus versiones por formato/ancho
+    # (las llena la cola de imágenes; ver services/images.py)
+    imagen_ancho = models.PositiveIntegerField(null=True, blank=True)
+    imagen_alto = models.PositiveIntegerField(null=True, blank=True)
+    imagen_versiones = models.JSONField(default=dict, blank=True)
+    # SHA-256 del archivo subido, para no volver a procesar la misma imagen
+    imagen_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # Datos del precio sugerido (ver services/precios.py); sin horas el
+    # precio lo puso el vendedor y no se recalcula
+    horas = models.PositiveIntegerField(null=True, blank=True)
+    experiencia = models.CharField(max_length=20, blank=True)
+
+    class Meta:
+        indexes = [
+            # Catálogo (home): solo productos activos, los más recientes primero
+            models.Index(fields=["-created_at", "-id"], condition=models.Q(is_active=True), name="product_active_recent_idx"),
+            models.Index(fields=["material", "-created_at", "-id"], condition=models.Q(is_active=True), name="product_active_material_idx"),
+            models.Index(fields=["color", "-created_at", "-id"], condition=models.Q(is_active=True), name="product_active_color_idx"),
+            models.Index(fields=["price"], condition=models.Q(is_active=True), name="product_active_price_idx"),
+            # Mis productos: siempre filtrado por vendedor, con los órdenes permitidos
+            models.Index(fields=["seller", "-created_at"], name="product_seller_recent_idx"),
+            models.Index(fields=["seller", "price"], name="product_seller_price_idx"),
+            models.Index(fields=["seller", "stock"], name="product_seller_stock_idx"),
+            models.Index(fields=["seller", "name"], name="product_seller_name_idx"),
+            models.Index(fields=["seller", "is_active", "stock"], name="product_seller_state_idx"),
+        ]
 
     def save(self, *args, **kwargs):
-        """Comprime y redimensiona la imagen automáticamente al guardar"""
-        if self.imagen:
-            # Abrir la imagen
-            img = Image.open(self.imagen)
-            
-            # Convertir a RGB si es necesario (para PNG con transparencia)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            
-            # Redimensionar si es muy grande (máximo 1200px en el lado más largo)
-            max_size = (1200, 1200)
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Guardar en memoria con compresión
-            output = BytesIO()
-            img.save(output, format='JPEG', quality=85, optimize=True)
-            output.seek(0)
-            
-            # Reemplazar la imagen original con la comprimida
-            self.imagen = InMemoryUploadedFile(
-                output, 'ImageField',
-                f"{self.imagen.name.split('.')[0]}.jpg",
-                'image/jpeg',
-                sys.getsizeof(output), None
-            )
-        
+        """Guarda la imagen original y deja la compresión en la cola de imágenes"""
+        nueva_imagen = bool(self.imagen) and not self.imagen._committed
+        liberar = []
+        if nueva_imagen:
+            from .services import images
+            liberar = images.nombres_de_versiones(self.imagen_versiones)
+            # Si esa misma imagen ya se procesó (aquí o en otro producto) se reutiliza
+            nueva_imagen = not images.reutilizar_procesada(self, "imagen")
         super().save(*args, **kwargs)
+        if nueva_imagen:
+            images.encolar_imagen(self, "imagen")
+        if liberar:
+            images.liberar_archivos(self.imagen.storage, liberar)
 
     def __str__(self):
         return self.name
 
 
+class FTSMatchField(models.TextField):
+    """Columna oculta de FTS5 con el nombre de la tabla; soporta `__match`."""
+
+
+@FTSMatchField.register_lookup
+class FTSMatch(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class ProductSearchIndex(models.Model):
+    """Tabla virtual FTS5 `productos_product_fts` (ver services/search.py).
+
+    No la gestiona Django: la crea la migración 0003 solo en SQLite.
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column="rowid", db_constraint=False, related_name="search_index",
+    )
+    match = FTSMatchField(db_column="productos_product_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "productos_product_fts"
+
+
 # Tablas auxiliares para preferencias
 class Color(models.Model):
     nombre = models.CharField(max_length=50)
@@ -111,7 +162,8 @@ class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
 
     # Información básica personal
-    foto_perfil = models.ImageField(upload_to="perfiles/", blank=True, null=True, validators=[FileExtensionValidator(["jpg", "jpeg", "png"])])
+    foto_perfil = models.ImageField(upload_to="perfiles/", blank=True, null=True, validators=[FileExtensionValidator(["jpg", "jpeg", "png"]), validar_pixeles])
+    foto_estado = models.CharField(max_length=12, choices=EstadoImagen.choices, default=EstadoImagen.LISTA)
     telefono = models.CharField(max_length=20, blank=True, null=True)
     direccion = models.CharField(max_length=255, blank=True, null=True)
     fecha_nacimiento = models.DateField(blank=True, null=True)
@@ -132,40 +184,179 @@ class Profile(models.Model):
     accesorios_favoritos = models.ManyToManyField(Accesorio, blank=True)
 
     def save(self, *args, **kwargs):
-        """Comprime y redimensiona la foto de perfil automáticamente al guardar"""
-        if self.foto_perfil:
-            # Abrir la imagen
-            img = Image.open(self.foto_perfil)
-            
-            # Convertir a RGB si es necesario
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            
-            # Redimensionar a 500x500 para foto de perfil
-            max_size = (500, 500)
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Guardar en memoria con compresión
-            output = BytesIO()
-            img.save(output, format='JPEG', quality=85, optimize=True)
-            output.seek(0)
-            
-            # Reemplazar la imagen original con la comprimida
-            self.foto_perfil = InMemoryUploadedFile(
-                output, 'ImageField',
-                f"{self.foto_perfil.name.split('.')[0]}.jpg",
-                'image/jpeg',
-                sys.getsizeof(output), None
-            )
-        
+        """Guarda la foto original y deja la compresión en la cola de imágenes"""
+        nueva_foto = bool(self.foto_perfil) and not self.foto_perfil._committed
+        if nueva_foto:
+            self.foto_estado = EstadoImagen.PENDIENTE
         super().save(*args, **kwargs)
+        if nueva_foto:
+            from .services.images import encolar_imagen
+            encolar_imagen(self, "foto_perfil")
 
     def __str__(self):
         return f"Perfil de {self.user.username}"
 
 
+# Cola de procesamiento de imágenes (ver services/images.py)
+class ImageJob(models.Model):
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    objeto = GenericForeignKey("content_type", "object_id")
+    campo = models.CharField(max_length=50)
+    # Nombre del archivo original encolado; si el campo cambió, el trabajo queda obsoleto
+    archivo = models.CharField(max_length=255)
+    estado = models.CharField(max_length=12, choices=EstadoImagen.choices, default=EstadoImagen.PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["estado", "id"], name="imagejob_estado_idx")]
+
+    def __str__(self):
+        return f"{self.content_type.model}#{self.object_id}.{self.campo} ({self.estado})"
+
+
+class Favorite(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="favoritos")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="favoritos")
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "product"], name="favorite_usuario_producto_unico"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} ♥ producto {self.product_id}"
+
+
+# Carrito guardado en el servidor: solo ids de producto y cantidades
+# (precios y stock se revalidan al mostrarlo, ver services/carrito.py)
+class Cart(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, related_name="carrito")
+    # Sube con cada cambio; sirve de clave para cachear el carrito
+    version = models.PositiveIntegerField(default=0)
+    creado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        dueno = self.user.username if self.user_id else "anónimo"
+        return f"Carrito #{self.pk} ({dueno})"
+
+
+class CartItem(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="items")
+    # Sin FK en la base: agregar no consulta el producto; los ids que ya no
+    # existen se descartan al revalidar
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, db_constraint=False, related_name="+")
+    cantidad = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "product"], name="cartitem_producto_unico"),
+        ]
+
+    def __str__(self):
+        return f"{self.cantidad} x producto {self.product_id}"
+
+
+# Versión de los datos del catálogo guardada en la base (una sola fila):
+# sobrevive a reinicios y es la misma para todos los procesos
+class CatalogVersion(models.Model):
+    version = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"Catálogo v{self.version}"
+
+
+# Versión de cada segmento de la grilla cacheada de `home` (ver
+# services/grid_cache). Va en la base para que todos los procesos la vean.
+class GridVersion(models.Model):
+    segmento = models.CharField(max_length=64, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.segmento} v{self.version}"
+
+
+class EstadoReporte(models.TextChoices):
+    PENDIENTE = "pendiente", "Pendiente"
+    PROCESANDO = "procesando", "Procesando"
+    LISTO = "listo", "Listo"
+    ERROR = "error", "Error"
+
+
+# Reporte pedido para generar en segundo plano. `clave` resume formato,
+# filtros y versión del catálogo: con los mismos datos se reusa el archivo
+class ReportJob(models.Model):
+    # Identificador público (URLs de estado y descarga): no se puede adivinar
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    formato = models.CharField(max_length=10)
+    filtros = models.JSONField(default=dict, blank=True)
+    clave = models.CharField(max_length=64, db_index=True)
+    estado = models.CharField(max_length=12, choices=EstadoReporte.choices, default=EstadoReporte.PENDIENTE)
+    # Nombre del archivo dentro de REPORTES_ROOT
+    archivo = models.CharField(max_length=255, blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["estado", "id"], name="reportjob_estado_idx")]
+
+    def __str__(self):
+        return f"Reporte {self.formato} #{self.pk} ({self.estado})"
+
+
+# Stock apartado al comprar: ya está descontado de Product.stock y vuelve
+# al vencer (ver services/inventario.py)
+class StockReservation(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.SET_NULL, null=True, blank=True, related_name="reservas")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reservas")
+    cantidad = models.PositiveIntegerField()
+    vence = models.DateTimeField(db_index=True)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.cantidad} x producto {self.product_id} hasta {self.vence:%H:%M}"
+
+
+# Totales del inventario de cada vendedor para el panel "Mis productos".
+# Los mantienen triggers sobre productos_product (ver services/estadisticas.py)
+class SellerStats(models.Model):
+    seller = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="estadisticas")
+    productos = models.IntegerField(default=0)
+    activos = models.IntegerField(default=0)
+    sin_stock = models.IntegerField(default=0)
+    valor_inventario = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"Estadísticas de {self.seller_id}: {self.productos} productos"
+
+
+class TipoFactor(models.TextChoices):
+    MATERIAL = "material", "Material"
+    EXPERIENCIA = "experiencia", "Experiencia"
+
+
+# Multiplicadores del precio sugerido por material y por experiencia.
+# Se editan en el admin; lo que no está en la tabla usa factor 1
+class FactorPrecio(models.Model):
+    tipo = models.CharField(max_length=12, choices=TipoFactor.choices)
+    clave = models.CharField(max_length=50)
+    factor = models.DecimalField(max_digits=6, decimal_places=3)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["tipo", "clave"], name="factorprecio_tipo_clave_uniq")]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.clave}: x{self.factor}"
+
+
 # Señales para crear y guardar perfil automáticamente
 @receiver(post_save, sender=User)
 def crear_perfil_usuario(sender, instance, created, **kwargs):
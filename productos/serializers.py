@@ -3,11 +3,29 @@ from .models import Product
 
 class ProductSerializer(serializers.ModelSerializer):
     link = serializers.SerializerMethodField()
+    imagen = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        exclude = ['imagen']
+        # Lista explícita: las columnas internas (hash y versiones de la
+        # imagen, datos del precio sugerido) no se publican por accidente
+        fields = [
+            'id', 'name', 'description', 'category', 'material', 'color',
+            'price', 'stock', 'is_active', 'created_at', 'seller', 'imagen', 'link',
+        ]
+
+    def __init__(self, *args, fields=None, **kwargs):
+        """`fields` limita la salida a esos campos (sparse fieldsets)."""
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for nombre in set(self.fields) - set(fields):
+                self.fields.pop(nombre)
 
     def get_link(self, obj):
         request = self.context.get('request')
-        return request.build_absolute_uri(f"/producto/{obj.id}/")
\ No newline at end of file
+        return request.build_absolute_uri(f"/producto/{obj.id}/")
+
+    def get_imagen(self, obj):
+        if not obj.imagen:
+            return None
+        return self.context['request'].build_absolute_uri(obj.imagen.url)
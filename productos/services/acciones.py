@@ -0,0 +1,122 @@
+"""Acciones masivas sobre productos (activar, desactivar, cambiar precio, eliminar).
+
+Cada acción es un solo UPDATE o DELETE sobre el queryset que se le pasa (ya
+acotado al vendedor), sin cargar los productos ni pasar por `save()` o las
+señales de a uno. Lo que las señales mantienen se ajusta en bloque:
+
+- `is_active`: solo se activa lo que tiene stock (la misma regla que la
+  señal `pre_save`).
+- Índice de búsqueda, imágenes en cola y filas que apuntan al producto:
+  se borran en bloque antes del DELETE.
+- Facetas, grid y versión del catálogo: se invalidan una vez al final
+  (`avisar_cambios`).
+- Estadísticas del vendedor: las ajustan los triggers de `SellerStats`.
+"""
+from decimal import Decimal
+from typing import Iterable, Optional, Tuple
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Least, Round
+
+from ..models import ImageJob, Product
+from . import estadisticas, facets, grid_cache, search
+from .catalogo import tocar_catalogo
+
+# Cuántos ids van en cada DELETE ... WHERE id IN (...)
+LOTE_BORRADO = 500
+# El mayor precio que cabe en Product.price (max_digits=10, decimal_places=2)
+PRECIO_MAXIMO = Decimal("99999999.99")
+
+
+def avisar_cambios(pares: Iterable[Tuple[str, str]], seller_ids: Iterable[int]):
+    """Invalida lo derivado del catálogo tras escribir productos sin señales.
+
+    `pares` son los (material, color) de los productos tocados.
+    """
+    facets.descartar_facetas()
+    for material, color in set(pares):
+        valores = {"material": material, "color": color}
+        grid_cache.invalidar(valores, valores)
+    tocar_catalogo()
+    estadisticas.al_cambiar_producto(seller_ids)
+
+
+def _afectados(queryset):
+    filas = queryset.order_by().values_list("material", "color", "seller_id").distinct()
+    pares, sellers = set(), set()
+    for material, color, seller_id in filas:
+        pares.add((material, color))
+        sellers.add(seller_id)
+    return pares, sellers
+
+
+def activar(queryset) -> Tuple[int, int]:
+    """Activa los productos con stock. Devuelve (activados, omitidos por no tener stock)."""
+    pares, sellers = _afectados(queryset)
+    activados = queryset.filter(is_active=False, stock__gt=0).update(is_active=True)
+    sin_stock = queryset.filter(is_active=False, stock=0).count()
+    if activados:
+        avisar_cambios(pares, sellers)
+    return activados, sin_stock
+
+
+def desactivar(queryset) -> int:
+    pares, sellers = _afectados(queryset)
+    desactivados = queryset.filter(is_active=True).update(is_active=False)
+    if desactivados:
+        avisar_cambios(pares, sellers)
+    return desactivados
+
+
+def cambiar_precio(queryset, porcentaje: Optional[Decimal] = None, precio: Optional[Decimal] = None) -> int:
+    """Fija `precio` o ajusta el actual en `porcentaje` (10 = +10 %, -15 = -15 %).
+
+    Un aumento que se pasaría de `PRECIO_MAXIMO` deja el producto en ese tope.
+    El precio queda puesto a mano: se borran `horas` y `experiencia` para que
+    `recalcular_precios` no lo pise.
+    """
+    if (porcentaje is None) == (precio is None):
+        raise ValueError("Indica un porcentaje o un precio, no ambos.")
+    if precio is not None:
+        nuevo = precio
+    else:
+        nuevo = Least(
+            Round(F("price") * (1 + Decimal(porcentaje) / 100), 2),
+            Value(PRECIO_MAXIMO, output_field=Product._meta.get_field("price")),
+        )
+    pares, sellers = _afectados(queryset)
+    actualizados = queryset.update(price=nuevo, horas=None, experiencia="")
+    if actualizados:
+        avisar_cambios(pares, sellers)
+    return actualizados
+
+
+def _borrar_dependientes(ids):
+    """Lo que `QuerySet.delete` haría producto por producto, en bloque."""
+    ImageJob.objects.filter(
+        content_type=ContentType.objects.get_for_model(Product), object_id__in=ids
+    ).delete()
+    search.desindexar_productos(ids)
+    for relacion in Product._meta.related_objects:
+        if relacion.on_delete is models.CASCADE:
+            relacion.related_model._base_manager.filter(**{f"{relacion.field.name}__in": ids}).delete()
+
+
+def eliminar(queryset) -> int:
+    """Borra los productos del queryset sin cargarlos. Devuelve cuántos borró."""
+    pares, sellers = _afectados(queryset)
+    # Los ids se fijan antes: el queryset puede depender del índice de búsqueda que se borra
+    ids = list(queryset.order_by().values_list("pk", flat=True))
+    tabla = connection.ops.quote_name(Product._meta.db_table)
+    borrados = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for i in range(0, len(ids), LOTE_BORRADO):
+            lote = ids[i:i + LOTE_BORRADO]
+            _borrar_dependientes(lote)
+            cursor.execute(f"DELETE FROM {tabla} WHERE id IN ({', '.join(['%s'] * len(lote))})", lote)
+            borrados += cursor.rowcount
+    if borrados:
+        avisar_cambios(pares, sellers)
+    return borrados
@@ -0,0 +1,73 @@
+"""Reportes agregados del catálogo (por vendedor, categoría o material).
+
+Cada reporte es un solo `SELECT ... GROUP BY` en la base: totales, valor de
+inventario (`Sum(price * stock)`), promedios, productos con poco stock y
+productos nuevos de la última semana. A Python solo llega una fila por
+grupo, así que se puede pedir al momento aunque la tabla sea grande, y las
+filas salen por los mismos `ReportGenerator` que la exportación de
+productos.
+"""
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Iterator
+
+from django.conf import settings
+from django.db.models import Avg, Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import Product
+
+AGRUPACIONES = {
+    "vendedor": "seller__username",
+    "categoria": "category",
+    "material": "material",
+}
+COLUMNAS_AGREGADO = (
+    "grupo", "productos", "activos", "unidades", "valor_inventario",
+    "precio_promedio", "stock_bajo", "nuevos_7_dias",
+)
+DIAS_NUEVOS = 7
+SIN_VALOR = "(sin valor)"
+CENTAVO = Decimal("0.01")
+# SQLite devuelve los montos calculados con restos de float ("140.430000000000")
+MONTOS = ("valor_inventario", "precio_promedio")
+
+
+def umbral_stock_bajo() -> int:
+    return getattr(settings, "STOCK_BAJO", 5)
+
+
+def filas_agregadas(agrupacion: str, queryset=None, ahora=None) -> Iterator[dict]:
+    """Una fila por grupo, de mayor a menor valor de inventario."""
+    campo = AGRUPACIONES[agrupacion]
+    queryset = Product.objects.all() if queryset is None else queryset
+    desde = (ahora or timezone.now()) - timedelta(days=DIAS_NUEVOS)
+    valor = ExpressionWrapper(F("price") * F("stock"), output_field=DecimalField(max_digits=20, decimal_places=2))
+    filas = (
+        queryset.order_by()
+        .values(campo)
+        .annotate(
+            productos=Count("pk"),
+            # Igual que SellerStats: activo y con stock
+            activos=Count("pk", filter=Q(is_active=True, stock__gt=0)),
+            unidades=Coalesce(Sum("stock"), 0),
+            valor_inventario=Sum(valor),
+            precio_promedio=Avg("price"),
+            stock_bajo=Count("pk", filter=Q(stock__lte=umbral_stock_bajo())),
+            nuevos_7_dias=Count("pk", filter=Q(created_at__gte=desde)),
+        )
+        .order_by("-valor_inventario", campo)
+    )
+    for fila in filas:
+        fila["grupo"] = fila.pop(campo) or SIN_VALOR
+        for monto in MONTOS:
+            if fila[monto] is not None:
+                fila[monto] = Decimal(str(fila[monto])).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+        yield {columna: fila[columna] for columna in COLUMNAS_AGREGADO}
+
+
+def nombre_archivo(agrupacion: str, generator) -> str:
+    """productos_por_<agrupacion> con la extensión del formato."""
+    extension = generator.filename().rsplit(".", 1)[-1]
+    return f"productos_por_{agrupacion}.{extension}"
@@ -0,0 +1,385 @@
+"""Carrito de compras guardado en el servidor.
+
+La sesión solo lleva el id del carrito (`carrito_id`). El contenido, pares
+producto -> cantidad, vive en las tablas `Cart`/`CartItem` y en la caché.
+La base manda: leerlo (p. ej. para el contador de la barra) consulta solo
+`Cart.version` por clave primaria y usa la caché si tiene esa misma
+versión. Así un proceso con una copia vieja (la caché puede ser por
+proceso) vuelve a leer los ítems en vez de servirla o escribir sobre ella.
+
+Nunca se guardan nombres ni precios: al mostrar el carrito o al comprar,
+`revalidar` trae precio, stock y estado de todos los productos en una sola
+consulta y calcula los totales con Decimal.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.translation import get_language
+
+from ..models import Cart, CartItem, Product
+from . import inventario
+from .catalogo import version_catalogo
+
+CLAVE_SESION = "carrito_id"
+# Formato anterior: {"<id>": {"nombre", "precio", "cantidad"}} en la sesión
+CLAVE_SESION_ANTERIOR = "carrito"
+TIMEOUT = 60 * 60 * 24
+
+
+def _clave(cart_id):
+    return f"carrito:{cart_id}"
+
+
+class LineaCarrito:
+    """Ítem del carrito con los datos actuales del producto."""
+
+    def __init__(self, producto_id, cantidad, producto=None, reservado=0):
+        self.producto_id = producto_id
+        self.cantidad_pedida = cantidad
+        self.producto = producto
+        # Lo que este carrito ya tiene apartado cuenta como disponible para él
+        # (aunque el producto se haya apagado al quedar en cero)
+        disponible = producto.stock + reservado if producto is not None else 0
+        if producto is None or not (producto.is_active or (reservado and producto.stock == 0)):
+            self.problema = "no_disponible"
+            self.cantidad = 0
+        elif disponible < cantidad:
+            self.problema = "stock_insuficiente"
+            self.cantidad = disponible
+        else:
+            self.problema = ""
+            self.cantidad = cantidad
+
+    @property
+    def nombre(self):
+        return self.producto.name if self.producto else ""
+
+    @property
+    def precio(self):
+        return self.producto.price if self.producto else Decimal("0")
+
+    @property
+    def subtotal(self):
+        return self.precio * self.cantidad
+
+
+class ResumenCarrito:
+    """Resultado de `revalidar`: líneas comprables, totales y problemas encontrados."""
+
+    def __init__(self, lineas, version):
+        self.lineas = [linea for linea in lineas if linea.cantidad]
+        self.problemas = [linea for linea in lineas if linea.problema]
+        self.version = version
+        self.total = sum((linea.subtotal for linea in self.lineas), Decimal("0"))
+        self.total_items = sum(linea.cantidad for linea in self.lineas)
+
+    def __bool__(self):
+        return bool(self.lineas)
+
+    def __len__(self):
+        return len(self.lineas)
+
+    def __iter__(self):
+        return iter(self.lineas)
+
+
+def _linea_json(linea, producto_id):
+    if linea is None:
+        return {"producto_id": producto_id, "cantidad": 0}
+    return {
+        "producto_id": producto_id,
+        "nombre": linea.nombre,
+        "cantidad": linea.cantidad,
+        "precio": str(linea.precio),
+        "subtotal": str(linea.subtotal),
+        "problema": linea.problema,
+    }
+
+
+class Carrito:
+    """Carrito del request actual (del usuario si inició sesión)."""
+
+    def __init__(self, request):
+        self.request = request
+        self.session = request.session
+        self._id = self.session.get(CLAVE_SESION)
+        self._estado = None
+        user = getattr(request, "user", None)
+        self.user = user if user is not None and user.is_authenticated else None
+        if self._id is None and self.user is not None:
+            self._id = Cart.objects.filter(user=self.user).values_list("id", flat=True).first()
+            if self._id is not None:
+                self.session[CLAVE_SESION] = self._id
+        self._migrar_sesion_anterior()
+
+    # ────────── lectura ──────────
+
+    @property
+    def id(self):
+        return self._id
+
+    def _cargar(self):
+        if self._estado is not None:
+            return self._estado
+        if self._id is None:
+            self._estado = {"v": 0, "items": {}}
+            return self._estado
+        version = Cart.objects.filter(pk=self._id).values_list("version", flat=True).first()
+        if version is None:
+            # El carrito se borró (p. ej. se fusionó con otro): se empieza de nuevo
+            self._id = None
+            self.session.pop(CLAVE_SESION, None)
+            self._estado = {"v": 0, "items": {}}
+            return self._estado
+        estado = cache.get(_clave(self._id))
+        if estado is None or estado["v"] != version:
+            estado = self._leer_items(version)
+        self._estado = estado
+        return estado
+
+    def _leer_items(self, version):
+        items = dict(CartItem.objects.filter(cart_id=self._id).values_list("product_id", "cantidad"))
+        estado = {"v": version, "items": items}
+        cache.set(_clave(self._id), estado, TIMEOUT)
+        return estado
+
+    def items(self):
+        """{producto_id: cantidad} sin consultar productos."""
+        return dict(self._cargar()["items"])
+
+    @property
+    def version(self):
+        return self._cargar()["v"]
+
+    def __len__(self):
+        return len(self._cargar()["items"])
+
+    def cantidad_total(self):
+        return sum(self._cargar()["items"].values())
+
+    # ────────── escritura ──────────
+
+    def _asegurar(self):
+        self._cargar()
+        if self._id is None:
+            if self.user is not None:
+                cart = Cart.objects.get_or_create(user=self.user)[0]
+            else:
+                cart = Cart.objects.create()
+            self._id = cart.pk
+            self.session[CLAVE_SESION] = cart.pk
+            self._estado = {"v": cart.version, "items": {}}
+        return self._id
+
+    def _guardado(self, items):
+        esperada = self._estado["v"] + 1
+        Cart.objects.filter(pk=self._id).update(version=F("version") + 1, actualizado=timezone.now())
+        version = Cart.objects.filter(pk=self._id).values_list("version", flat=True).first()
+        if version != esperada:
+            # Otro proceso cambió el carrito en el medio: `items` puede estar viejo
+            self._estado = self._leer_items(version)
+            return
+        self._estado = {"v": version, "items": items}
+        cache.set(_clave(self._id), self._estado, TIMEOUT)
+
+    def agregar(self, producto_id, cantidad=1):
+        """Suma `cantidad` unidades. Devuelve la cantidad resultante."""
+        producto_id = int(producto_id)
+        cart_id = self._asegurar()
+        items = self.items()
+        with transaction.atomic():
+            actualizados = CartItem.objects.filter(cart_id=cart_id, product_id=producto_id).update(
+                cantidad=F("cantidad") + cantidad
+            )
+            if not actualizados:
+                try:
+                    with transaction.atomic():
+                        CartItem.objects.create(cart_id=cart_id, product_id=producto_id, cantidad=cantidad)
+                except IntegrityError:
+                    CartItem.objects.filter(cart_id=cart_id, product_id=producto_id).update(
+                        cantidad=F("cantidad") + cantidad
+                    )
+            items[producto_id] = items.get(producto_id, 0) + cantidad
+            self._guardado(items)
+        return items[producto_id]
+
+    def fijar(self, producto_id, cantidad):
+        """Deja exactamente `cantidad` unidades (0 quita el producto)."""
+        producto_id = int(producto_id)
+        if cantidad <= 0:
+            return self.eliminar(producto_id)
+        cart_id = self._asegurar()
+        items = self.items()
+        with transaction.atomic():
+            CartItem.objects.update_or_create(
+                cart_id=cart_id, product_id=producto_id, defaults={"cantidad": cantidad}
+            )
+            items[producto_id] = cantidad
+            self._guardado(items)
+        return cantidad
+
+    def quitar(self, producto_id, cantidad=1):
+        """Resta `cantidad` unidades; si llega a cero quita el producto."""
+        producto_id = int(producto_id)
+        actual = self.items().get(producto_id)
+        if actual is None:
+            return 0
+        return self.fijar(producto_id, actual - cantidad)
+
+    def eliminar(self, producto_id):
+        producto_id = int(producto_id)
+        items = self.items()
+        if producto_id not in items:
+            return 0
+        with transaction.atomic():
+            CartItem.objects.filter(cart_id=self._id, product_id=producto_id).delete()
+            del items[producto_id]
+            self._guardado(items)
+        return 0
+
+    def fijar_varios(self, cantidades):
+        """Aplica {producto_id: cantidad} en una transacción (0 quita)."""
+        cantidades = {int(pid): int(n) for pid, n in cantidades.items()}
+        if not cantidades:
+            return
+        cart_id = self._asegurar()
+        items = self.items()
+        quitar = [pid for pid, n in cantidades.items() if n <= 0]
+        poner = {pid: n for pid, n in cantidades.items() if n > 0}
+        with transaction.atomic():
+            if quitar:
+                CartItem.objects.filter(cart_id=cart_id, product_id__in=quitar).delete()
+            if poner:
+                CartItem.objects.bulk_create(
+                    [CartItem(cart_id=cart_id, product_id=pid, cantidad=n) for pid, n in poner.items()],
+                    update_conflicts=True, unique_fields=["cart", "product"], update_fields=["cantidad"],
+                )
+            for pid in quitar:
+                items.pop(pid, None)
+            items.update(poner)
+            self._guardado(items)
+
+    def vaciar(self):
+        if not self.items():
+            return
+        with transaction.atomic():
+            CartItem.objects.filter(cart_id=self._id).delete()
+            self._guardado({})
+
+    # ────────── revalidación ──────────
+
+    def revalidar(self, ajustar=False):
+        """Líneas con precio, stock y estado actuales, en una sola consulta.
+
+        El stock que el carrito ya reservó al comprar se suma al disponible.
+        Los productos que ya no existen se quitan del carrito. Con `ajustar`
+        también se guardan las cantidades corregidas (stock insuficiente o
+        producto inactivo), para que el aviso se muestre una sola vez.
+        """
+        items = self.items()
+        productos = Product.objects.only("id", "name", "price", "stock", "is_active", "imagen").in_bulk(items)
+        faltantes = [pid for pid in items if pid not in productos]
+        if faltantes:
+            with transaction.atomic():
+                CartItem.objects.filter(cart_id=self._id, product_id__in=faltantes).delete()
+                for pid in faltantes:
+                    del items[pid]
+                self._guardado(items)
+        reservado = inventario.reservado_por_carrito(self._id) if items else {}
+        lineas = [
+            LineaCarrito(pid, cantidad, productos[pid], reservado.get(pid, 0))
+            for pid, cantidad in items.items()
+        ]
+        if ajustar:
+            for linea in lineas:
+                if linea.problema:
+                    self.fijar(linea.producto_id, linea.cantidad)
+        return ResumenCarrito(lineas, self.version)
+
+    # ────────── respuestas AJAX ──────────
+
+    def delta(self, resumen, producto_ids=()):
+        """JSON compacto con las líneas que cambiaron y los totales nuevos."""
+        por_id = {linea.producto_id: linea for linea in resumen.lineas}
+        return {
+            "ok": True,
+            "version": resumen.version,
+            "lineas": [_linea_json(por_id.get(int(pid)), int(pid)) for pid in producto_ids],
+            "total": str(resumen.total),
+            "total_items": resumen.total_items,
+            "productos": len(resumen),
+            "problemas": [_linea_json(linea, linea.producto_id) for linea in resumen.problemas],
+        }
+
+    def fragmento(self, request):
+        """HTML del carrito desplegable, cacheado por versión de carrito y de catálogo."""
+        clave = None
+        if self._id is not None:
+            clave = f"carrito:html:{self._id}:{self.version}:{version_catalogo()}:{get_language()}"
+            html = cache.get(clave)
+            if html is not None:
+                return html
+        resumen = self.revalidar()
+        html = render_to_string("carrito/cart_items.html", {
+            "carrito": resumen,
+            "total": resumen.total,
+        }, request=request)
+        if clave is not None:
+            cache.set(clave, html, TIMEOUT)
+        return html
+
+    # ────────── sesión ──────────
+
+    def _migrar_sesion_anterior(self):
+        anterior = self.session.get(CLAVE_SESION_ANTERIOR)
+        if anterior is None:
+            return
+        del self.session[CLAVE_SESION_ANTERIOR]
+        if not isinstance(anterior, dict):
+            return
+        for producto_id, item in anterior.items():
+            try:
+                self.agregar(int(producto_id), int(item.get("cantidad", 1)))
+            except (TypeError, ValueError, AttributeError):
+                continue
+
+
+def fusionar_al_iniciar_sesion(request, user):
+    """Pasa el carrito anónimo de la sesión al carrito del usuario."""
+    anonimo_id = request.session.get(CLAVE_SESION)
+    propio = Cart.objects.filter(user=user).values_list("id", flat=True).first()
+    if anonimo_id is None or anonimo_id == propio:
+        if propio is not None:
+            request.session[CLAVE_SESION] = propio
+        return
+    if not Cart.objects.filter(pk=anonimo_id, user__isnull=True).exists():
+        request.session.pop(CLAVE_SESION, None)
+        if propio is not None:
+            request.session[CLAVE_SESION] = propio
+        return
+
+    with transaction.atomic():
+        if propio is None:
+            # Sin carrito previo: el anónimo pasa a ser el del usuario
+            Cart.objects.filter(pk=anonimo_id).update(user=user, version=F("version") + 1)
+            propio = anonimo_id
+        else:
+            anonimos = CartItem.objects.filter(cart_id=anonimo_id).values_list("product_id", "cantidad")
+            existentes = dict(CartItem.objects.filter(cart_id=propio).values_list("product_id", "cantidad"))
+            nuevos = []
+            for producto_id, cantidad in anonimos:
+                if producto_id in existentes:
+                    CartItem.objects.filter(cart_id=propio, product_id=producto_id).update(
+                        cantidad=F("cantidad") + cantidad
+                    )
+                else:
+                    nuevos.append(CartItem(cart_id=propio, product_id=producto_id, cantidad=cantidad))
+            CartItem.objects.bulk_create(nuevos)
+            Cart.objects.filter(pk=anonimo_id).delete()
+            Cart.objects.filter(pk=propio).update(version=F("version") + 1, actualizado=timezone.now())
+    cache.delete_many([_clave(anonimo_id), _clave(propio)])
+    request.session[CLAVE_SESION] = propio
@@ -0,0 +1,74 @@
+"""Filtros del catálogo público (`home`).
+
+Centraliza la lectura de los parámetros GET y su traducción a un queryset,
+para que la vista, las facetas y las cachés usen exactamente los mismos
+criterios.
+"""
+from typing import Iterable, Mapping
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from ..models import CatalogVersion, Product
+from .search import buscar_productos
+
+FILTROS_CATALOGO = ("q", "material", "color", "price_min", "price_max")
+VERSION_KEY = "catalogo:version"
+# Cada proceso vuelve a leer la versión de la base al menos cada 30 segundos
+VERSION_TIMEOUT = 30
+
+
+def filtros_desde_query(params: Mapping) -> dict:
+    """Devuelve los filtros del catálogo normalizados (texto sin espacios extremos)."""
+    return {nombre: (params.get(nombre) or "").strip() for nombre in FILTROS_CATALOGO}
+
+
+def productos_catalogo():
+    """Productos visibles en el catálogo, del más reciente al más antiguo."""
+    return Product.objects.filter(is_active=True).order_by("-created_at", "-id")
+
+
+def filtrar_catalogo(queryset, filtros: Mapping, excluir: Iterable[str] = ()):
+    """Aplica `filtros` a `queryset`, omitiendo los nombrados en `excluir`."""
+    excluir = set(excluir)
+
+    def valor(nombre):
+        return "" if nombre in excluir else filtros.get(nombre, "")
+
+    if valor("q"):
+        queryset = buscar_productos(queryset, valor("q"))
+    if valor("material"):
+        queryset = queryset.filter(material=valor("material"))
+    if valor("color"):
+        queryset = queryset.filter(color=valor("color"))
+    if valor("price_min"):
+        queryset = queryset.filter(price__gte=valor("price_min"))
+    if valor("price_max"):
+        queryset = queryset.filter(price__lte=valor("price_max"))
+    return queryset
+
+
+def version_catalogo() -> int:
+    """Número que cambia con cada alta, cambio o baja de un producto.
+
+    Sirve para armar claves de caché de cosas derivadas de los productos
+    (precios, stock, nombres) sin tener que borrarlas una por una. Vive en la
+    tabla `CatalogVersion`, así no vuelve a empezar al reiniciar (los reportes
+    guardados en disco dependen de eso); la caché solo evita leerla siempre.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = CatalogVersion.objects.values_list("version", flat=True).first() or 0
+        cache.set(VERSION_KEY, version, VERSION_TIMEOUT)
+    return version
+
+
+def tocar_catalogo():
+    if not CatalogVersion.objects.filter(pk=1).update(version=F("version") + 1):
+        try:
+            with transaction.atomic():
+                CatalogVersion.objects.create(pk=1, version=1)
+        except IntegrityError:
+            CatalogVersion.objects.filter(pk=1).update(version=F("version") + 1)
+    cache.delete(VERSION_KEY)
@@ -0,0 +1,81 @@
+"""Estadísticas de inventario por vendedor (`SellerStats`).
+
+El panel "Mis productos" muestra cuántos productos tiene el vendedor,
+cuántos están activos, cuántos sin stock y el valor del inventario. En vez
+de contarlos en cada visita, se guardan en una fila por vendedor que se
+lee por clave primaria.
+
+En SQLite la fila la mantienen triggers sobre `productos_product` (creados
+en las migraciones 0013 y 0014): cada alta, baja o cambio de stock, precio,
+estado o vendedor suma o resta su diferencia en el mismo statement. Así
+también cuentan los `QuerySet.update` (reservas de stock, acciones masivas,
+admin) que no disparan señales. En otras bases se recalcula la fila del
+vendedor desde las señales de `Product`.
+
+`reconciliar` recalcula todo desde la tabla de productos y corrige lo que
+no coincida. El comando `reconciliar_estadisticas` la corre periódicamente.
+"""
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from ..models import Product, SellerStats
+
+CAMPOS = ("productos", "activos", "sin_stock", "valor_inventario")
+
+
+def _con_triggers(conn=None) -> bool:
+    return (conn or connection).vendor == "sqlite"
+
+
+def estadisticas_de(user) -> SellerStats:
+    """Fila del vendedor (en cero si todavía no tiene productos)."""
+    return SellerStats.objects.filter(seller_id=user.pk).first() or SellerStats(seller_id=user.pk)
+
+
+def reconciliar(seller_ids: Optional[Iterable[int]] = None) -> int:
+    """Recalcula las filas desde `Product` y devuelve cuántas estaban mal.
+
+    Sin `seller_ids` revisa todos los vendedores. Empieza escribiendo (borra
+    las filas de quien ya no tiene productos): en SQLite eso toma el bloqueo
+    de escritura antes de leer, así ningún cambio de producto se cuela entre
+    el cálculo y la corrección.
+    """
+    productos = Product.objects.order_by()
+    filas = SellerStats.objects.all()
+    if seller_ids is not None:
+        seller_ids = list(seller_ids)
+        productos = productos.filter(seller_id__in=seller_ids)
+        filas = filas.filter(seller_id__in=seller_ids)
+    valor = ExpressionWrapper(F("price") * F("stock"), output_field=DecimalField(max_digits=16, decimal_places=2))
+
+    with transaction.atomic():
+        sobrantes = filas.exclude(seller_id__in=Product.objects.values("seller_id")).delete()[0]
+        calculadas = productos.values("seller_id").annotate(
+            productos=Count("pk"),
+            activos=Count("pk", filter=Q(is_active=True, stock__gt=0)),
+            sin_stock=Count("pk", filter=Q(stock=0)),
+            valor_inventario=Coalesce(Sum(valor), Decimal("0")),
+        )
+        actuales = {s.seller_id: s for s in filas}
+        corregir = []
+        for fila in calculadas:
+            actual = actuales.get(fila["seller_id"])
+            if actual is None or any(getattr(actual, c) != fila[c] for c in CAMPOS):
+                corregir.append(SellerStats(**fila))
+        SellerStats.objects.bulk_create(
+            corregir, update_conflicts=True, unique_fields=["seller"], update_fields=list(CAMPOS),
+        )
+    return sobrantes + len(corregir)
+
+
+def al_cambiar_producto(seller_ids: Iterable[int]):
+    """Sin triggers (otras bases) se recalcula la fila de los vendedores tocados."""
+    if _con_triggers():
+        return
+    seller_ids = {s for s in seller_ids if s is not None}
+    if seller_ids:
+        transaction.on_commit(lambda: reconciliar(seller_ids))
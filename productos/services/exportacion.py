@@ -0,0 +1,43 @@
+"""Exportación del catálogo en streaming.
+
+Las filas salen de la base con `QuerySet.iterator(chunk_size=...)` y cada
+generador las convierte en pedazos de bytes que `StreamingHttpResponse` va
+enviando: ni la lista de filas ni el archivo completo quedan en memoria.
+"""
+from typing import Iterator, Optional
+
+from django.http import StreamingHttpResponse
+
+from ..models import Product
+from .reporting import ReportGenerator
+
+COLUMNAS_PRODUCTO = (
+    "name", "price", "description", "category", "material", "color", "stock", "created_at", "seller__username",
+)
+CHUNK_SIZE = 2000
+
+
+def filas_productos(queryset=None, chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """Filas del reporte de productos, leídas de a `chunk_size` desde la base."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    for r in queryset.order_by("pk").values_list(*COLUMNAS_PRODUCTO).iterator(chunk_size=chunk_size):
+        name, price, description, category, material, color, stock, created_at, seller = r
+        yield {
+            "name": name,
+            "price": price,
+            "description": description or "",
+            "category": category or "",
+            "material": material or "",
+            "color": color or "",
+            "stock": stock or 0,
+            # convertir created_at a ISO string para evitar problemas de serialización
+            "created_at": created_at.isoformat() if created_at else "",
+            "seller_username": seller or "",
+        }
+
+
+def respuesta_reporte(generator: ReportGenerator, rows, filename: Optional[str] = None):
+    """StreamingHttpResponse que descarga el reporte a medida que se genera."""
+    response = StreamingHttpResponse(generator.stream(rows), content_type=generator.content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename or generator.filename()}"'
+    return response
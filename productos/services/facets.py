@@ -0,0 +1,162 @@
+"""Facetas del catálogo (material, color, categoría y rangos de precio).
+
+Los conteos globales viven en la caché de Django y las señales de `Product`
+los descartan solo cuando un producto cambia de valores de faceta (se
+recalculan en la próxima lectura), así que el menú de filtros de `home` no
+consulta la base de datos en el caso común. No se ajustan en el lugar: leer,
+sumar y volver a guardar el diccionario pierde cambios cuando dos procesos
+guardan productos a la vez.
+
+Los conteos acotados a un filtro se calculan con un GROUP BY por faceta y se
+guardan por versión: cualquier cambio de producto sube la versión y los deja
+obsoletos.
+"""
+import hashlib
+import json
+from decimal import Decimal
+from typing import Mapping
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from ..models import Product
+from .catalogo import filtrar_catalogo, productos_catalogo
+
+FACETAS = ("material", "color", "category")
+
+# (etiqueta, mínimo inclusivo, máximo exclusivo)
+RANGOS_PRECIO = (
+    ("0-20000", 0, 20000),
+    ("20000-50000", 20000, 50000),
+    ("50000-100000", 50000, 100000),
+    ("100000+", 100000, None),
+)
+
+CACHE_KEY = "facetas:globales"
+VERSION_KEY = "facetas:version"
+
+
+def _timeout():
+    # Red de seguridad para cambios que no pasan por señales (p. ej. update())
+    return getattr(settings, "FACETAS_TIMEOUT", 60 * 60)
+
+
+def rango_precio(precio):
+    """Etiqueta del rango de precio al que pertenece `precio`."""
+    if precio is None:
+        return None
+    precio = Decimal(precio)
+    for etiqueta, minimo, maximo in RANGOS_PRECIO:
+        if precio >= minimo and (maximo is None or precio < maximo):
+            return etiqueta
+    return None
+
+
+def _conteos_precio(queryset):
+    agregados = {
+        etiqueta: Count(
+            "id",
+            filter=Q(price__gte=minimo) & (Q(price__lt=maximo) if maximo is not None else Q()),
+        )
+        for etiqueta, minimo, maximo in RANGOS_PRECIO
+    }
+    conteos = queryset.aggregate(**agregados)
+    return {etiqueta: n for etiqueta, n in conteos.items() if n}
+
+
+def _conteos_campo(queryset, campo):
+    filas = (
+        queryset.exclude(**{campo: ""})
+        .order_by()
+        .values_list(campo)
+        .annotate(n=Count("id"))
+    )
+    return dict(filas)
+
+
+def recalcular_facetas():
+    """Calcula los conteos globales desde la base de datos y los guarda en caché."""
+    base = Product.objects.filter(is_active=True)
+    facetas = {campo: _conteos_campo(base, campo) for campo in FACETAS}
+    facetas["precio"] = _conteos_precio(base)
+    cache.set(CACHE_KEY, facetas, _timeout())
+    return facetas
+
+
+def obtener_facetas():
+    """Conteos globales de productos activos (desde caché si es posible)."""
+    facetas = cache.get(CACHE_KEY)
+    if facetas is None:
+        facetas = recalcular_facetas()
+    return facetas
+
+
+def _version():
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def invalidar_facetas_filtradas():
+    """Deja obsoletos los conteos acotados a filtros."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def descartar_facetas():
+    """Para cambios hechos por SQL: los conteos se recalculan en la próxima lectura."""
+    cache.delete(CACHE_KEY)
+    invalidar_facetas_filtradas()
+
+
+def facetas_para(filtros: Mapping):
+    """Conteos de cada faceta dentro del resultado filtrado.
+
+    Como en una búsqueda facetada, cada faceta ignora su propio filtro para
+    que el usuario vea las alternativas disponibles.
+    """
+    activos = {k: v for k, v in filtros.items() if v}
+    if not activos:
+        return obtener_facetas()
+
+    firma = hashlib.md5(json.dumps(activos, sort_keys=True).encode("utf-8")).hexdigest()
+    key = f"facetas:{_version()}:{firma}"
+    facetas = cache.get(key)
+    if facetas is not None:
+        return facetas
+
+    base = productos_catalogo()
+    facetas = {
+        campo: _conteos_campo(filtrar_catalogo(base, activos, excluir=(campo,)), campo)
+        for campo in FACETAS
+    }
+    facetas["precio"] = _conteos_precio(
+        filtrar_catalogo(base, activos, excluir=("price_min", "price_max"))
+    )
+    cache.set(key, facetas, _timeout())
+    return facetas
+
+
+def valores_de(facetas, campo):
+    """Lista ordenada de (valor, cantidad) para pintar un desplegable."""
+    return sorted(facetas.get(campo, {}).items(), key=lambda item: str(item[0]).lower())
+
+
+# ────────── actualización incremental ──────────
+
+def valores_faceta(producto):
+    """Valores con los que `producto` cuenta en las facetas (None si no cuenta)."""
+    if not producto.is_active:
+        return None
+    valores = {campo: getattr(producto, campo) or "" for campo in FACETAS}
+    valores["precio"] = rango_precio(producto.price)
+    return valores
+
+
+def aplicar_cambio(anteriores, nuevos):
+    """Un producto pasó de `anteriores` a `nuevos`: descarta lo que quedó desactualizado."""
+    # Los conteos filtrados dependen también de nombre y descripción (búsqueda)
+    invalidar_facetas_filtradas()
+    if anteriores != nuevos:
+        cache.delete(CACHE_KEY)
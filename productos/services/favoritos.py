@@ -0,0 +1,116 @@
+"""Favoritos de productos.
+
+Con sesión iniciada viven en la tabla `Favorite` (un registro por usuario y
+producto); sin sesión, como lista de ids en la sesión, que se pasa a la
+tabla al iniciar sesión. Los listados piden solo los favoritos de los
+productos que muestran, en una consulta, como conjunto.
+"""
+from typing import Iterable, Optional, Set
+
+from django.core.cache import cache
+
+from ..models import Favorite, Product
+
+CLAVE_SESION = "favoritos"
+# El contador se invalida al marcar; el timeout cubre borrados en cascada
+TIMEOUT_CANTIDAD = 300
+
+
+def _usuario(request):
+    user = getattr(request, "user", None)
+    return user if user is not None and user.is_authenticated else None
+
+
+def _ids_sesion(request) -> Set[int]:
+    ids = set()
+    for valor in request.session.get(CLAVE_SESION) or []:
+        try:
+            ids.add(int(valor))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def _clave_cantidad(user_id):
+    return f"favoritos:cantidad:{user_id}"
+
+
+def cantidad(request) -> int:
+    """Cuántos favoritos tiene el visitante (para el contador de la barra)."""
+    user = _usuario(request)
+    if user is None:
+        return len(_ids_sesion(request))
+    return cache.get_or_set(
+        _clave_cantidad(user.pk), lambda: Favorite.objects.filter(user=user).count(), TIMEOUT_CANTIDAD,
+    )
+
+
+def ids_favoritos(request, producto_ids: Optional[Iterable[int]] = None) -> Set[int]:
+    """Ids favoritos del visitante, acotados a `producto_ids` si se dan."""
+    if producto_ids is not None:
+        producto_ids = list(producto_ids)
+        if not producto_ids:
+            return set()
+    user = _usuario(request)
+    if user is None:
+        ids = _ids_sesion(request)
+        return ids if producto_ids is None else ids & set(producto_ids)
+    qs = Favorite.objects.filter(user=user)
+    if producto_ids is not None:
+        qs = qs.filter(product_id__in=producto_ids)
+    return set(qs.values_list("product_id", flat=True))
+
+
+def marcar(request, producto_id: int, favorito: Optional[bool] = None) -> bool:
+    """Deja el producto como favorito o no y devuelve el estado final.
+
+    Con `favorito` explícito la operación es idempotente (reintentos seguros);
+    sin él alterna: un DELETE y, si no había nada que borrar, un INSERT que
+    ignora el conflicto con la restricción única.
+    """
+    producto_id = int(producto_id)
+    user = _usuario(request)
+    if user is None:
+        ids = _ids_sesion(request)
+        if favorito is None:
+            favorito = producto_id not in ids
+        if favorito and producto_id not in ids and not Product.objects.filter(pk=producto_id).exists():
+            raise Product.DoesNotExist(producto_id)
+        nuevos = ids | {producto_id} if favorito else ids - {producto_id}
+        if nuevos != ids:
+            request.session[CLAVE_SESION] = sorted(nuevos)
+        return favorito
+
+    try:
+        return _marcar_en_tabla(user, producto_id, favorito)
+    finally:
+        cache.delete(_clave_cantidad(user.pk))
+
+
+def _marcar_en_tabla(user, producto_id, favorito):
+    if favorito is None:
+        borrados, _detalle = Favorite.objects.filter(user=user, product_id=producto_id).delete()
+        if borrados:
+            return False
+        favorito = True
+    if favorito:
+        # La FK puede validarse recién al confirmar la transacción: se revisa antes
+        if not Product.objects.filter(pk=producto_id).exists():
+            raise Product.DoesNotExist(producto_id)
+        Favorite.objects.bulk_create([Favorite(user=user, product_id=producto_id)], ignore_conflicts=True)
+    else:
+        Favorite.objects.filter(user=user, product_id=producto_id).delete()
+    return favorito
+
+
+def fusionar_al_iniciar_sesion(request, user):
+    """Pasa los favoritos anónimos de la sesión a la tabla del usuario."""
+    ids = _ids_sesion(request)
+    if not ids:
+        return
+    existentes = Product.objects.filter(pk__in=ids).values_list("pk", flat=True)
+    Favorite.objects.bulk_create(
+        [Favorite(user=user, product_id=pk) for pk in existentes], ignore_conflicts=True,
+    )
+    cache.delete(_clave_cantidad(user.pk))
+    del request.session[CLAVE_SESION]
@@ -0,0 +1,128 @@
+"""Caché del HTML de la grilla de productos de `home`.
+
+La grilla es igual para todos los visitantes con los mismos filtros, así que
+se guarda ya renderizada con una clave de filtros normalizados + cursor +
+idioma. Lo que depende del usuario (favoritos, carrito) queda fuera del
+fragmento.
+
+La invalidación es por segmentos: una página filtrada por material usa la
+versión de ese material, una filtrada por color la de ese color y el resto
+la versión general. Al guardar o borrar un producto solo se suben las
+versiones de los segmentos donde estaba o quedó.
+
+Las versiones están en la tabla `GridVersion` y no en la caché: con una
+caché por proceso (LocMem) cada proceso tiene sus propias grillas, pero un
+cambio hecho en cualquiera de ellos las invalida en todos.
+"""
+import hashlib
+import json
+import time
+from typing import Callable, Mapping, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from ..models import GridVersion
+
+PREFIJO = "grid"
+METRICAS = ("hits", "misses", "render_ms")
+
+
+def _timeout():
+    # Tope de vida para la etiqueta "Nuevo", que depende de la fecha
+    return getattr(settings, "GRID_CACHE_TIMEOUT", 60 * 60)
+
+
+def _segmento(filtros: Mapping) -> str:
+    if filtros.get("material"):
+        return f"material:{filtros['material']}"
+    if filtros.get("color"):
+        return f"color:{filtros['color']}"
+    return "todos"
+
+
+def _version(segmento: str) -> int:
+    return GridVersion.objects.filter(segmento=segmento).values_list("version", flat=True).first() or 0
+
+
+def clave_grid(filtros: Mapping, cursor: Optional[str], idioma: str) -> str:
+    """Clave de la grilla. `cursor` debe venir normalizado (`KeysetPaginator.normalizar`)."""
+    activos = {k: v for k, v in filtros.items() if v}
+    firma = hashlib.md5(
+        json.dumps([activos, cursor or ""], sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    segmento = _segmento(activos)
+    return f"{PREFIJO}:{idioma}:{_version(segmento)}:{firma}"
+
+
+def obtener_grid(filtros: Mapping, cursor: Optional[str], idioma: str, renderizar: Callable[[], dict]):
+    """Devuelve (grilla, hit, ms). Si no está en caché llama a `renderizar()`.
+
+    `renderizar()` devuelve {"html": ..., "ids": [...]}: el HTML y los ids de
+    los productos de la página, para resolver favoritos sin volver a consultar.
+    """
+    inicio = time.perf_counter()
+    clave = clave_grid(filtros, cursor, idioma)
+    grilla = cache.get(clave)
+    hit = grilla is not None
+    if not hit:
+        grilla = renderizar()
+        cache.set(clave, grilla, _timeout())
+    ms = (time.perf_counter() - inicio) * 1000
+    _registrar(hit, ms)
+    return grilla, hit, ms
+
+
+def invalidar(anteriores: Optional[Mapping], nuevos: Optional[Mapping]):
+    """Sube las versiones de los segmentos afectados por un cambio de producto.
+
+    `anteriores`/`nuevos` son los valores de faceta del producto (None si no
+    estaba/no está visible en el catálogo).
+    """
+    if anteriores is None and nuevos is None:
+        return
+    segmentos = {"todos"}
+    for valores in (anteriores, nuevos):
+        if not valores:
+            continue
+        for campo in ("material", "color"):
+            if valores.get(campo):
+                segmentos.add(f"{campo}:{valores[campo]}")
+    GridVersion.objects.bulk_create(
+        [GridVersion(segmento=s) for s in segmentos], ignore_conflicts=True,
+    )
+    GridVersion.objects.filter(segmento__in=segmentos).update(version=F("version") + 1)
+
+
+# ────────── métricas ──────────
+
+def _registrar(hit: bool, ms: float):
+    _incrementar("hits" if hit else "misses", 1)
+    if not hit:
+        _incrementar("render_ms", int(round(ms)))
+
+
+def _incrementar(nombre, cantidad):
+    clave = f"{PREFIJO}:metricas:{nombre}"
+    try:
+        cache.incr(clave, cantidad)
+    except ValueError:
+        cache.add(clave, 0, None)
+        cache.incr(clave, cantidad)
+
+
+def metricas() -> dict:
+    """Hits, misses, tasa de aciertos y tiempo medio de render en milisegundos."""
+    valores = {m: cache.get(f"{PREFIJO}:metricas:{m}", 0) for m in METRICAS}
+    total = valores["hits"] + valores["misses"]
+    return {
+        "hits": valores["hits"],
+        "misses": valores["misses"],
+        "hit_rate": round(valores["hits"] / total, 4) if total else None,
+        "render_ms_promedio": round(valores["render_ms"] / valores["misses"], 2) if valores["misses"] else None,
+    }
+
+
+def reiniciar_metricas():
+    cache.delete_many([f"{PREFIJO}:metricas:{m}" for m in METRICAS])
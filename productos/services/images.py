@@ -0,0 +1,388 @@
+"""Procesamiento de imágenes fuera del request.
+
+`Product.save` y `Profile.save` guardan el archivo original tal cual y
+encolan un `ImageJob`. El comando `procesar_imagenes` reclama trabajos de la
+cola (tabla en la base de datos), convierte a JPEG, redimensiona y, cuando la
+versión optimizada está lista, la pone en el campo y borra el original.
+
+Los archivos se guardan por contenido (ver `productos.storage`) y pueden
+estar compartidos, así que solo se borran los que ya nadie referencia.
+"""
+import logging
+import os
+import posixpath
+from datetime import timedelta
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, features
+
+from ..models import EstadoImagen, ImageJob
+from ..storage import hash_contenido
+from ..validators import max_pixeles
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = 3
+
+# (app_label.modelo, campo) -> tamaño máximo, campo de estado y, si aplica,
+# prefijo de los campos de dimensiones/versiones (<prefijo>_ancho, ...)
+ESPECIFICACIONES = {
+    ("productos.product", "imagen"): {"max_size": (1200, 1200), "estado": "imagen_estado", "versiones": "imagen"},
+    ("productos.profile", "foto_perfil"): {"max_size": (500, 500), "estado": "foto_estado"},
+}
+
+# Anchos de las versiones: tarjeta (400), tarjeta retina / detalle (800) y detalle retina (1200)
+ANCHOS_VERSIONES = (400, 800, 1200)
+CARPETA_VERSIONES = "versiones"
+OPCIONES_FORMATO = {
+    "avif": {"format": "AVIF", "quality": 60, "speed": 8},
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+EXTENSIONES = {"avif": "avif", "webp": "webp", "jpeg": "jpg"}
+
+
+def _especificacion(instance, campo):
+    return ESPECIFICACIONES[(instance._meta.label_lower, campo)]
+
+
+def abrir_reducida(archivo, max_size):
+    """Abre una imagen decodificando lo menos posible para llegar a `max_size`.
+
+    En JPEG `draft` hace que el decodificador entregue la imagen ya escalada
+    (1/2, 1/4 u 1/8), así una foto de 48 MP nunca se carga completa. Se
+    rechazan las que superan el presupuesto de píxeles.
+    """
+    img = Image.open(archivo)
+    if img.width * img.height > max_pixeles():
+        raise ValueError(f"La imagen supera el máximo de píxeles ({img.width}x{img.height})")
+    if img.format == "JPEG":
+        img.draft("RGB", max_size)
+    return img
+
+
+def comprimir_imagen(archivo, max_size, quality=85):
+    """Devuelve un ContentFile JPEG redimensionado a `max_size` como máximo."""
+    archivo.seek(0)
+    img = abrir_reducida(archivo, max_size)
+
+    # Reducir antes de convertir: convertir primero decodifica todo el bitmap
+    if img.mode == 'P':
+        img = img.convert('RGBA')
+    img.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    # Convertir a RGB si es necesario (para PNG con transparencia)
+    if img.mode in ('RGBA', 'LA'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        img = background
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    output = BytesIO()
+    img.save(output, format='JPEG', quality=quality, optimize=True)
+    return ContentFile(output.getvalue())
+
+
+def formatos_versiones():
+    """Formatos que este Pillow puede escribir, del más al menos eficiente."""
+    formatos = []
+    if features.check("avif"):
+        formatos.append("avif")
+    if features.check("webp"):
+        formatos.append("webp")
+    formatos.append("jpeg")
+    return formatos
+
+
+def nombres_de_versiones(versiones):
+    return [nombre for lista in (versiones or {}).values() for _ancho, nombre in lista]
+
+
+def _versiones_de(instance, spec):
+    if not spec.get("versiones"):
+        return []
+    return nombres_de_versiones(getattr(instance, f"{spec['versiones']}_versiones"))
+
+
+def campos_archivo():
+    """(modelo, campo) de todos los FileField/ImageField del proyecto."""
+    for modelo in apps.get_models():
+        for field in modelo._meta.get_fields():
+            if isinstance(field, models.FileField):
+                yield modelo, field.name
+
+
+def _modelos_con_versiones():
+    for (label, _campo), spec in ESPECIFICACIONES.items():
+        if spec.get("versiones"):
+            yield apps.get_model(label), f"{spec['versiones']}_versiones"
+
+
+def archivos_en_uso(nombres=None):
+    """Nombres de media referenciados por algún registro.
+
+    Con `nombres` solo se consulta por esos (para borrar al reemplazar);
+    sin él se devuelven todos (para `limpiar_media`).
+    """
+    if nombres is not None:
+        nombres = list(nombres)
+        if not nombres:
+            return set()
+    usados = set()
+    for modelo, campo in campos_archivo():
+        qs = modelo._base_manager.exclude(**{campo: ""}).exclude(**{f"{campo}__isnull": True})
+        if nombres is not None:
+            qs = qs.filter(**{f"{campo}__in": nombres})
+        usados.update(qs.values_list(campo, flat=True).iterator())
+
+    for modelo, campo in _modelos_con_versiones():
+        qs = modelo._base_manager.exclude(**{campo: {}})
+        if nombres is not None:
+            condicion = Q()
+            for nombre in nombres:
+                condicion |= Q(**{f"{campo}__icontains": nombre})
+            qs = qs.filter(condicion)
+        for versiones in qs.values_list(campo, flat=True).iterator():
+            usados.update(nombres_de_versiones(versiones))
+
+    # Originales que todavía esperan en la cola
+    en_cola = ImageJob.objects.filter(estado__in=[EstadoImagen.PENDIENTE, EstadoImagen.PROCESANDO])
+    if nombres is not None:
+        en_cola = en_cola.filter(archivo__in=nombres)
+    usados.update(en_cola.values_list("archivo", flat=True))
+    return usados if nombres is None else usados & set(nombres)
+
+
+def liberar_archivos(storage, nombres):
+    """Borra de `nombres` los que ningún registro usa. Devuelve los borrados."""
+    sobrantes = set(nombres) - archivos_en_uso(nombres)
+    for nombre in sobrantes:
+        storage.delete(nombre)
+    return sobrantes
+
+
+def generar_versiones(field_file):
+    """Crea las versiones responsive de `field_file`.
+
+    Devuelve (ancho, alto, versiones) donde versiones es
+    {"jpeg": [[400, nombre], [800, nombre], ...], "webp": [...], ...}.
+    Nunca se agranda: los anchos mayores al original se omiten y, si el
+    original es más chico que todos, se usa su propio ancho.
+    """
+    storage = field_file.storage
+    directorio = posixpath.dirname(field_file.name)
+    base = os.path.splitext(os.path.basename(field_file.name))[0]
+
+    with field_file.open("rb") as archivo:
+        img = abrir_reducida(archivo, (max(ANCHOS_VERSIONES), max(ANCHOS_VERSIONES)))
+        img.load()
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    ancho, alto = img.size
+
+    anchos = [a for a in ANCHOS_VERSIONES if a <= ancho] or [ancho]
+    versiones = {formato: [] for formato in formatos_versiones()}
+    for destino in anchos:
+        copia = img if destino == ancho else img.resize(
+            (destino, max(1, round(alto * destino / ancho))), Image.Resampling.LANCZOS
+        )
+        for formato in versiones:
+            output = BytesIO()
+            copia.save(output, **OPCIONES_FORMATO[formato])
+            nombre = storage.save(
+                posixpath.join(directorio, CARPETA_VERSIONES, f"{base}-{destino}.{EXTENSIONES[formato]}"),
+                ContentFile(output.getvalue()),
+            )
+            versiones[formato].append([destino, nombre])
+    return ancho, alto, versiones
+
+
+def actualizar_versiones(instance, campo, spec=None):
+    """Regenera dimensiones y versiones del campo y devuelve los campos a guardar.
+
+    Las versiones anteriores no se borran: hay que pasarlas a
+    `liberar_archivos` después de guardar.
+    """
+    spec = spec or _especificacion(instance, campo)
+    prefijo = spec.get("versiones")
+    if not prefijo:
+        return []
+    field_file = getattr(instance, campo)
+    ancho, alto, versiones = generar_versiones(field_file)
+    setattr(instance, f"{prefijo}_ancho", ancho)
+    setattr(instance, f"{prefijo}_alto", alto)
+    setattr(instance, f"{prefijo}_versiones", versiones)
+    return [f"{prefijo}_ancho", f"{prefijo}_alto", f"{prefijo}_versiones"]
+
+
+def reutilizar_procesada(instance, campo):
+    """Prepara `instance.<campo>` recién subido antes de guardarlo.
+
+    Si ya hay un registro con esa misma imagen procesada, copia su resultado
+    (archivo, dimensiones y versiones) y devuelve True: no hace falta
+    encolar nada. Si no, la deja pendiente y devuelve False.
+    """
+    spec = _especificacion(instance, campo)
+    prefijo = spec.get("versiones")
+    setattr(instance, spec["estado"], EstadoImagen.PENDIENTE)
+    if not prefijo:
+        return False
+
+    digest = hash_contenido(getattr(instance, campo))
+    campos = [f"{prefijo}_ancho", f"{prefijo}_alto", f"{prefijo}_versiones"]
+    setattr(instance, f"{prefijo}_hash", digest)
+    previa = (
+        type(instance)._base_manager
+        .filter(**{f"{prefijo}_hash": digest, spec["estado"]: EstadoImagen.LISTA})
+        .exclude(**{campo: ""})
+        .values(campo, *campos)
+        .first()
+    )
+    if previa is None:
+        setattr(instance, f"{prefijo}_ancho", None)
+        setattr(instance, f"{prefijo}_alto", None)
+        setattr(instance, f"{prefijo}_versiones", {})
+        return False
+    setattr(instance, campo, previa[campo])
+    for nombre in campos:
+        setattr(instance, nombre, previa[nombre])
+    setattr(instance, spec["estado"], EstadoImagen.LISTA)
+    return True
+
+
+def encolar_imagen(instance, campo):
+    """Crea el trabajo de compresión para `instance.<campo>` recién subido."""
+    return ImageJob.objects.create(
+        content_type=ContentType.objects.get_for_model(instance),
+        object_id=instance.pk,
+        campo=campo,
+        archivo=getattr(instance, campo).name,
+    )
+
+
+def encolar_imagenes(instances, campo):
+    """Como `encolar_imagen` para muchos registros, en un solo INSERT."""
+    if not instances:
+        return []
+    content_type = ContentType.objects.get_for_model(instances[0])
+    return ImageJob.objects.bulk_create([
+        ImageJob(content_type=content_type, object_id=i.pk, campo=campo, archivo=getattr(i, campo).name)
+        for i in instances
+    ])
+
+
+def minutos_procesando() -> int:
+    # Un trabajo 'procesando' sin tocar hace más que esto quedó de un worker caído
+    return getattr(settings, "IMAGENES_MINUTOS_PROCESANDO", 10)
+
+
+def reclamar_trabajo():
+    """Marca como 'procesando' el trabajo pendiente más antiguo y lo devuelve.
+
+    También retoma los que quedaron 'procesando' de un worker caído (sin
+    tocar hace `minutos_procesando()`); si ya agotaron `MAX_INTENTOS` pasan a
+    error. El UPDATE condicionado hace que dos workers no tomen el mismo.
+    """
+    vencido = timezone.now() - timedelta(minutes=minutos_procesando())
+    abandonados = ImageJob.objects.filter(
+        estado=EstadoImagen.PROCESANDO, actualizado__lt=vencido, intentos__gte=MAX_INTENTOS,
+    )
+    for job in abandonados:
+        job.error = "El worker no terminó el trabajo."
+        job.estado = EstadoImagen.ERROR
+        job.save(update_fields=["estado", "error", "actualizado"])
+        _marcar_error(job)
+    disponible = Q(estado=EstadoImagen.PENDIENTE) | Q(estado=EstadoImagen.PROCESANDO, actualizado__lt=vencido)
+    candidatos = ImageJob.objects.filter(disponible).order_by("id")
+    for job_id in candidatos.values_list("id", flat=True)[:10]:
+        tomado = ImageJob.objects.filter(disponible, pk=job_id).update(
+            estado=EstadoImagen.PROCESANDO,
+            intentos=F("intentos") + 1,
+            actualizado=timezone.now(),
+        )
+        if tomado:
+            return ImageJob.objects.get(pk=job_id)
+    return None
+
+
+def _marcar(instance, spec, estado):
+    setattr(instance, spec["estado"], estado)
+    instance.save(update_fields=[spec["estado"]])
+
+
+def _marcar_error(job):
+    """Muestra el error en el objeto del trabajo (si todavía existe)."""
+    try:
+        instance = job.content_type.get_object_for_this_type(pk=job.object_id)
+        _marcar(instance, _especificacion(instance, job.campo), EstadoImagen.ERROR)
+    except Exception:
+        pass
+
+
+def procesar_trabajo(job):
+    """Comprime la imagen del trabajo y la reemplaza en el modelo."""
+    modelo = job.content_type.model_class()
+    instance = modelo.objects.filter(pk=job.object_id).first()
+    field_file = getattr(instance, job.campo) if instance else None
+
+    if not field_file or field_file.name != job.archivo:
+        # Se borró el objeto o se cambió/quitó la imagen mientras esperaba
+        job.estado = EstadoImagen.LISTA
+        job.error = "obsoleto"
+        job.save(update_fields=["estado", "error", "actualizado"])
+        return
+
+    spec = _especificacion(instance, job.campo)
+    with field_file.open("rb") as original:
+        optimizada = comprimir_imagen(original, spec["max_size"])
+
+    nombre_original = field_file.name
+    anteriores = _versiones_de(instance, spec)
+    base = os.path.splitext(os.path.basename(nombre_original))[0]
+    field_file.save(f"{base}.jpg", optimizada, save=False)
+    campos = actualizar_versiones(instance, job.campo, spec)
+    setattr(instance, spec["estado"], EstadoImagen.LISTA)
+    instance.save(update_fields=[job.campo, spec["estado"], *campos])
+
+    job.estado = EstadoImagen.LISTA
+    job.error = ""
+    job.save(update_fields=["estado", "error", "actualizado"])
+
+    # El original y las versiones viejas pueden seguir en uso por otro registro
+    reemplazados = {nombre_original, *anteriores} - {field_file.name, *_versiones_de(instance, spec)}
+    liberar_archivos(field_file.storage, reemplazados)
+
+
+def ejecutar_trabajo(job):
+    """Procesa `job` registrando el error; reintenta hasta MAX_INTENTOS."""
+    try:
+        procesar_trabajo(job)
+        return True
+    except Exception as e:
+        logger.exception("Error procesando %s", job)
+        job.error = str(e)
+        job.estado = EstadoImagen.ERROR if job.intentos >= MAX_INTENTOS else EstadoImagen.PENDIENTE
+        job.save(update_fields=["estado", "error", "actualizado"])
+        if job.estado == EstadoImagen.ERROR:
+            _marcar_error(job)
+        return False
+
+
+def procesar_pendientes(limite=None):
+    """Procesa trabajos hasta vaciar la cola (o `limite`). Devuelve cuántos tomó."""
+    procesados = 0
+    while limite is None or procesados < limite:
+        job = reclamar_trabajo()
+        if job is None:
+            break
+        ejecutar_trabajo(job)
+        procesados += 1
+    return procesados
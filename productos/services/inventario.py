@@ -0,0 +1,172 @@
+"""Reservas de stock al comprar.
+
+Al confirmar el carrito se descuenta el stock de todos sus productos con un
+solo UPDATE condicional (`stock = stock - n WHERE stock >= n AND is_active`,
+con `n` por producto en un CASE): si no se actualizaron todas las filas se
+deshace la transacción y nada queda descontado. Así dos compradores que piden las
+últimas unidades a la vez no pueden pasarse del stock, sin leer el stock
+antes ni bloquear filas desde Python.
+
+Lo descontado queda como `StockReservation` con vencimiento: apartado
+mientras el comprador habla con el vendedor por WhatsApp. La venta se cierra
+fuera del sitio, así que el flujo es reservar y vencer. Al vencer, la reserva
+vuelve al stock, y si el vendedor concretó la venta ajusta su stock en "Mis
+productos". Las vencidas se devuelven en la misma transacción de cada compra
+que pide esos productos, así la corrección no depende de que corra
+`liberar_reservas`. El comando solo devuelve antes el stock de lo que nadie
+vuelve a pedir. Comprar de nuevo con el mismo carrito reemplaza sus reservas.
+
+`is_active` se mantiene en SQL: el mismo UPDATE apaga el producto cuando el
+stock llega a cero y lo vuelve a encender al devolver stock. En SQLite,
+además, un trigger (migración 0011) apaga cualquier producto que quede en
+cero por otra vía (`QuerySet.update`, el admin), que no pasa por la señal
+`pre_save`.
+"""
+from datetime import timedelta
+from typing import Mapping
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.utils import timezone
+
+from ..models import Product, StockReservation
+from . import facets, grid_cache
+from .catalogo import tocar_catalogo
+
+
+class StockInsuficiente(Exception):
+    """Algún producto del carrito no tiene stock para la cantidad pedida."""
+
+    def __init__(self, producto_id):
+        super().__init__(producto_id)
+        self.producto_id = producto_id
+
+
+def minutos_reserva() -> int:
+    return getattr(settings, "RESERVA_STOCK_MINUTOS", 15)
+
+
+# ────────── SQL ──────────
+
+def configurar_sqlite(conn):
+    """Modo WAL: las lecturas no bloquean a quien compra ni al revés."""
+    if conn.vendor != "sqlite" or not getattr(settings, "SQLITE_WAL", False):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+
+
+def _descontar(cantidades: Mapping[int, int]) -> bool:
+    """Un solo UPDATE para todo el carrito; True si alcanzó para todos."""
+    pedido = Case(
+        *[When(pk=pid, then=Value(n)) for pid, n in cantidades.items()],
+        output_field=IntegerField(),
+    )
+    actualizados = Product.objects.filter(pk__in=cantidades, is_active=True, stock__gte=pedido).update(
+        stock=F("stock") - pedido,
+        # En el SET, `stock` es el valor anterior a este UPDATE
+        is_active=Case(When(stock=pedido, then=Value(False)), default=F("is_active")),
+    )
+    return actualizados == len(cantidades)
+
+
+def _sin_stock(cantidades: Mapping[int, int]):
+    for producto_id, cantidad in sorted(cantidades.items()):
+        if not Product.objects.filter(pk=producto_id, is_active=True, stock__gte=cantidad).exists():
+            return producto_id
+    return None
+
+
+def _devolver(reservas):
+    """Repone en un UPDATE el stock de las reservas del queryset dado.
+
+    Es la primera escritura de la transacción: en SQLite toma el bloqueo de
+    escritura antes de leer nada, así dos liberaciones no cuentan dos veces
+    la misma reserva.
+    """
+    suma = Subquery(
+        reservas.filter(product=OuterRef("pk")).order_by()
+        .values("product").annotate(total=Sum("cantidad")).values("total")
+    )
+    Product.objects.filter(pk__in=reservas.values("product")).update(
+        stock=F("stock") + suma,
+        # Un producto en cero estaba apagado por falta de stock: vuelve a mostrarse
+        is_active=Case(When(stock=0, then=Value(True)), default=F("is_active")),
+    )
+
+
+def _avisar_cambios(producto_ids):
+    """Las actualizaciones por SQL no disparan señales: se invalidan las cachés."""
+    if not producto_ids:
+        return
+    for material, color in Product.objects.filter(pk__in=producto_ids).values_list("material", "color"):
+        valores = {"material": material, "color": color}
+        grid_cache.invalidar(valores, valores)
+    # Puede haber cambiado qué productos están activos
+    facets.descartar_facetas()
+    tocar_catalogo()
+
+
+# ────────── reservas ──────────
+
+def reservado_por_carrito(cart_id) -> dict:
+    """{producto_id: cantidad} apartada por el carrito y aún vigente."""
+    if cart_id is None:
+        return {}
+    filas = (
+        StockReservation.objects.filter(cart_id=cart_id, vence__gt=timezone.now())
+        .values_list("product_id")
+        .annotate(total=Sum("cantidad"))
+        .order_by()
+    )
+    return dict(filas)
+
+
+def reservar(cart_id, cantidades: Mapping[int, int]):
+    """Descuenta el stock de {producto_id: cantidad} y lo deja reservado.
+
+    Todo o nada: lanza `StockInsuficiente` si algún producto no alcanza.
+    Las reservas previas del carrito se devuelven en la misma transacción.
+    """
+    cantidades = {int(pid): int(n) for pid, n in cantidades.items() if int(n) > 0}
+    ahora = timezone.now()
+    vence = ahora + timedelta(minutes=minutos_reserva())
+    try:
+        with transaction.atomic():
+            devueltas = set()
+            if cart_id is not None:
+                devueltas = _liberar(StockReservation.objects.filter(cart_id=cart_id))[1]
+            # Lo vencido de otros carritos sobre estos productos vuelve antes de descontar
+            if cantidades:
+                devueltas |= _liberar(
+                    StockReservation.objects.filter(product_id__in=cantidades, vence__lte=ahora)
+                )[1]
+            if cantidades and not _descontar(cantidades):
+                raise StockInsuficiente(None)
+            StockReservation.objects.bulk_create([
+                StockReservation(cart_id=cart_id, product_id=pid, cantidad=n, vence=vence)
+                for pid, n in cantidades.items()
+            ])
+    except StockInsuficiente:
+        # Ya se deshizo todo: se busca cuál faltó para avisarle al comprador
+        raise StockInsuficiente(_sin_stock(cantidades)) from None
+    _avisar_cambios(set(cantidades) | devueltas)
+    return vence
+
+
+def _liberar(reservas):
+    """Devuelve y borra `reservas` (dentro de una transacción). Retorna (cantidad, producto_ids)."""
+    _devolver(reservas)
+    producto_ids = set(reservas.values_list("product_id", flat=True))
+    return reservas.delete()[0], producto_ids
+
+
+def liberar_vencidas(ahora=None) -> int:
+    """Devuelve al stock las reservas vencidas. Retorna cuántas liberó."""
+    vencidas = StockReservation.objects.filter(vence__lte=ahora or timezone.now())
+    with transaction.atomic():
+        liberadas, producto_ids = _liberar(vencidas)
+    _avisar_cambios(producto_ids)
+    return liberadas
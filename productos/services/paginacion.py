@@ -0,0 +1,207 @@
+"""Paginación por cursor (keyset) para listados de productos.
+
+En lugar de `OFFSET` + `COUNT(*)` cada página filtra "después de la última
+fila vista" sobre las columnas de orden, así el costo no crece con la
+profundidad y puede resolverse con los índices compuestos de `Product`.
+
+El cursor es opaco para el cliente: JSON en base64 con la dirección
+("n" siguiente, "p" anterior) y los valores de orden de la fila límite.
+"""
+import base64
+import binascii
+import datetime
+import json
+from decimal import Decimal
+from typing import Optional, Sequence
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se puede decodificar."""
+
+
+def _a_json(valor):
+    if isinstance(valor, (datetime.datetime, datetime.date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def _codificar(direccion, valores):
+    if valores is not None:
+        valores = [_a_json(v) for v in valores]
+    crudo = json.dumps({"d": direccion, "v": valores}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+class KeysetPage:
+    """Página de resultados con la misma interfaz básica que `django.core.paginator.Page`."""
+
+    def __init__(self, object_list, paginator, *, has_next, has_previous, total=None, total_exacto=True):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.total = total
+        self.total_exacto = total_exacto
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return ""
+        return self.paginator.codificar("n", self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return ""
+        return self.paginator.codificar("p", self.object_list[0])
+
+    @property
+    def last_cursor(self):
+        return self.paginator.cursor_ultima_pagina()
+
+
+class KeysetPaginator:
+    """Pagina `queryset` por cursor.
+
+    `ordering` son los campos de orden (p. ej. ("-created_at",)); si no se da
+    se usa el del queryset. Siempre se agrega `id` como desempate para que
+    el orden sea total. Con `total_limite` cada página trae un total
+    aproximado: exacto hasta ese límite y "más de N" por encima.
+    """
+
+    def __init__(self, queryset, per_page: int, ordering: Optional[Sequence[str]] = None,
+                 total_limite: Optional[int] = None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.total_limite = total_limite
+
+        campos = list(ordering or queryset.query.order_by or ("-id",))
+        if not any(c.lstrip("-") in ("id", "pk") for c in campos):
+            campos.append("-id" if campos[0].startswith("-") else "id")
+        self.orden = [(c.lstrip("-"), c.startswith("-")) for c in campos]
+
+    # ────────── cursores ──────────
+
+    def codificar(self, direccion, obj):
+        return _codificar(direccion, [getattr(obj, campo) for campo, _desc in self.orden])
+
+    def cursor_ultima_pagina(self):
+        return _codificar("p", None)
+
+    def normalizar(self, cursor) -> str:
+        """Forma canónica de `cursor` ("" si es vacío o inválido).
+
+        Dos cursores que llevan a la misma página quedan iguales, útil para
+        usarlos en claves de caché.
+        """
+        if not cursor:
+            return ""
+        try:
+            direccion, valores = self.decodificar(cursor)
+        except CursorInvalido:
+            return ""
+        return _codificar(direccion, valores)
+
+    def decodificar(self, cursor):
+        try:
+            relleno = "=" * (-len(cursor) % 4)
+            datos = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode("utf-8"))
+            direccion, valores = datos["d"], datos["v"]
+        except (ValueError, KeyError, TypeError, binascii.Error) as e:
+            raise CursorInvalido(str(e))
+        if direccion not in ("n", "p"):
+            raise CursorInvalido("dirección desconocida")
+        if valores is None:
+            return direccion, None
+        if not isinstance(valores, list) or len(valores) != len(self.orden):
+            raise CursorInvalido("cantidad de valores incorrecta")
+        # Las columnas de orden no admiten NULL: no hay fila límite con esos valores
+        if any(v is None for v in valores):
+            raise CursorInvalido("valor nulo")
+        return direccion, [self._a_python(campo, v) for (campo, _d), v in zip(self.orden, valores)]
+
+    def _a_python(self, campo, valor):
+        try:
+            field = self.queryset.model._meta.get_field(campo)
+        except FieldDoesNotExist:
+            return valor  # anotación (p. ej. search_rank)
+        try:
+            return field.to_python(valor)
+        except ValidationError as e:
+            raise CursorInvalido(str(e))
+
+    # ────────── consultas ──────────
+
+    def _condicion(self, valores, adelante):
+        """(a > x) OR (a = x AND b > y) OR ... según la dirección de cada campo."""
+        condicion = Q()
+        iguales = {}
+        for (campo, desc), valor in zip(self.orden, valores):
+            operador = "lt" if desc == adelante else "gt"
+            condicion |= Q(**iguales, **{f"{campo}__{operador}": valor})
+            iguales[campo] = valor
+        return condicion
+
+    def _order_by(self, adelante):
+        return [
+            ("-" if desc == adelante else "") + campo
+            for campo, desc in self.orden
+        ]
+
+    def _total(self):
+        if self.total_limite is None:
+            return None, True
+        n = self.queryset.order_by()[: self.total_limite + 1].count()
+        return min(n, self.total_limite), n <= self.total_limite
+
+    def get_page(self, cursor: Optional[str] = None) -> KeysetPage:
+        """Devuelve la página indicada por `cursor` (la primera si es vacío o inválido)."""
+        direccion, valores = "n", None
+        if cursor:
+            try:
+                direccion, valores = self.decodificar(cursor)
+            except CursorInvalido:
+                direccion, valores = "n", None
+
+        adelante = direccion == "n"
+        qs = self.queryset
+        if valores is not None:
+            qs = qs.filter(self._condicion(valores, adelante))
+        filas = list(qs.order_by(*self._order_by(adelante))[: self.per_page + 1])
+        hay_mas = len(filas) > self.per_page
+        filas = filas[: self.per_page]
+
+        if adelante:
+            has_next, has_previous = hay_mas, valores is not None
+        else:
+            filas.reverse()
+            has_next, has_previous = valores is not None, hay_mas
+
+        total, exacto = self._total()
+        return KeysetPage(
+            filas, self, has_next=has_next, has_previous=has_previous,
+            total=total, total_exacto=exacto,
+        )
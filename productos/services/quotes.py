@@ -0,0 +1,117 @@
+"""Frases para la barra de navegación.
+
+Un pool por proceso que un hilo en segundo plano refresca desde
+`settings.QUOTES_API_URL`. El request nunca hace I/O de red: si la API está
+lenta o caída se sigue mostrando lo que ya hay en el pool o, al comienzo,
+el corpus local.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CITAS_LOCALES = (
+    "Cada puntada cuenta una historia.",
+    "Lo hecho a mano se hace con el corazón.",
+    "Despacio se teje lo que dura.",
+    "Un hilo a la vez, una pieza única.",
+    "La paciencia es el mejor material.",
+    "Crear es dejar algo de ti en cada pieza.",
+    "Las manos recuerdan lo que el tiempo olvida.",
+    "Del ovillo nace el abrigo.",
+)
+
+# Cada cuántos segundos cambia la frase mostrada
+ROTACION_SEGUNDOS = 600
+
+
+class QuotePool:
+    """Pool de frases que se refresca en un hilo daemon."""
+
+    def __init__(self, url=None, intervalo=600, timeout=4, corpus=CITAS_LOCALES, maximo=50):
+        self.url = url
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self.corpus = tuple(corpus)
+        self._remotas = deque(maxlen=maximo)
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._detener = threading.Event()
+
+    def citas(self):
+        with self._lock:
+            return tuple(self._remotas) or self.corpus
+
+    def cita_actual(self, ahora=None):
+        """Frase del periodo actual; igual para todos durante ROTACION_SEGUNDOS."""
+        self.iniciar()
+        citas = self.citas()
+        if not citas:
+            return None
+        periodo = int((ahora or time.time()) // ROTACION_SEGUNDOS)
+        return citas[periodo % len(citas)]
+
+    def refrescar(self):
+        """Trae una frase de la API y la agrega al pool. Devuelve True si pudo."""
+        if not self.url:
+            return False
+        try:
+            response = requests.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            contenido = response.json()[0]["content"]
+        except Exception as e:
+            logger.info("No se pudo refrescar la frase: %s", e)
+            return False
+        with self._lock:
+            if contenido not in self._remotas:
+                self._remotas.append(contenido)
+        return True
+
+    def iniciar(self):
+        """Arranca el hilo de refresco (una sola vez por pool)."""
+        if not self.url or self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._bucle, name="quote-pool", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self.refrescar()
+            self._detener.wait(self.intervalo)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool():
+    """Pool del proceso, configurado desde settings la primera vez."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = QuotePool(
+                    url=getattr(settings, "QUOTES_API_URL", None),
+                    intervalo=getattr(settings, "QUOTES_REFRESH_SECONDS", 600),
+                )
+    return _pool
+
+
+def reiniciar_pool():
+    """Detiene y descarta el pool actual (útil en tests y al cambiar settings)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.detener()
+        _pool = None
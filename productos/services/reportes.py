@@ -0,0 +1,218 @@
+"""Reportes generados en segundo plano.
+
+Pedir un reporte crea un `ReportJob`; el comando `procesar_reportes` lo toma,
+escribe el archivo en `REPORTES_ROOT` y lo deja listo para descargar.
+
+La clave del trabajo resume formato + filtros + `version_catalogo()`: si
+los datos no cambiaron, pedir el mismo reporte devuelve el archivo que ya
+está en disco (o el trabajo que ya lo está generando) sin repetir nada.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import timedelta
+from typing import Mapping, Optional
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..factories import get_report_generator
+from ..models import EstadoReporte, Product, ReportJob
+from .catalogo import FILTROS_CATALOGO, filtrar_catalogo, version_catalogo
+from .exportacion import filas_productos
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = 3
+
+
+class DemasiadosReportes(Exception):
+    """El usuario ya tiene `max_en_cola()` reportes esperando al worker."""
+
+
+def max_en_cola() -> int:
+    return getattr(settings, "REPORTES_MAX_EN_COLA", 3)
+
+
+def minutos_procesando() -> int:
+    # Un trabajo 'procesando' sin tocar hace más que esto quedó de un worker caído
+    return getattr(settings, "REPORTES_MINUTOS_PROCESANDO", 30)
+
+
+def _vencido():
+    return timezone.now() - timedelta(minutes=minutos_procesando())
+
+
+def _en_cola() -> Q:
+    """Trabajos que todavía van a terminar (los abandonados sin reintentos no)."""
+    abandonado = Q(estado=EstadoReporte.PROCESANDO, actualizado__lt=_vencido(), intentos__gte=MAX_INTENTOS)
+    return Q(estado__in=[EstadoReporte.PENDIENTE, EstadoReporte.PROCESANDO]) & ~abandonado
+
+
+def almacenamiento():
+    return FileSystemStorage(location=settings.REPORTES_ROOT)
+
+
+def filtros_reporte(params: Mapping) -> dict:
+    """Filtros del catálogo presentes en `params` (solo los que tienen valor)."""
+    filtros = {}
+    for nombre in FILTROS_CATALOGO:
+        valor = (params.get(nombre) or "").strip()
+        if valor:
+            filtros[nombre] = valor
+    return filtros
+
+
+def clave_reporte(formato: str, filtros: Mapping) -> str:
+    firma = json.dumps([formato, dict(filtros), version_catalogo()], sort_keys=True)
+    return hashlib.sha256(firma.encode("utf-8")).hexdigest()
+
+
+def productos_filtrados(filtros: Mapping):
+    return filtrar_catalogo(Product.objects.all(), filtros)
+
+
+def filas_reporte(filtros: Mapping):
+    return filas_productos(productos_filtrados(filtros))
+
+
+# ────────── pedir y consultar ──────────
+
+def reporte_listo(clave: str) -> Optional[ReportJob]:
+    """Trabajo terminado con esa clave cuyo archivo sigue en disco."""
+    storage = almacenamiento()
+    for job in ReportJob.objects.filter(clave=clave, estado=EstadoReporte.LISTO).order_by("-id"):
+        if job.archivo and storage.exists(job.archivo):
+            return job
+    return None
+
+
+def solicitar(formato: str, filtros: Mapping, user=None) -> ReportJob:
+    """Devuelve el trabajo para este reporte: el listo, el que está en curso o uno nuevo.
+
+    Lanza `DemasiadosReportes` si hay que crear uno y el usuario ya tiene
+    `max_en_cola()` esperando.
+    """
+    clave = clave_reporte(formato, filtros)
+    job = reporte_listo(clave)
+    if job is not None:
+        # Un reporte que se sigue pidiendo no se purga
+        if job.actualizado < timezone.now() - timedelta(days=1):
+            ReportJob.objects.filter(pk=job.pk).update(actualizado=timezone.now())
+        return job
+    en_curso = ReportJob.objects.filter(_en_cola(), clave=clave).order_by("id").first()
+    if en_curso is not None:
+        return en_curso
+    user = user if user is not None and user.is_authenticated else None
+    if user is not None:
+        pendientes = ReportJob.objects.filter(_en_cola(), user=user).count()
+        if pendientes >= max_en_cola():
+            raise DemasiadosReportes(user.pk)
+    return ReportJob.objects.create(formato=formato, filtros=dict(filtros), clave=clave, user=user)
+
+
+def ruta_archivo(job: ReportJob) -> str:
+    return almacenamiento().path(job.archivo)
+
+
+def nombre_descarga(job: ReportJob) -> str:
+    return get_report_generator(job.formato).filename()
+
+
+# ────────── worker ──────────
+
+def reclamar_trabajo():
+    """Marca como 'procesando' el trabajo pendiente más antiguo y lo devuelve.
+
+    También retoma los que quedaron 'procesando' de un worker caído (sin
+    tocar hace `minutos_procesando()`); si ya agotaron `MAX_INTENTOS` pasan a
+    error. El UPDATE condicionado hace que dos workers no tomen el mismo.
+    """
+    vencido = _vencido()
+    ReportJob.objects.filter(
+        estado=EstadoReporte.PROCESANDO, actualizado__lt=vencido, intentos__gte=MAX_INTENTOS,
+    ).update(estado=EstadoReporte.ERROR, error="El worker no terminó el trabajo.", actualizado=timezone.now())
+    disponible = Q(estado=EstadoReporte.PENDIENTE) | Q(estado=EstadoReporte.PROCESANDO, actualizado__lt=vencido)
+    candidatos = ReportJob.objects.filter(disponible).order_by("id")
+    for job_id in candidatos.values_list("id", flat=True)[:10]:
+        tomado = ReportJob.objects.filter(disponible, pk=job_id).update(
+            estado=EstadoReporte.PROCESANDO,
+            intentos=F("intentos") + 1,
+            actualizado=timezone.now(),
+        )
+        if tomado:
+            return ReportJob.objects.get(pk=job_id)
+    return None
+
+
+def procesar_trabajo(job: ReportJob):
+    """Genera el archivo del reporte y lo deja listo para descargar."""
+    generator = get_report_generator(job.formato)
+    extension = os.path.splitext(generator.filename())[1]
+    nombre = f"{job.clave}{extension}"
+    storage = almacenamiento()
+    destino = storage.path(nombre)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+
+    # Se escribe aparte y se renombra: nadie descarga un archivo a medias
+    fd, temporal = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".parcial")
+    try:
+        with os.fdopen(fd, "wb") as salida:
+            for pedazo in generator.stream(filas_reporte(job.filtros)):
+                salida.write(pedazo)
+        os.replace(temporal, destino)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+    job.archivo = nombre
+    job.estado = EstadoReporte.LISTO
+    job.error = ""
+    job.save(update_fields=["archivo", "estado", "error", "actualizado"])
+
+
+def ejecutar_trabajo(job: ReportJob):
+    """Procesa `job` registrando el error; reintenta hasta MAX_INTENTOS."""
+    try:
+        procesar_trabajo(job)
+        return True
+    except Exception as e:
+        logger.exception("Error generando %s", job)
+        job.error = str(e)
+        job.estado = EstadoReporte.ERROR if job.intentos >= MAX_INTENTOS else EstadoReporte.PENDIENTE
+        job.save(update_fields=["estado", "error", "actualizado"])
+        return False
+
+
+def procesar_pendientes(limite=None):
+    """Procesa trabajos hasta vaciar la cola (o `limite`). Devuelve cuántos tomó."""
+    procesados = 0
+    while limite is None or procesados < limite:
+        job = reclamar_trabajo()
+        if job is None:
+            break
+        ejecutar_trabajo(job)
+        procesados += 1
+    return procesados
+
+
+def purgar(dias=None) -> int:
+    """Borra los trabajos (y sus archivos) sin tocar hace más de `dias`."""
+    dias = settings.REPORTES_DIAS if dias is None else dias
+    limite = timezone.now() - timedelta(days=dias)
+    viejos = ReportJob.objects.filter(actualizado__lt=limite).exclude(
+        Q(estado=EstadoReporte.PENDIENTE) | Q(estado=EstadoReporte.PROCESANDO)
+    )
+    storage = almacenamiento()
+    # Varios trabajos pueden compartir archivo (misma clave): solo se borra si ninguno reciente lo usa
+    vigentes = set(ReportJob.objects.filter(actualizado__gte=limite).values_list("archivo", flat=True))
+    borrados = 0
+    for job_id, archivo in viejos.values_list("id", "archivo"):
+        if archivo and archivo not in vigentes and storage.exists(archivo):
+            storage.delete(archivo)
+        borrados += ReportJob.objects.filter(pk=job_id).delete()[0]
+    return borrados
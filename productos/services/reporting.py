@@ -1,13 +1,26 @@
 from abc import ABC, abstractmethod
 import csv
-import io
-import json
-from typing import Iterable, Mapping, Sequence
+from typing import Iterable, Iterator, Mapping, Sequence
 import datetime
 
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Tamaño aproximado de cada pedazo que se entrega al StreamingHttpResponse
+CHUNK_BYTES = 64 * 1024
+
 
 class ReportGenerator(ABC):
-    """Interfaz para generadores de reportes."""
+    """Interfaz para generadores de reportes.
+
+    `generate` devuelve el archivo completo; `stream` lo entrega en pedazos de
+    bytes a medida que consume `rows`, para no tener el archivo entero en
+    memoria. Por defecto `stream` cae en `generate` (formatos que necesitan
+    ver todo antes de escribir, como el PDF).
+    """
+
+    content_type = "application/octet-stream"
+    # True si `stream` entrega el archivo de a pedazos sin armarlo completo
+    streaming = False
 
     @abstractmethod
     def generate(self, rows: Iterable[Mapping]) -> bytes:
@@ -17,46 +30,117 @@ class ReportGenerator(ABC):
     def filename(self) -> str:
         """Nombre de archivo sugerido para la descarga."""
 
+    def stream(self, rows: Iterable[Mapping]) -> Iterator[bytes]:
+        """Genera el reporte en pedazos de bytes."""
+        yield self.generate(rows)
+
+
+def _serializable(valor):
+    if isinstance(valor, (datetime.datetime, datetime.date)):
+        return valor.isoformat()
+    return valor
+
+
+def _en_pedazos(textos: Iterable[str], tamano: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """Junta textos cortos en pedazos de ~`tamano` bytes ya codificados."""
+    partes, acumulado = [], 0
+    for texto in textos:
+        partes.append(texto)
+        acumulado += len(texto)
+        if acumulado >= tamano:
+            yield "".join(partes).encode("utf-8")
+            partes, acumulado = [], 0
+    if partes:
+        yield "".join(partes).encode("utf-8")
+
+
+class _Linea:
+    """Destino de `csv.writer` que devuelve la línea en vez de guardarla."""
+
+    def write(self, texto):
+        return texto
+
 
 class CsvReportGenerator(ReportGenerator):
+    content_type = "text/csv; charset=utf-8"
+    streaming = True
+
     def __init__(self, columns: Sequence[str] = ("name", "price", "description", "category", "material", "color", "stock", "created_at", "seller_username")):
         self.columns = list(columns)
 
     def generate(self, rows: Iterable[Mapping]) -> bytes:
-        buf = io.StringIO()
-        writer = csv.DictWriter(buf, fieldnames=self.columns)
-        writer.writeheader()
-        for r in rows:
-            # aseguramos que las claves existan y que los datetimes estén serializados
-            row = {}
-            for k in self.columns:
-                v = r.get(k, "")
-                if isinstance(v, datetime.datetime):
-                    v = v.isoformat()
-                row[k] = v
-            writer.writerow(row)
-        return buf.getvalue().encode("utf-8")
+        return b"".join(self.stream(rows))
+
+    def stream(self, rows: Iterable[Mapping]) -> Iterator[bytes]:
+        writer = csv.writer(_Linea())
+
+        def lineas():
+            yield writer.writerow(self.columns)
+            for r in rows:
+                # aseguramos que las claves existan y que los datetimes estén serializados
+                yield writer.writerow([_serializable(r.get(k, "")) for k in self.columns])
+
+        return _en_pedazos(lineas())
 
     def filename(self) -> str:
         return "productos_report.csv"
 
 
 class JsonReportGenerator(ReportGenerator):
+    content_type = "application/json"
+    streaming = True
+
     def __init__(self, *, indent: int = 2):
         self.indent = indent
+        # Un solo encoder para todas las filas (json.dumps con `cls` crea uno por llamada)
+        self._encoder = DjangoJSONEncoder(ensure_ascii=False, indent=indent)
 
     def generate(self, rows: Iterable[Mapping]) -> bytes:
-        # Convert rows to plain serializable types (e.g. datetimes -> ISO strings)
-        data = []
-        for r in rows:
-            obj = {}
-            for k, v in dict(r).items():
-                if isinstance(v, datetime.datetime):
-                    obj[k] = v.isoformat()
+        return b"".join(self.stream(rows))
+
+    def _objeto(self, r: Mapping) -> str:
+        # Igual que un elemento de json.dumps(lista, indent=...): se serializa
+        # dentro de una lista de uno y se le quitan los corchetes
+        texto = self._encoder.encode([dict(r)])
+        if self.indent is None:
+            return texto[1:-1]
+        return texto[2:-2]
+
+    def stream(self, rows: Iterable[Mapping]) -> Iterator[bytes]:
+        separador = ", " if self.indent is None else ",\n"
+
+        def partes():
+            primero = True
+            for r in rows:
+                if primero:
+                    yield "[" if self.indent is None else "[\n"
+                    primero = False
                 else:
-                    obj[k] = v
-            data.append(obj)
-        return json.dumps(data, ensure_ascii=False, indent=self.indent).encode("utf-8")
+                    yield separador
+                yield self._objeto(r)
+            if primero:
+                yield "[]"
+            else:
+                yield "]" if self.indent is None else "\n]"
+
+        return _en_pedazos(partes())
 
     def filename(self) -> str:
         return "productos_report.json"
+
+
+class NdjsonReportGenerator(ReportGenerator):
+    """Un objeto JSON por línea: se puede leer fila a fila sin cargar el archivo."""
+
+    content_type = "application/x-ndjson"
+    streaming = True
+
+    def generate(self, rows: Iterable[Mapping]) -> bytes:
+        return b"".join(self.stream(rows))
+
+    def stream(self, rows: Iterable[Mapping]) -> Iterator[bytes]:
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        return _en_pedazos(encoder.encode(dict(r)) + "\n" for r in rows)
+
+    def filename(self) -> str:
+        return "productos_report.ndjson"
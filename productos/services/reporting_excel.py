@@ -0,0 +1,203 @@
+"""Reporte XLSX escrito en streaming, sin dependencias externas.
+
+Un .xlsx es un zip con unas pocas partes XML. Las partes fijas (libro,
+estilos, relaciones) se escriben al principio y la hoja se va comprimiendo
+fila a fila: `zipfile` admite destinos no buscables (usa descriptores de
+datos), así que cada pedazo comprimido se entrega apenas está listo y ni
+las filas ni el libro quedan en memoria.
+
+Las celdas tienen tipo: números como números y fechas como número de serie
+con formato de fecha. El texto va en línea (`inlineStr`), sin tabla de
+cadenas compartidas, que obligaría a ver todas las filas antes de escribir.
+"""
+import datetime
+import decimal
+import re
+import zipfile
+from typing import Iterable, Iterator, Mapping, Sequence
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .reporting import ReportGenerator, _en_pedazos
+
+HOJA = "xl/worksheets/sheet1.xml"
+
+PARTES_FIJAS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Productos" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Estilos: 0 normal, 1 fecha y hora (formato 22), 2 fecha (formato 14)
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+ESTILO_FECHA_HORA = 1
+ESTILO_FECHA = 2
+EPOCA_EXCEL = datetime.datetime(1899, 12, 30)
+
+# Caracteres de control que XML 1.0 no admite
+_NO_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _letra_columna(indice: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA..."""
+    letras = ""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _serie(valor, zona=None) -> float:
+    """Fecha como número de serie de Excel (días desde 1899-12-30), en hora local."""
+    if isinstance(valor, datetime.datetime):
+        if valor.tzinfo is not None:
+            valor = valor.astimezone(zona or timezone.get_current_timezone()).replace(tzinfo=None)
+    else:
+        valor = datetime.datetime.combine(valor, datetime.time())
+    return (valor - EPOCA_EXCEL).total_seconds() / 86400
+
+
+def _celda(ref: str, valor, zona=None) -> str:
+    if valor is None or valor == "":
+        return ""
+    if isinstance(valor, bool):
+        return f'<c r="{ref}" t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, decimal.Decimal)):
+        return f'<c r="{ref}"><v>{valor}</v></c>'
+    if isinstance(valor, datetime.datetime):
+        return f'<c r="{ref}" s="{ESTILO_FECHA_HORA}"><v>{_serie(valor, zona)!r}</v></c>'
+    if isinstance(valor, datetime.date):
+        return f'<c r="{ref}" s="{ESTILO_FECHA}"><v>{_serie(valor)!r}</v></c>'
+    texto = escape(_NO_XML.sub("", str(valor)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+class _Salida:
+    """Destino de `ZipFile` que guarda lo escrito hasta que se retira."""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self) -> bytes:
+        datos = b"".join(self.partes)
+        self.partes = []
+        return datos
+
+
+class ExcelReportGenerator(ReportGenerator):
+    content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    streaming = True
+
+    def __init__(
+        self,
+        columns: Sequence[str] = ("name", "price", "description", "category", "material", "color", "stock", "created_at", "seller_username"),
+        date_columns: Sequence[str] = ("created_at",),
+    ):
+        self.columns = list(columns)
+        # Columnas que pueden venir como texto ISO (así las entrega `filas_productos`)
+        self.date_columns = set(date_columns)
+        self._refs = [_letra_columna(i) for i in range(len(self.columns))]
+
+    def _valor(self, columna, valor):
+        if columna in self.date_columns and isinstance(valor, str) and valor:
+            try:
+                return datetime.datetime.fromisoformat(valor)
+            except ValueError:
+                return valor
+        return valor
+
+    def _fila(self, numero: int, valores, zona=None) -> str:
+        celdas = "".join(_celda(f"{ref}{numero}", v, zona) for ref, v in zip(self._refs, valores))
+        return f'<row r="{numero}">{celdas}</row>'
+
+    def _xml_hoja(self, rows: Iterable[Mapping]) -> Iterator[str]:
+        yield (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<sheetData>'
+        )
+        yield self._fila(1, self.columns)
+        zona = timezone.get_current_timezone()
+        for numero, r in enumerate(rows, start=2):
+            yield self._fila(numero, [self._valor(k, r.get(k, "")) for k in self.columns], zona)
+        yield '</sheetData></worksheet>'
+
+    def generate(self, rows: Iterable[Mapping]) -> bytes:
+        return b"".join(self.stream(rows))
+
+    def stream(self, rows: Iterable[Mapping]) -> Iterator[bytes]:
+        salida = _Salida()
+        with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED) as libro:
+            for nombre, contenido in PARTES_FIJAS.items():
+                libro.writestr(nombre, contenido)
+            with libro.open(HOJA, "w") as hoja:
+                for pedazo in _en_pedazos(self._xml_hoja(rows)):
+                    hoja.write(pedazo)
+                    datos = salida.retirar()
+                    if datos:
+                        yield datos
+        # Lo que queda de la hoja y el directorio central del zip
+        yield salida.retirar()
+
+    def filename(self) -> str:
+        return "productos_report.xlsx"
@@ -1,75 +1,157 @@
 from io import BytesIO
 import datetime
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.utils import simpleSplit
 from .reporting import ReportGenerator
 
+FUENTE = ("Helvetica", 12)
+
+
+def _maquetar_filas(rows, max_width, line_height, columns=None):
+    """Líneas de cada fila ya cortadas al ancho: [(texto, avance), ...] por fila.
+
+    Es la parte cara (`simpleSplit` mide cada palabra), por eso corre en los
+    procesos del pool en modo paralelo. Con `columns` cada fila es un solo
+    párrafo "columna: valor" en vez del detalle de producto.
+    """
+    bloques = []
+    for r in rows:
+        lineas = []
+        if columns:
+            texto = "    ".join(f"{c}: {r.get(c, '')}" for c in columns)
+            lineas = [(ln, line_height) for ln in simpleSplit(texto, FUENTE[0], FUENTE[1], max_width)]
+            lineas[-1] = (lineas[-1][0], line_height + 8)
+            bloques.append(lineas)
+            continue
+        # Nombre y precio en una línea
+        name = r.get("name", "")
+        price = r.get("price", "")
+        lineas.append((f"Nombre: {name}    Precio: {price}", line_height + 2))
+
+        # Descripción (wrap)
+        desc = r.get("description", "")
+        if desc:
+            for ln in simpleSplit(f"Descripción: {desc}", FUENTE[0], FUENTE[1], max_width):
+                lineas.append((ln, line_height))
+
+        # Otros campos en una línea
+        category = r.get("category", "")
+        material = r.get("material", "")
+        color = r.get("color", "")
+        stock = r.get("stock", "")
+        seller = r.get("seller_username", "")
+        created = r.get("created_at", "")
+        # Asegurar formato ISO si es datetime
+        if isinstance(created, datetime.datetime):
+            created = created.isoformat()
+        lineas.append((f"Categoría: {category}    Material: {material}    Color: {color}", line_height))
+        lineas.append((f"Stock: {stock}    Vendedor: {seller}    Creado: {created}", line_height + 8))
+        bloques.append(lineas)
+    return bloques
+
+
+def _dibujar_paginas(paginas, page_size, x):
+    """Operadores PDF de cada página (lo mismo que haría `drawString`)."""
+    pdf = canvas.Canvas(BytesIO(), pagesize=page_size)
+    pdf.setFont(*FUENTE)
+    contenidos = []
+    for lineas in paginas:
+        codigo = []
+        for y, texto in lineas:
+            t = pdf.beginText(x, y)
+            t.textLine(texto)
+            codigo.append(t.getCode())
+        contenidos.append("\n".join(codigo))
+    return contenidos
+
+
+def _en_partes(items, partes):
+    tamano = max(1, math.ceil(len(items) / partes))
+    return [items[i:i + tamano] for i in range(0, len(items), tamano)]
+
 
 class PDFReportGenerator(ReportGenerator):
     """Generador PDF con detalle de producto.
 
-    Es simple (canvas) y hace saltos de página cuando hace falta.
+    Es simple (canvas) y hace saltos de página cuando hace falta. Con
+    `workers` > 1 y suficientes filas, el corte de líneas y el dibujo de las
+    páginas se reparten en un pool de procesos; la paginación se calcula en
+    el proceso principal, así los saltos y la numeración son los mismos que
+    en modo secuencial.
     """
 
-    def __init__(self, page_size=A4, margin=50, line_height=14):
+    content_type = "application/pdf"
+    # Por debajo de esto el costo de levantar el pool no se recupera
+    min_filas_paralelo = 2000
+
+    def __init__(self, page_size=A4, margin=50, line_height=14, workers=1, invariant=False,
+                 columns=None, title="Reporte de Productos"):
         self.page_size = page_size
         self.margin = margin
         self.line_height = line_height
+        self.workers = max(1, workers or 1)
+        self.invariant = invariant
+        self.columns = list(columns) if columns else None
+        self.title = title
 
-    def _write_line(self, pdf, x, y, text, max_width):
-        # split text if it's too long for the width
-        lines = simpleSplit(str(text), pdf._fontname, pdf._fontsize, max_width)
-        for i, ln in enumerate(lines):
-            pdf.drawString(x, y - i * self.line_height, ln)
-        return len(lines)
-
-    def generate(self, rows):
-        buffer = BytesIO()
-        pdf = canvas.Canvas(buffer, pagesize=self.page_size)
+    def _paginar(self, bloques):
+        """Reparte las líneas en páginas: [[(y, texto), ...], ...]."""
         width, height = self.page_size
-        pdf.setFont("Helvetica", 12)
-
-        title = "Reporte de Productos"
-        pdf.drawString(self.margin, height - self.margin, title)
-
+        paginas = [[(height - self.margin, self.title)]]
         y = height - self.margin - 30
-        max_width = width - 2 * self.margin
-
-        for r in rows:
+        for lineas in bloques:
             if y < self.margin + 100:
-                pdf.showPage()
-                pdf.setFont("Helvetica", 12)
+                paginas.append([])
                 y = height - self.margin
+            for texto, avance in lineas:
+                paginas[-1].append((y, texto))
+                y -= avance
+        return paginas
 
-            # Nombre y precio en una línea
-            name = r.get("name", "")
-            price = r.get("price", "")
-            pdf.drawString(self.margin, y, f"Nombre: {name}    Precio: {price}")
-            y -= self.line_height + 2
-
-            # Descripción (wrap)
-            desc = r.get("description", "")
-            if desc:
-                used = self._write_line(pdf, self.margin, y, f"Descripción: {desc}", max_width)
-                y -= used * self.line_height
-
-            # Otros campos en una línea
-            category = r.get("category", "")
-            material = r.get("material", "")
-            color = r.get("color", "")
-            stock = r.get("stock", "")
-            seller = r.get("seller_username", "")
-            created = r.get("created_at", "")
-            # Asegurar formato ISO si es datetime
-            if isinstance(created, datetime.datetime):
-                created = created.isoformat()
-
-            pdf.drawString(self.margin, y, f"Categoría: {category}    Material: {material}    Color: {color}")
-            y -= self.line_height
-            pdf.drawString(self.margin, y, f"Stock: {stock}    Vendedor: {seller}    Creado: {created}")
-            y -= self.line_height + 8
+    def _paralelo(self, rows):
+        return self.workers > 1 and len(rows) >= self.min_filas_paralelo
 
+    def generate(self, rows):
+        rows = list(rows)
+        width, height = self.page_size
+        max_width = width - 2 * self.margin
+
+        if self._paralelo(rows):
+            contexto = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=contexto) as pool:
+                partes = _en_partes(rows, self.workers * 4)
+                n = len(partes)
+                bloques = [
+                    b for parte in pool.map(
+                        _maquetar_filas, partes, [max_width] * n, [self.line_height] * n, [self.columns] * n
+                    )
+                    for b in parte
+                ]
+                paginas = self._paginar(bloques)
+                grupos = _en_partes(paginas, self.workers * 4)
+                contenidos = [
+                    c for grupo in pool.map(
+                        _dibujar_paginas, grupos, [self.page_size] * len(grupos), [self.margin] * len(grupos)
+                    )
+                    for c in grupo
+                ]
+        else:
+            paginas = self._paginar(_maquetar_filas(rows, max_width, self.line_height, self.columns))
+            contenidos = _dibujar_paginas(paginas, self.page_size, self.margin)
+
+        buffer = BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=self.page_size, invariant=self.invariant)
+        total = len(contenidos)
+        for numero, contenido in enumerate(contenidos, start=1):
+            pdf.setFont(*FUENTE)
+            pdf.addLiteral(contenido)
+            pdf.setFont(FUENTE[0], 9)
+            pdf.drawRightString(width - self.margin, self.margin / 2, f"Página {numero} de {total}")
+            pdf.showPage()
         pdf.save()
         buffer.seek(0)
         return buffer.read()
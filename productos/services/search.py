@@ -0,0 +1,158 @@
+"""Búsqueda de texto completo sobre `Product`.
+
+En SQLite se usa una tabla virtual FTS5 (`productos_product_fts`) cuyo
+`rowid` es el id del producto. El tokenizador `unicode61 remove_diacritics 2`
+hace que "algodón" y "algodon" sean equivalentes y el índice de prefijos
+permite buscar mientras el usuario escribe. En otros motores se usa el
+`icontains` de siempre.
+"""
+import re
+import unicodedata
+from typing import Iterable, Sequence
+
+from django.db import connection
+from django.db.models import F, Q
+
+FTS_TABLE = "productos_product_fts"
+FTS_COLUMNS = ("name", "description", "category", "material", "color")
+# Pesos de bm25 por columna (mismo orden que FTS_COLUMNS)
+FTS_WEIGHTS = (10.0, 2.0, 4.0, 4.0, 4.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalizar_texto(texto: str) -> str:
+    """Quita tildes y pasa a minúsculas: "Algodón" -> "algodon"."""
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_tildes.lower()
+
+
+def fts_disponible(conn=None) -> bool:
+    """True si la base de datos soporta el índice FTS5."""
+    return (conn or connection).vendor == "sqlite"
+
+
+def construir_consulta_fts(texto: str, campos: Sequence[str] = FTS_COLUMNS) -> str:
+    """Convierte el texto del usuario en una expresión MATCH segura.
+
+    Cada palabra se busca como prefijo y todas deben aparecer (AND implícito).
+    Devuelve "" si el texto no tiene palabras buscables.
+    """
+    tokens = _TOKEN_RE.findall(normalizar_texto(texto))
+    if not tokens:
+        return ""
+    expresion = " ".join(f'"{t}"*' for t in tokens)
+    if tuple(campos) != FTS_COLUMNS:
+        expresion = "{%s} : (%s)" % (" ".join(campos), expresion)
+    return expresion
+
+
+def crear_indice(schema_editor=None):
+    """Crea la tabla FTS5 si no existe."""
+    conn = schema_editor.connection if schema_editor else connection
+    if not fts_disponible(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            + ", ".join(FTS_COLUMNS)
+            + ", tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        # La columna oculta `rank` usa estos pesos por defecto
+        pesos = ", ".join(str(p) for p in FTS_WEIGHTS)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', %s)",
+            [f"bm25({pesos})"],
+        )
+
+
+def reconstruir_indice(conn=None):
+    """Vuelve a llenar el índice desde la tabla de productos."""
+    conn = conn or connection
+    if not fts_disponible(conn):
+        return
+    columnas = ", ".join(FTS_COLUMNS)
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {columnas}) "
+            f"SELECT id, {columnas} FROM productos_product"
+        )
+
+
+def indexar_producto(producto):
+    """Inserta o actualiza un producto en el índice."""
+    if not fts_disponible():
+        return
+    columnas = ", ".join(FTS_COLUMNS)
+    valores = [producto.pk] + [getattr(producto, c) or "" for c in FTS_COLUMNS]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [producto.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {columnas}) "
+            f"VALUES ({', '.join(['%s'] * len(valores))})",
+            valores,
+        )
+
+
+def indexar_productos(productos):
+    """Agrega al índice productos recién creados (en un solo `executemany`)."""
+    if not productos or not fts_disponible():
+        return
+    columnas = ", ".join(FTS_COLUMNS)
+    filas = [[p.pk] + [getattr(p, c) or "" for c in FTS_COLUMNS] for p in productos]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {columnas}) "
+            f"VALUES ({', '.join(['%s'] * (len(FTS_COLUMNS) + 1))})",
+            filas,
+        )
+
+
+def desindexar_productos(producto_ids):
+    """Elimina varios productos del índice."""
+    producto_ids = list(producto_ids)
+    if not producto_ids or not fts_disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(producto_ids))})",
+            producto_ids,
+        )
+
+
+def desindexar_producto(producto_id):
+    """Elimina un producto del índice."""
+    if not fts_disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [producto_id])
+
+
+def buscar_productos(queryset, texto: str, campos: Iterable[str] = ("name", "description"), ordenar: bool = True):
+    """Filtra `queryset` por `texto`.
+
+    Con FTS5 anota `search_rank` (bm25, menor es mejor) y, si `ordenar` es
+    True, ordena por relevancia. Sin FTS5 cae a `icontains` sobre `campos`.
+    """
+    campos = tuple(campos)
+    if not texto or not texto.strip():
+        return queryset
+
+    if not fts_disponible():
+        condicion = Q()
+        for campo in campos:
+            condicion |= Q(**{f"{campo}__icontains": texto})
+        return queryset.filter(condicion)
+
+    consulta = construir_consulta_fts(texto, campos)
+    if not consulta:
+        return queryset.none()
+
+    # JOIN con la tabla FTS: SQLite recorre primero el índice y luego busca
+    # cada producto por PK, así el costo depende de las coincidencias.
+    queryset = queryset.filter(search_index__match=consulta)
+    if ordenar:
+        queryset = queryset.annotate(search_rank=F("search_index__rank")).order_by("search_rank", "-created_at")
+    return queryset
@@ -0,0 +1,37 @@
+"""Backends de sesión que solo escriben cuando el contenido cambió.
+
+Django guarda la sesión siempre que quedó marcada como modificada, aunque
+se haya asignado el mismo valor (`session["x"] = session["x"]`). Estas
+variantes recuerdan una huella de los datos al cargarlos y, si al guardar
+siguen iguales, no tocan la tabla (ni reenvían la cookie firmada).
+
+`SESSION_ENGINE` apunta a uno de los submódulos: `db`, `cached_db` o
+`signed_cookies` (ver `SESSION_MODO` en settings).
+"""
+import hashlib
+
+
+class GuardarSoloCambios:
+    _huella = None
+
+    def _firmar(self, datos):
+        return hashlib.md5(self.serializer().dumps(datos)).hexdigest()
+
+    def load(self):
+        datos = super().load()
+        self._huella = self._firmar(datos)
+        return datos
+
+    def sin_cambios(self):
+        datos = getattr(self, "_session_cache", None)
+        return (
+            datos is not None
+            and self.session_key is not None
+            and self._huella == self._firmar(datos)
+        )
+
+    def save(self, must_create=False):
+        if not must_create and self.sin_cambios():
+            return
+        super().save(must_create=must_create)
+        self._huella = self._firmar(self._get_session(no_load=True))
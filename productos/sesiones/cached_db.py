@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import cached_db
+
+from . import GuardarSoloCambios
+
+
+class SessionStore(GuardarSoloCambios, cached_db.SessionStore):
+    pass
@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import db
+
+from . import GuardarSoloCambios
+
+
+class SessionStore(GuardarSoloCambios, db.SessionStore):
+    pass
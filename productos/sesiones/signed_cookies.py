@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import signed_cookies
+
+from . import GuardarSoloCambios
+
+
+class SessionStore(GuardarSoloCambios, signed_cookies.SessionStore):
+    pass
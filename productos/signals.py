@@ -1,7 +1,16 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Profile, Product
+from django.contrib.auth.signals import user_logged_in
+from .models import FactorPrecio, Profile, Product
+from .services import carrito, estadisticas, facets, favoritos, grid_cache, inventario, precios, search
+from .services.catalogo import tocar_catalogo
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    inventario.configurar_sqlite(connection)
 
 
 @receiver(post_save, sender=User)
@@ -17,3 +26,70 @@ def auto_deactivate_product_without_stock(sender, instance, **kwargs):
         instance.is_active = False
     elif instance.stock > 0 and not instance.pk:  # Nuevo producto con stock
         instance.is_active = True
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, **kwargs):
+    """Mantiene el índice de texto completo sincronizado con el producto"""
+    search.indexar_producto(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    search.desindexar_producto(instance.pk)
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_facets(sender, instance, **kwargs):
+    """Guarda los valores de faceta previos para ajustar los conteos después"""
+    anterior = None
+    if instance.pk:
+        anterior = Product.objects.filter(pk=instance.pk).only(
+            "is_active", "price", *facets.FACETAS
+        ).first()
+    instance._facetas_previas = facets.valores_faceta(anterior) if anterior else None
+
+
+@receiver(post_save, sender=Product)
+def update_product_facets(sender, instance, **kwargs):
+    previas = getattr(instance, "_facetas_previas", None)
+    nuevas = facets.valores_faceta(instance)
+    facets.aplicar_cambio(previas, nuevas)
+    grid_cache.invalidar(previas, nuevas)
+    tocar_catalogo()
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_facets(sender, instance, **kwargs):
+    previas = facets.valores_faceta(instance)
+    facets.aplicar_cambio(previas, None)
+    grid_cache.invalidar(previas, None)
+    tocar_catalogo()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def update_seller_stats(sender, instance, **kwargs):
+    """En SQLite lo hacen los triggers; en otras bases se recalcula la fila"""
+    estadisticas.al_cambiar_producto([instance.seller_id])
+
+
+@receiver(post_save, sender=FactorPrecio)
+@receiver(post_delete, sender=FactorPrecio)
+def reload_price_factors(sender, instance, **kwargs):
+    """Los otros procesos toman los factores nuevos al vencer su tabla"""
+    precios.descartar_tabla()
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    """Junta el carrito anónimo de la sesión con el del usuario"""
+    if request is not None and hasattr(request, "session"):
+        carrito.fusionar_al_iniciar_sesion(request, user)
+
+
+@receiver(user_logged_in)
+def merge_favorites_on_login(sender, request, user, **kwargs):
+    """Guarda en la cuenta los favoritos marcados sin sesión"""
+    if request is not None and hasattr(request, "session"):
+        favoritos.fusionar_al_iniciar_sesion(request, user)
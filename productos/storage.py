@@ -0,0 +1,58 @@
+"""Almacenamiento de media direccionado por contenido.
+
+Cada archivo se guarda como `<carpeta>/<hash>.<ext>`, donde hash es el
+SHA-256 de sus bytes. Subir dos veces la misma imagen (o generar dos veces
+la misma versión) deja un único archivo en disco. Como un archivo puede
+quedar compartido entre varios registros, no se borra al reemplazarlo:
+eso lo hace `limpiar_media` cuando ya nadie lo referencia.
+"""
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+LARGO_HASH = 32
+
+
+def hash_contenido(archivo):
+    """SHA-256 (hex, recortado) de un archivo de Django sin cargarlo entero en memoria."""
+    sha = hashlib.sha256()
+    if hasattr(archivo, "seek"):
+        archivo.seek(0)
+    for bloque in archivo.chunks():
+        sha.update(bloque)
+    if hasattr(archivo, "seek"):
+        archivo.seek(0)
+    return sha.hexdigest()[:LARGO_HASH]
+
+
+def nombre_por_contenido(nombre, digest):
+    directorio = posixpath.dirname(nombre)
+    extension = os.path.splitext(nombre)[1].lower()
+    return posixpath.join(directorio, f"{digest}{extension}")
+
+
+def es_nombre_por_contenido(nombre):
+    base = os.path.splitext(posixpath.basename(nombre))[0]
+    return len(base) == LARGO_HASH and all(c in "0123456789abcdef" for c in base)
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """`FileSystemStorage` que nombra los archivos por su hash y no duplica."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = nombre_por_contenido(name, hash_contenido(content))
+        if self.exists(name):
+            return name
+        # Si otro proceso escribe el mismo contenido justo ahora,
+        # FileSystemStorage le agrega un sufijo: queda una copia de más que
+        # limpiar_media recoge, nunca un archivo pisado.
+        return super().save(name, content, max_length=max_length)
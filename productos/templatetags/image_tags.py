@@ -0,0 +1,49 @@
+from django import template
+
+register = template.Library()
+
+# Atributo `sizes` según dónde se muestra la imagen
+SIZES = {
+    "card": "(max-width: 576px) 100vw, (max-width: 992px) 50vw, 25vw",
+    "detalle": "(max-width: 768px) 100vw, 50vw",
+}
+
+MIME = {"avif": "image/avif", "webp": "image/webp"}
+
+
+def _srcset(storage, lista):
+    return ", ".join(f"{storage.url(nombre)} {ancho}w" for ancho, nombre in lista)
+
+
+@register.inclusion_tag("productos/responsive_image.html")
+def imagen_producto(producto, uso="card", css_class="", loading="lazy"):
+    """
+    Imagen de producto con <picture>, srcset por formato y width/height
+    guardados, para que el navegador elija la versión sin tocar el archivo.
+    Si todavía no hay versiones, usa la imagen principal.
+    """
+    imagen = producto.imagen
+    versiones = producto.imagen_versiones or {}
+    fuentes = []
+    src = imagen.url if imagen else ""
+    srcset = ""
+    if imagen and versiones.get("jpeg"):
+        storage = imagen.storage
+        for formato, mime in MIME.items():
+            if versiones.get(formato):
+                fuentes.append({"type": mime, "srcset": _srcset(storage, versiones[formato])})
+        srcset = _srcset(storage, versiones["jpeg"])
+        # Fallback: la más chica para tarjetas, la intermedia para el detalle
+        jpeg = versiones["jpeg"]
+        src = storage.url(jpeg[0][1] if uso == "card" else jpeg[min(1, len(jpeg) - 1)][1])
+    return {
+        "producto": producto,
+        "src": src,
+        "srcset": srcset,
+        "fuentes": fuentes,
+        "sizes": SIZES.get(uso, SIZES["card"]),
+        "width": producto.imagen_ancho,
+        "height": producto.imagen_alto,
+        "css_class": css_class,
+        "loading": loading,
+    }
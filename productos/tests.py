@@ -1,4 +1,9 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
 from productos.models import Product
@@ -35,4 +40,1509 @@ class ProductModelTest(TestCase):
         self.assertEqual(producto.name, "Gorro")
         self.assertEqual(producto.price, 15000)
         self.assertEqual(producto.seller.username, "testuser")
-        self.assertTrue(producto.id)
\ No newline at end of file
+        self.assertTrue(producto.id)
+
+class ProductSearchTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="vendedora", password="12345")
+        self.bufanda = Product.objects.create(
+            seller=self.user, name="Bufanda de algodón", price=20000,
+            description="Suave y liviana", material="Algodón", stock=3,
+        )
+        self.gorro = Product.objects.create(
+            seller=self.user, name="Gorro", price=15000,
+            description="Tejido con algodon orgánico", material="Lana", stock=2,
+        )
+
+    def test_busqueda_ignora_tildes(self):
+        """'algodon' encuentra 'algodón' y viceversa."""
+        from productos.services.search import buscar_productos
+        resultado = set(buscar_productos(Product.objects.all(), "algodon"))
+        self.assertEqual(resultado, {self.bufanda, self.gorro})
+        resultado = set(buscar_productos(Product.objects.all(), "ALGODÓN"))
+        self.assertEqual(resultado, {self.bufanda, self.gorro})
+
+    def test_busqueda_ordenada_por_relevancia(self):
+        """Una coincidencia en el nombre pesa más que en la descripción."""
+        from productos.services.search import buscar_productos
+        resultado = list(buscar_productos(Product.objects.all(), "algodon"))
+        self.assertEqual(resultado[0], self.bufanda)
+
+    def test_indice_se_actualiza_al_editar_y_borrar(self):
+        from productos.services.search import buscar_productos
+        self.gorro.name = "Gorro navideño"
+        self.gorro.save()
+        self.assertEqual(list(buscar_productos(Product.objects.all(), "navideno")), [self.gorro])
+        self.gorro.delete()
+        self.assertEqual(list(buscar_productos(Product.objects.all(), "navideno")), [])
+
+    def test_home_usa_busqueda(self):
+        response = self.client.get(reverse('home'), {"q": "algodon"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["productos"]), 2)
+
+
+
+class QueryPlanTest(TestCase):
+    """Verifica con EXPLAIN QUERY PLAN que las consultas de las vistas de
+    catálogo usan índices y no recorren toda la tabla de productos."""
+
+    SCAN_COMPLETO = re.compile(r"^SCAN (TABLE )?productos_product(?![\w])(?!.*USING)")
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="vendedora", password="12345")
+        for i in range(5):
+            Product.objects.create(
+                seller=self.user, name=f"Producto {i}", price=1000 * (i + 1),
+                material="Lana", color="Rojo", stock=i,
+            )
+
+    def assert_sin_scan_completo(self, url, params):
+        if connection.vendor != "sqlite":
+            self.skipTest("EXPLAIN QUERY PLAN solo aplica a SQLite")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query["sql"]
+                if not sql.startswith("SELECT") or "productos_product" not in sql:
+                    continue
+                cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                for fila in cursor.fetchall():
+                    detalle = fila[-1]
+                    self.assertIsNone(
+                        self.SCAN_COMPLETO.search(detalle),
+                        f"Scan completo con {params}: {detalle}\n{sql}",
+                    )
+
+    def test_home_usa_indices(self):
+        url = reverse('home')
+        for params in [
+            {},
+            {"material": "Lana"},
+            {"color": "Rojo"},
+            {"price_min": "1000", "price_max": "3000"},
+            {"q": "producto"},
+        ]:
+            self.assert_sin_scan_completo(url, params)
+
+    def test_home_pagina_siguiente_usa_indices(self):
+        from productos.services.paginacion import KeysetPaginator
+        from productos.services.catalogo import productos_catalogo
+        pagina = KeysetPaginator(productos_catalogo(), 2).get_page()
+        self.assert_sin_scan_completo(reverse('home'), {"cursor": pagina.next_cursor})
+
+    def test_mis_productos_usa_indices(self):
+        self.client.login(username="vendedora", password="12345")
+        url = reverse('mis_productos')
+        for params in [
+            {},
+            {"estado": "activo"},
+            {"estado": "inactivo"},
+            {"estado": "sin_stock"},
+            {"precio_min": "1000", "orden": "price"},
+            {"orden": "-stock"},
+            {"orden": "name"},
+        ]:
+            self.assert_sin_scan_completo(url, params)
+
+
+class FacetasTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="vendedora", password="12345")
+        self.lana = Product.objects.create(
+            seller=self.user, name="Gorro", price=15000, material="Lana", color="Rojo", stock=2,
+        )
+        Product.objects.create(
+            seller=self.user, name="Bolso", price=60000, material="Cuero", color="Rojo", stock=1,
+        )
+
+    def test_conteos_se_actualizan_con_senales(self):
+        from productos.services.facets import obtener_facetas
+        self.assertEqual(obtener_facetas()["material"], {"Lana": 1, "Cuero": 1})
+
+        self.lana.material = "Algodón"
+        self.lana.save()
+        Product.objects.create(
+            seller=self.user, name="Manta", price=90000, material="Lana", color="Azul", stock=0,
+        )
+        facetas = obtener_facetas()
+        self.assertEqual(facetas["material"], {"Algodón": 1, "Cuero": 1})
+        self.assertEqual(facetas["color"], {"Rojo": 2})
+        self.assertEqual(facetas["precio"], {"0-20000": 1, "50000-100000": 1})
+
+        self.lana.delete()
+        self.assertEqual(obtener_facetas()["material"], {"Cuero": 1})
+
+    def test_cambio_sin_facetas_nuevas_no_recalcula(self):
+        from productos.services.facets import CACHE_KEY, obtener_facetas
+        obtener_facetas()
+        self.lana.name = "Gorro de lana"
+        self.lana.stock = 5
+        self.lana.save()
+        self.assertIsNotNone(cache.get(CACHE_KEY))
+        self.lana.color = "Azul"
+        self.lana.save()
+        self.assertIsNone(cache.get(CACHE_KEY))
+        self.assertEqual(obtener_facetas()["color"], {"Rojo": 1, "Azul": 1})
+
+    def test_conteos_acotados_al_filtro(self):
+        from productos.services.facets import facetas_para
+        facetas = facetas_para({"color": "Rojo", "price_max": "20000"})
+        self.assertEqual(facetas["material"], {"Lana": 1})
+        # La faceta de color ignora su propio filtro
+        self.assertEqual(facetas["color"], {"Rojo": 1})
+
+    def test_home_sin_consultas_de_facetas_en_cache(self):
+        self.client.get(reverse('home'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('home'), {"page": "1"})
+        self.assertFalse(any("GROUP BY" in q["sql"] for q in ctx.captured_queries))
+
+
+
+class KeysetPaginatorTest(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username="vendedora", password="12345")
+        # Precios repetidos para probar el desempate por id
+        for i in range(11):
+            Product.objects.create(seller=user, name=f"P{i}", price=1000 * (i % 3), stock=1)
+
+    def recorrer(self, paginator):
+        ids, pagina = [], paginator.get_page()
+        while True:
+            ids.extend(p.id for p in pagina)
+            if not pagina.has_next():
+                return ids, pagina
+            pagina = paginator.get_page(pagina.next_cursor)
+
+    def test_recorre_todo_sin_repetir_ni_saltar(self):
+        from productos.services.paginacion import KeysetPaginator
+        for orden in ("price", "-price", "-created_at", "name"):
+            paginator = KeysetPaginator(Product.objects.all(), 4, ordering=[orden])
+            esperado = list(Product.objects.order_by(orden, "-id" if orden.startswith("-") else "id")
+                            .values_list("id", flat=True))
+            ids, ultima = self.recorrer(paginator)
+            self.assertEqual(ids, esperado, orden)
+
+            # Y hacia atrás desde la última página
+            atras, pagina = list(ultima.object_list), ultima
+            while pagina.has_previous():
+                pagina = paginator.get_page(pagina.previous_cursor)
+                atras[:0] = pagina.object_list
+            self.assertEqual([p.id for p in atras], esperado, orden)
+
+    def test_ultima_pagina_y_total_aproximado(self):
+        from productos.services.paginacion import KeysetPaginator
+        paginator = KeysetPaginator(Product.objects.order_by("-created_at"), 4, total_limite=5)
+        pagina = paginator.get_page(paginator.cursor_ultima_pagina())
+        self.assertEqual(len(pagina), 4)
+        self.assertFalse(pagina.has_next())
+        self.assertEqual((pagina.total, pagina.total_exacto), (5, False))
+
+    def test_cursor_invalido_devuelve_primera_pagina(self):
+        from productos.services.paginacion import KeysetPaginator
+        pagina = KeysetPaginator(Product.objects.all(), 4).get_page("no-es-un-cursor")
+        self.assertFalse(pagina.has_previous())
+        self.assertEqual(len(pagina), 4)
+
+    def test_cursor_con_valores_nulos_es_invalido(self):
+        import base64
+        from productos.services.paginacion import KeysetPaginator
+        nulos = base64.urlsafe_b64encode(b'{"d": "n", "v": [null, null]}').decode("ascii").rstrip("=")
+        pagina = KeysetPaginator(Product.objects.order_by("-created_at"), 4).get_page(nulos)
+        self.assertFalse(pagina.has_previous())
+        self.assertEqual(len(pagina), 4)
+        self.assertEqual(self.client.get(reverse("api_products"), {"cursor": nulos}).status_code, 400)
+
+
+
+class GridCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="vendedora", password="12345")
+        self.lana = Product.objects.create(
+            seller=self.user, name="Gorro", price=15000, material="Lana", color="Rojo", stock=2,
+        )
+        self.cuero = Product.objects.create(
+            seller=self.user, name="Bolso", price=60000, material="Cuero", color="Negro", stock=1,
+        )
+
+    def get_home(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('home'), params)
+        consultas = [q["sql"] for q in ctx.captured_queries if "productos_product" in q["sql"]]
+        return response, consultas
+
+    def test_segunda_visita_no_consulta_productos(self):
+        primera, _ = self.get_home(material="Lana")
+        segunda, consultas = self.get_home(material="Lana")
+        self.assertIn('grid;desc="miss"', primera["Server-Timing"])
+        self.assertIn('grid;desc="hit"', segunda["Server-Timing"])
+        self.assertEqual(consultas, [])
+        self.assertContains(segunda, "Gorro")
+
+    def test_invalidacion_por_segmento(self):
+        self.get_home()
+        self.get_home(material="Cuero")
+        self.lana.name = "Gorro navideño"
+        self.lana.save()
+
+        response, _ = self.get_home(material="Cuero")
+        self.assertIn('desc="hit"', response["Server-Timing"])
+        response, _ = self.get_home()
+        self.assertIn('desc="miss"', response["Server-Timing"])
+        self.assertContains(response, "Gorro navideño")
+
+    def test_versiones_en_la_base(self):
+        from productos.models import GridVersion
+        self.get_home(material="Lana")
+        antes = GridVersion.objects.get(segmento="material:Lana").version
+        self.lana.name = "Gorro azul"
+        self.lana.save()
+        # Otro proceso, con su propia caché, ve la versión nueva en la base
+        self.assertEqual(GridVersion.objects.get(segmento="material:Lana").version, antes + 1)
+        response, _ = self.get_home(material="Lana")
+        self.assertIn('desc="miss"', response["Server-Timing"])
+        self.assertContains(response, "Gorro azul")
+
+    def test_cursores_equivalentes_comparten_entrada(self):
+        from productos.services.catalogo import productos_catalogo
+        from productos.services.paginacion import KeysetPaginator
+        cursor = KeysetPaginator(productos_catalogo(), 1).get_page().next_cursor
+        primera, _ = self.get_home(cursor=cursor)
+        self.assertIn('desc="miss"', primera["Server-Timing"])
+        response, _ = self.get_home(cursor=cursor + "==")
+        self.assertIn('desc="hit"', response["Server-Timing"])
+        # Los inválidos son la primera página
+        self.get_home(cursor="basura")
+        for invalido in ("otra-basura", ""):
+            response, _ = self.get_home(cursor=invalido)
+            self.assertIn('desc="hit"', response["Server-Timing"])
+
+    def test_favoritos_fuera_del_fragmento(self):
+        session = self.client.session
+        session["favoritos"] = [self.lana.id]
+        session.save()
+        self.get_home()
+        response, _ = self.get_home()
+        self.assertIn('desc="hit"', response["Server-Timing"])
+        self.assertContains(response, f'id="favoritos-ids" type="application/json">[{self.lana.id}]')
+
+    def test_metricas_solo_staff(self):
+        self.get_home()
+        self.get_home()
+        self.assertEqual(self.client.get(reverse('grid_cache_metrics')).status_code, 302)
+        User.objects.create_user(username="admin", password="12345", is_staff=True)
+        self.client.login(username="admin", password="12345")
+        datos = self.client.get(reverse('grid_cache_metrics')).json()
+        self.assertEqual((datos["hits"], datos["misses"]), (1, 1))
+
+
+class QuotePoolTest(TestCase):
+    """La latencia de las páginas no depende de la API de frases."""
+
+    RETARDO = 1.5
+
+    def setUp(self):
+        import json
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        retardo = self.RETARDO
+
+        class ApiLenta(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(retardo)
+                cuerpo = json.dumps([{"content": "Frase del servidor de prueba"}]).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), ApiLenta)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.servidor.server_port}/quotes/random"
+
+    def tearDown(self):
+        from productos.services.quotes import reiniciar_pool
+        reiniciar_pool()
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def test_pagina_no_espera_a_la_api(self):
+        import time
+        from django.test import override_settings
+        from productos.services.quotes import CITAS_LOCALES, obtener_pool, reiniciar_pool
+
+        with override_settings(QUOTES_API_URL=self.url, QUOTES_REFRESH_SECONDS=60):
+            reiniciar_pool()
+            inicio = time.perf_counter()
+            response = self.client.get(reverse('home'))
+            duracion = time.perf_counter() - inicio
+
+            self.assertLess(duracion, self.RETARDO / 2)
+            self.assertIn(response.context["quote"], CITAS_LOCALES)
+            self.assertNotIn("quote", self.client.session.keys())
+
+            # Cuando la API responde, el hilo actualiza el pool
+            limite = time.time() + self.RETARDO * 4
+            while obtener_pool().citas() == CITAS_LOCALES and time.time() < limite:
+                time.sleep(0.05)
+            self.assertEqual(obtener_pool().cita_actual(), "Frase del servidor de prueba")
+
+
+class ImagePipelineTest(TestCase):
+
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        self.media = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.media.name)
+        self.override.enable()
+        self.user = User.objects.create_user(username="vendedora", password="12345")
+
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+
+    def png(self, ancho, alto):
+        from io import BytesIO
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        buffer = BytesIO()
+        Image.new("RGBA", (ancho, alto), (200, 30, 30, 128)).save(buffer, format="PNG")
+        return SimpleUploadedFile("foto.png", buffer.getvalue(), content_type="image/png")
+
+    def test_guardar_no_procesa_y_el_worker_optimiza(self):
+        from PIL import Image
+        from productos.models import EstadoImagen, ImageJob
+        from productos.services.images import procesar_pendientes
+
+        producto = Product.objects.create(
+            seller=self.user, name="Gorro", price=15000, stock=1, imagen=self.png(2400, 1600),
+        )
+        self.assertEqual(producto.imagen_estado, EstadoImagen.PENDIENTE)
+        self.assertTrue(producto.imagen.name.endswith(".png"))
+        self.assertEqual(ImageJob.objects.filter(estado=EstadoImagen.PENDIENTE).count(), 1)
+
+        self.assertEqual(procesar_pendientes(), 1)
+        producto.refresh_from_db()
+        self.assertEqual(producto.imagen_estado, EstadoImagen.LISTA)
+        self.assertTrue(producto.imagen.name.endswith(".jpg"))
+        with Image.open(producto.imagen.path) as img:
+            self.assertEqual((img.format, img.size), ("JPEG", (1200, 800)))
+
+    def test_trabajo_de_un_worker_caido_se_retoma(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from productos.models import EstadoImagen, ImageJob
+        from productos.services import images
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        producto = Product.objects.create(seller=self.user, name="Gorro", price=15000, stock=1, imagen=self.png(100, 100))
+        job = images.reclamar_trabajo()
+        self.assertIsNone(images.reclamar_trabajo())
+        ImageJob.objects.filter(pk=job.pk).update(actualizado=hace_una_hora)
+        self.assertEqual(images.reclamar_trabajo().pk, job.pk)
+
+        ImageJob.objects.filter(pk=job.pk).update(intentos=images.MAX_INTENTOS, actualizado=hace_una_hora)
+        self.assertIsNone(images.reclamar_trabajo())
+        self.assertEqual(ImageJob.objects.get(pk=job.pk).estado, EstadoImagen.ERROR)
+        producto.refresh_from_db()
+        self.assertEqual(producto.imagen_estado, EstadoImagen.ERROR)
+
+    def test_trabajo_obsoleto_si_la_imagen_cambio(self):
+        from productos.models import EstadoImagen, ImageJob
+        from productos.services.images import procesar_pendientes
+
+        producto = Product.objects.create(
+            seller=self.user, name="Gorro", price=15000, stock=1, imagen=self.png(100, 100),
+        )
+        producto.imagen = self.png(50, 50)
+        producto.save()
+        procesar_pendientes()
+        primero, segundo = ImageJob.objects.order_by("id")
+        self.assertEqual(primero.error, "obsoleto")
+        self.assertEqual(segundo.estado, EstadoImagen.LISTA)
+
+    def test_versiones_responsive_y_dimensiones(self):
+        from django.template import Context, Template
+        from productos.services.images import formatos_versiones, procesar_pendientes
+
+        producto = Product.objects.create(
+            seller=self.user, name="Gorro", price=15000, stock=1, imagen=self.png(2400, 1600),
+        )
+        procesar_pendientes()
+        producto.refresh_from_db()
+        self.assertEqual((producto.imagen_ancho, producto.imagen_alto), (1200, 800))
+        self.assertEqual(set(producto.imagen_versiones), set(formatos_versiones()))
+        self.assertEqual([a for a, _n in producto.imagen_versiones["jpeg"]], [400, 800, 1200])
+
+        html = Template('{% load image_tags %}{% imagen_producto producto "card" %}').render(
+            Context({"producto": producto})
+        )
+        self.assertIn('width="1200" height="800"', html)
+        self.assertIn("400w", html)
+        self.assertIn('type="image/webp"', html)
+
+    def test_imagen_nueva_descarta_versiones_anteriores(self):
+        import os
+        from productos.services.images import procesar_pendientes
+
+        producto = Product.objects.create(
+            seller=self.user, name="Gorro", price=15000, stock=1, imagen=self.png(500, 500),
+        )
+        procesar_pendientes()
+        producto.refresh_from_db()
+        viejas = [n for lista in producto.imagen_versiones.values() for _a, n in lista]
+        producto.imagen = self.png(300, 300)
+        producto.save()
+        self.assertEqual(producto.imagen_versiones, {})
+        self.assertFalse(any(os.path.exists(producto.imagen.storage.path(n)) for n in viejas))
+
+    def test_misma_imagen_se_guarda_una_vez_y_no_se_reprocesa(self):
+        from productos.models import EstadoImagen, ImageJob
+        from productos.services.images import procesar_pendientes
+
+        primero = Product.objects.create(
+            seller=self.user, name="Gorro", price=15000, stock=1, imagen=self.png(900, 600),
+        )
+        procesar_pendientes()
+        primero.refresh_from_db()
+
+        segundo = Product.objects.create(
+            seller=self.user, name="Gorro azul", price=15000, stock=1, imagen=self.png(900, 600),
+        )
+        self.assertEqual(ImageJob.objects.count(), 1)
+        self.assertEqual(segundo.imagen_estado, EstadoImagen.LISTA)
+        self.assertEqual(segundo.imagen.name, primero.imagen.name)
+        self.assertEqual(segundo.imagen_versiones, primero.imagen_versiones)
+
+        # Cambiar la imagen del segundo no borra los archivos que usa el primero
+        segundo.imagen = self.png(300, 300)
+        segundo.save()
+        for _ancho, nombre in primero.imagen_versiones["jpeg"]:
+            self.assertTrue(primero.imagen.storage.exists(nombre))
+
+        # Guardar sin tocar la imagen tampoco encola nada
+        primero.stock = 5
+        primero.save()
+        self.assertEqual(ImageJob.objects.count(), 2)
+
+    def test_limpiar_media_borra_solo_huerfanos(self):
+        from io import StringIO
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+        from productos.services.images import procesar_pendientes
+
+        producto = Product.objects.create(
+            seller=self.user, name="Gorro", price=15000, stock=1, imagen=self.png(500, 500),
+        )
+        procesar_pendientes()
+        producto.refresh_from_db()
+        huerfano = default_storage.save("imagenProductos/viejo.jpg", ContentFile(b"sin uso"))
+
+        call_command("limpiar_media", "--min-edad", "0", stdout=StringIO())
+        self.assertFalse(default_storage.exists(huerfano))
+        self.assertTrue(default_storage.exists(producto.imagen.name))
+        for _ancho, nombre in producto.imagen_versiones["webp"]:
+            self.assertTrue(default_storage.exists(nombre))
+
+    def test_presupuesto_de_pixeles(self):
+        from django.core.exceptions import ValidationError
+        from django.test import override_settings
+
+        producto = Product(seller=self.user, name="Gorro", price=15000, stock=1, imagen=self.png(400, 300))
+        with override_settings(IMAGEN_MAX_PIXELES=100_000):
+            with self.assertRaises(ValidationError) as ctx:
+                producto.full_clean()
+        self.assertIn("imagen", ctx.exception.message_dict)
+        producto.full_clean()
+
+    def test_jpeg_grande_se_decodifica_reducido(self):
+        from io import BytesIO
+        from PIL import Image
+        from productos.services.images import abrir_reducida, comprimir_imagen
+
+        buffer = BytesIO()
+        Image.new("RGB", (4800, 3600), (10, 120, 200)).save(buffer, format="JPEG")
+        buffer.seek(0)
+        img = abrir_reducida(buffer, (1200, 1200))
+        self.assertEqual(img.size, (2400, 1800))  # draft a 1/2, sin decodificar 4800x3600
+
+        buffer.seek(0)
+        with Image.open(comprimir_imagen(buffer, (1200, 1200))) as resultado:
+            self.assertEqual(resultado.size, (1200, 900))
+
+
+class CarritoTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username="vendedora", password="12345")
+        self.gorro = Product.objects.create(seller=self.seller, name="Gorro", price="15000.50", stock=5)
+        self.bufanda = Product.objects.create(seller=self.seller, name="Bufanda", price=30000, stock=2)
+
+    def consultas_a_productos(self, contexto):
+        return [q for q in contexto.captured_queries if 'FROM "productos_product"' in q["sql"]]
+
+    def test_agregar_no_consulta_productos_y_la_sesion_solo_guarda_el_id(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("agregar_al_carrito", args=[self.gorro.pk]))
+            self.client.get(reverse("agregar_al_carrito", args=[self.gorro.pk]))
+        self.assertEqual(self.consultas_a_productos(ctx), [])
+        self.assertNotIn("carrito", self.client.session)
+        self.assertIsInstance(self.client.session["carrito_id"], int)
+
+    def test_ver_carrito_revalida_en_una_consulta_con_decimal(self):
+        from decimal import Decimal
+        for producto in (self.gorro, self.gorro, self.bufanda):
+            self.client.get(reverse("agregar_al_carrito", args=[producto.pk]))
+        Product.objects.filter(pk=self.gorro.pk).update(price="16000.25")
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("ver_carrito"))
+        self.assertEqual(len(self.consultas_a_productos(ctx)), 1)
+        self.assertEqual(response.context["total"], Decimal("62000.50"))
+
+    def test_stock_e_inactivos_se_ajustan(self):
+        for _ in range(3):
+            self.client.get(reverse("agregar_al_carrito", args=[self.bufanda.pk]))
+        self.client.get(reverse("agregar_al_carrito", args=[self.gorro.pk]))
+        Product.objects.filter(pk=self.gorro.pk).update(is_active=False)
+
+        response = self.client.get(reverse("ver_carrito"))
+        lineas = list(response.context["carrito"])
+        self.assertEqual([(l.producto_id, l.cantidad) for l in lineas], [(self.bufanda.pk, 2)])
+        # Ya ajustado: la compra sigue sin volver a avisar
+        response = self.client.post(reverse("comprar_carrito"))
+        self.assertTrue(response["Location"].startswith("https://wa.me/"))
+
+    def test_cambios_hechos_desde_otro_proceso_no_se_pierden(self):
+        from django.db.models import F
+        from productos.models import Cart, CartItem
+        self.client.get(reverse("agregar_al_carrito", args=[self.gorro.pk]))
+        cart_id = self.client.session["carrito_id"]
+        # Otro worker (con su propia caché) cambia el carrito: esta caché queda vieja
+        CartItem.objects.filter(cart_id=cart_id).update(cantidad=3)
+        CartItem.objects.create(cart_id=cart_id, product_id=self.bufanda.pk, cantidad=1)
+        Cart.objects.filter(pk=cart_id).update(version=F("version") + 1)
+
+        response = self.client.get(reverse("ver_carrito"))
+        cantidades = {l.producto_id: l.cantidad for l in response.context["carrito"]}
+        self.assertEqual(cantidades, {self.gorro.pk: 3, self.bufanda.pk: 1})
+        self.client.get(reverse("agregar_al_carrito", args=[self.gorro.pk]))
+        self.assertEqual(
+            dict(CartItem.objects.filter(cart_id=cart_id).values_list("product_id", "cantidad")),
+            {self.gorro.pk: 4, self.bufanda.pk: 1},
+        )
+
+    def test_el_carrito_anonimo_se_une_al_del_usuario(self):
+        comprador = User.objects.create_user(username="comprador", password="12345")
+        self.client.force_login(comprador)
+        self.client.get(reverse("agregar_al_carrito", args=[self.gorro.pk]))
+        self.client.logout()
+
+        self.client.get(reverse("agregar_al_carrito", args=[self.gorro.pk]))
+        self.client.get(reverse("agregar_al_carrito", args=[self.bufanda.pk]))
+        self.client.force_login(comprador)
+        response = self.client.get(reverse("ver_carrito"))
+        cantidades = {l.producto_id: l.cantidad for l in response.context["carrito"]}
+        self.assertEqual(cantidades, {self.gorro.pk: 2, self.bufanda.pk: 1})
+        self.assertEqual(comprador.carrito.items.count(), 2)
+
+
+class SesionesTest(TestCase):
+
+    def escrituras(self, contexto):
+        return [q for q in contexto.captured_queries
+                if "django_session" in q["sql"] and q["sql"].startswith(("INSERT", "UPDATE"))]
+
+    def test_no_se_guarda_si_los_datos_no_cambian(self):
+        from productos.sesiones.db import SessionStore
+        sesion = SessionStore()
+        sesion["carrito_id"] = 1
+        sesion.save()
+
+        misma = SessionStore(sesion.session_key)
+        misma["carrito_id"] = 1
+        with CaptureQueriesContext(connection) as ctx:
+            misma.save()
+        self.assertEqual(self.escrituras(ctx), [])
+
+        misma["carrito_id"] = 2
+        with CaptureQueriesContext(connection) as ctx:
+            misma.save()
+        self.assertEqual(len(self.escrituras(ctx)), 1)
+        self.assertEqual(SessionStore(sesion.session_key)["carrito_id"], 2)
+
+    def test_modo_cookie_firmada_no_escribe_en_la_base(self):
+        from django.contrib.sessions.models import Session
+        from django.test import override_settings
+        seller = User.objects.create_user(username="vendedora", password="12345")
+        producto = Product.objects.create(seller=seller, name="Gorro", price=15000, stock=5)
+
+        with override_settings(SESSION_ENGINE="productos.sesiones.signed_cookies"):
+            self.client.get(reverse("agregar_al_carrito", args=[producto.pk]))
+            self.client.post(reverse("toggle_favorite", args=[producto.pk]))
+            response = self.client.get(reverse("ver_carrito"))
+        self.assertEqual(len(response.context["carrito"]), 1)
+        self.assertFalse(Session.objects.exists())
+
+
+class CarritoApiTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        seller = User.objects.create_user(username="vendedora", password="12345")
+        self.gorro = Product.objects.create(seller=seller, name="Gorro", price=15000, stock=5)
+        self.bufanda = Product.objects.create(seller=seller, name="Bufanda", price=30000, stock=5)
+
+    def post(self, nombre, *args, datos=None):
+        import json
+        return self.client.post(
+            reverse(nombre, args=args), json.dumps(datos or {}), content_type="application/json",
+        ).json()
+
+    def test_operaciones_devuelven_solo_el_delta(self):
+        data = self.post("carrito_api_agregar", self.gorro.pk, datos={"cantidad": 2})
+        self.assertEqual(data["lineas"], [{
+            "producto_id": self.gorro.pk, "nombre": "Gorro", "cantidad": 2,
+            "precio": "15000.00", "subtotal": "30000.00", "problema": "",
+        }])
+        self.assertEqual((data["total"], data["total_items"], data["productos"]), ("30000.00", 2, 1))
+        self.assertNotIn("cart_html", data)
+
+        data = self.post("carrito_api_lote", datos={"items": {str(self.gorro.pk): 0, str(self.bufanda.pk): 3}})
+        self.assertEqual([l["cantidad"] for l in data["lineas"]], [0, 3])
+        self.assertEqual(data["total"], "90000.00")
+
+        data = self.post("carrito_api_fijar", self.bufanda.pk, datos={"cantidad": 1})
+        self.assertEqual(data["total_items"], 1)
+        data = self.post("carrito_api_quitar", self.bufanda.pk)
+        self.assertEqual((data["productos"], data["total"]), (0, "0"))
+
+    def test_quitar_y_limpiar_por_ajax(self):
+        self.post("carrito_api_agregar", self.gorro.pk)
+        self.post("carrito_api_agregar", self.bufanda.pk)
+        data = self.client.get(
+            reverse("quitar_del_carrito", args=[self.gorro.pk]), HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        ).json()
+        self.assertEqual(data["productos"], 1)
+        data = self.client.get(reverse("limpiar_carrito"), HTTP_X_REQUESTED_WITH="XMLHttpRequest").json()
+        self.assertEqual(data["productos"], 0)
+        self.assertEqual([l["cantidad"] for l in data["lineas"]], [0])
+
+    def test_fragmento_cacheado_por_version(self):
+        self.post("carrito_api_agregar", self.gorro.pk)
+        self.client.get(reverse("carrito_fragmento"))
+        with CaptureQueriesContext(connection) as ctx:
+            html = self.client.get(reverse("carrito_fragmento")).content.decode()
+        self.assertFalse([q for q in ctx.captured_queries if "productos_product" in q["sql"]])
+        self.assertIn("Gorro", html)
+
+        # Cambiar el precio deja obsoleto el fragmento
+        self.gorro.price = 17000
+        self.gorro.save()
+        html = self.client.get(reverse("carrito_fragmento")).content.decode()
+        self.assertIn("17.000", html)
+
+
+class FavoritosTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username="vendedora", password="12345")
+        self.gorro = Product.objects.create(seller=self.seller, name="Gorro", price=15000, stock=5)
+        self.bufanda = Product.objects.create(seller=self.seller, name="Bufanda", price=30000, stock=2)
+        self.compradora = User.objects.create_user(username="compradora", password="12345")
+
+    def marcar(self, producto, **cuerpo):
+        import json
+        return self.client.post(
+            reverse("toggle_favorite", args=[producto.pk]),
+            data=json.dumps(cuerpo), content_type="application/json",
+        ).json()
+
+    def test_estado_explicito_es_idempotente(self):
+        from productos.models import Favorite
+        self.client.login(username="compradora", password="12345")
+        self.assertEqual(self.marcar(self.gorro, favorito=True), {"favorito": True, "cantidad": 1})
+        self.assertEqual(self.marcar(self.gorro, favorito=True), {"favorito": True, "cantidad": 1})
+        self.assertEqual(Favorite.objects.filter(user=self.compradora).count(), 1)
+        self.assertEqual(self.marcar(self.gorro), {"favorito": False, "cantidad": 0})
+        self.assertEqual(self.marcar(self.gorro, favorito=False)["favorito"], False)
+
+    def test_exige_token_csrf(self):
+        from django.test import Client
+        from productos.models import Favorite
+        cliente = Client(enforce_csrf_checks=True)
+        cliente.login(username="compradora", password="12345")
+        url = reverse("toggle_favorite", args=[self.gorro.pk])
+        self.assertEqual(cliente.post(url).status_code, 403)
+        self.assertFalse(Favorite.objects.exists())
+
+        cliente.get(reverse("home"))
+        token = cliente.cookies["csrftoken"].value
+        self.assertEqual(cliente.post(url, HTTP_X_CSRFTOKEN=token).json()["favorito"], True)
+
+    def test_producto_inexistente_devuelve_404(self):
+        self.client.login(username="compradora", password="12345")
+        response = self.client.post(reverse("toggle_favorite", args=[9999]))
+        self.assertEqual(response.status_code, 404)
+        self.client.logout()
+        response = self.client.post(reverse("toggle_favorite", args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_favoritos_anonimos_se_guardan_al_iniciar_sesion(self):
+        from productos.models import Favorite
+        self.marcar(self.gorro)
+        self.marcar(self.bufanda)
+        self.client.login(username="compradora", password="12345")
+        self.assertEqual(
+            set(Favorite.objects.filter(user=self.compradora).values_list("product_id", flat=True)),
+            {self.gorro.pk, self.bufanda.pk},
+        )
+        self.assertNotIn("favoritos", self.client.session)
+        response = self.client.get(reverse("favoritos"))
+        self.assertEqual(response.context["favoritos_cantidad"], 2)
+
+    def test_home_consulta_favoritos_de_la_grilla_en_una_consulta(self):
+        self.client.login(username="compradora", password="12345")
+        self.marcar(self.bufanda, favorito=True)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("home"))
+        self.assertEqual(response.context["favoritos_ids"], [self.bufanda.pk])
+        consultas = [q for q in ctx.captured_queries if 'FROM "productos_favorite"' in q["sql"]]
+        self.assertEqual(len(consultas), 1)
+
+
+class InventarioTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username="vendedora", password="12345")
+        self.ruana = Product.objects.create(seller=self.seller, name="Ruana", price=90000, stock=3)
+        self.gorro = Product.objects.create(seller=self.seller, name="Gorro", price=15000, stock=1)
+
+    def carrito(self):
+        from productos.models import Cart
+        return Cart.objects.create().pk
+
+    def test_reserva_todo_o_nada_y_apaga_sin_stock(self):
+        from productos.services import inventario
+        inventario.reservar(self.carrito(), {self.ruana.pk: 2, self.gorro.pk: 1})
+        self.ruana.refresh_from_db()
+        self.gorro.refresh_from_db()
+        self.assertEqual((self.ruana.stock, self.ruana.is_active), (1, True))
+        self.assertEqual((self.gorro.stock, self.gorro.is_active), (0, False))
+
+        with self.assertRaises(inventario.StockInsuficiente) as error:
+            inventario.reservar(self.carrito(), {self.ruana.pk: 1, self.gorro.pk: 1})
+        self.assertEqual(error.exception.producto_id, self.gorro.pk)
+        self.ruana.refresh_from_db()
+        self.assertEqual(self.ruana.stock, 1)
+
+    def test_reservas_vencidas_vuelven_al_stock(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from productos.services import inventario
+        cart_id = self.carrito()
+        inventario.reservar(cart_id, {self.gorro.pk: 1})
+        # Comprar otra vez con el mismo carrito reemplaza la reserva, no la duplica
+        inventario.reservar(cart_id, {self.gorro.pk: 1})
+        self.assertEqual(inventario.liberar_vencidas(), 0)
+
+        self.assertEqual(inventario.liberar_vencidas(timezone.now() + timedelta(hours=1)), 1)
+        self.gorro.refresh_from_db()
+        self.assertEqual((self.gorro.stock, self.gorro.is_active), (1, True))
+
+    def test_comprar_devuelve_reservas_vencidas_sin_el_comando(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from productos.models import StockReservation
+        from productos.services import inventario
+        inventario.reservar(self.carrito(), {self.gorro.pk: 1})
+        StockReservation.objects.update(vence=timezone.now() - timedelta(minutes=1))
+        # Sin liberar_reservas, otro comprador igual puede llevarse el gorro
+        inventario.reservar(self.carrito(), {self.gorro.pk: 1})
+        self.gorro.refresh_from_db()
+        self.assertEqual(self.gorro.stock, 0)
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+    def test_comprar_solo_por_post(self):
+        self.client.get(reverse("agregar_al_carrito", args=[self.gorro.pk]))
+        self.assertEqual(self.client.get(reverse("comprar_carrito")).status_code, 405)
+        self.gorro.refresh_from_db()
+        self.assertEqual(self.gorro.stock, 1)
+
+    def test_update_masivo_apaga_productos_sin_stock(self):
+        Product.objects.filter(pk=self.ruana.pk).update(stock=0)
+        self.ruana.refresh_from_db()
+        self.assertFalse(self.ruana.is_active)
+
+    def test_comprar_reserva_y_el_carrito_cuenta_su_reserva(self):
+        self.client.get(reverse("agregar_al_carrito", args=[self.gorro.pk]))
+        response = self.client.post(reverse("comprar_carrito"))
+        self.assertTrue(response.url.startswith("https://wa.me/"))
+        self.gorro.refresh_from_db()
+        self.assertEqual(self.gorro.stock, 0)
+        # El gorro quedó apartado para este carrito: no se le quita al verlo
+        response = self.client.get(reverse("ver_carrito"))
+        self.assertEqual([l.cantidad for l in response.context["carrito"]], [1])
+        response = self.client.post(reverse("comprar_carrito"))
+        self.assertTrue(response.url.startswith("https://wa.me/"))
+
+
+class InventarioConcurrenciaTest(TestCase):
+
+    def test_compradores_concurrentes_no_venden_de_mas(self):
+        # La base de pruebas en memoria no admite escritores en paralelo: el
+        # benchmark corre aparte sobre un SQLite en archivo (WAL y DELETE) y
+        # falla si el stock vendido no cuadra
+        import subprocess
+        import sys
+        from django.conf import settings
+        salida = subprocess.run(
+            [sys.executable, "manage.py", "bench_inventario", "--compradores", "60",
+             "--stock", "20", "--hilos", "8", "--lectores", "1"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=300,
+        )
+        self.assertEqual(salida.returncode, 0, salida.stderr)
+        filas = [linea.split() for linea in salida.stdout.splitlines()[1:]]
+        self.assertEqual([(f[0], f[1], f[4], f[5]) for f in filas], [
+            ("wal", "20", "20", "0"),
+            ("delete", "20", "20", "0"),
+        ])
+
+
+class EstadisticasVendedorTest(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create_user(username="vendedora", password="12345")
+        self.ruana = Product.objects.create(seller=self.seller, name="Ruana", price="100.50", stock=2)
+        self.gorro = Product.objects.create(seller=self.seller, name="Gorro", price=20, stock=0)
+
+    def estadisticas(self):
+        from productos.services.estadisticas import estadisticas_de
+        e = estadisticas_de(self.seller)
+        return (e.productos, e.activos, e.sin_stock, e.valor_inventario)
+
+    def test_se_mantienen_con_cada_escritura(self):
+        from decimal import Decimal
+        from productos.services.estadisticas import reconciliar
+        self.assertEqual(self.estadisticas(), (2, 1, 1, Decimal("201.00")))
+        # QuerySet.update no dispara señales: lo cubren los triggers
+        Product.objects.filter(pk=self.gorro.pk).update(stock=5, is_active=True)
+        self.ruana.price = 50
+        self.ruana.save()
+        self.assertEqual(self.estadisticas(), (2, 2, 0, Decimal("200.00")))
+        Product.objects.filter(pk=self.ruana.pk).update(stock=0)
+        self.gorro.delete()
+        self.assertEqual(self.estadisticas(), (1, 0, 1, Decimal("0.00")))
+        self.assertEqual(reconciliar(), 0)
+
+    def test_reconciliar_corrige_diferencias(self):
+        from productos.models import SellerStats
+        from productos.services.estadisticas import reconciliar
+        esperado = self.estadisticas()
+        SellerStats.objects.filter(seller=self.seller).update(productos=99, valor_inventario=0)
+        self.assertEqual(reconciliar(), 1)
+        self.assertEqual(self.estadisticas(), esperado)
+
+    def test_panel_lee_la_fila_del_vendedor(self):
+        self.client.login(username="vendedora", password="12345")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("mis_productos"))
+        self.assertEqual((response.context["total_productos"], response.context["productos_activos"]), (2, 1))
+        agregados = [
+            q["sql"] for q in ctx.captured_queries
+            if "productos_product" in q["sql"] and ("COUNT(" in q["sql"] or "SUM(" in q["sql"])
+        ]
+        self.assertEqual(agregados, [])
+
+
+class ImportacionTest(TestCase):
+
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        cache.clear()
+        self.media = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.media.name)
+        self.override.enable()
+        self.seller = User.objects.create_user(username="vendedora", password="12345")
+        self.client.login(username="vendedora", password="12345")
+
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+
+    def subir(self, texto, imagenes=None):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        datos = {"archivo": SimpleUploadedFile("productos.csv", texto.encode("utf-8"), content_type="text/csv")}
+        if imagenes is not None:
+            datos["imagenes"] = SimpleUploadedFile("imagenes.zip", imagenes, content_type="application/zip")
+        return self.client.post(reverse("importar_productos"), datos)
+
+    def zip_con_imagen(self, nombre):
+        import io
+        import zipfile
+        from PIL import Image
+        png = io.BytesIO()
+        Image.new("RGB", (300, 200), (200, 30, 30)).save(png, format="PNG")
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as z:
+            z.writestr(f"fotos/{nombre}", png.getvalue())
+        return buffer.getvalue()
+
+    def test_importa_filas_validas_y_reporta_las_demas(self):
+        from productos.models import ImageJob
+        from productos.services.estadisticas import estadisticas_de
+        from productos.services.search import buscar_productos
+        texto = (
+            "name,description,material,color,stock,price,horas,experiencia,imagen\n"
+            "Ruana tejida,Lana natural,lana,Gris,3,90000,,,ruana.png\n"
+            "Bolso,,cuero,,0,,10,experto,\n"
+            "Sin material,,plastico,,2,100,,,\n"
+            "Sin precio,,lana,,2,,,,\n"
+            "Foto perdida,,lana,,1,100,,,otra.png\n"
+        )
+        response = self.subir(texto, self.zip_con_imagen("ruana.png"))
+        resultado = response.context["resultado"]
+        self.assertEqual((resultado.creados, resultado.imagenes, resultado.filas_con_error), (2, 1, 3))
+        self.assertEqual(sorted({(e.fila, e.campo) for e in resultado.errores}), [(4, "material"), (5, ""), (6, "imagen")])
+
+        bolso = Product.objects.get(name="Bolso")
+        self.assertEqual((bolso.price, bolso.is_active), (1000 * 1.5 * 1.5 + 10 * 500, False))
+        self.assertEqual((bolso.horas, bolso.experiencia), (10, "experto"))
+        ruana = Product.objects.get(name="Ruana tejida")
+        self.assertTrue(ImageJob.objects.filter(object_id=ruana.pk).exists())
+        self.assertEqual(list(buscar_productos(Product.objects.all(), "ruana")), [ruana])
+        self.assertEqual(estadisticas_de(self.seller).productos, 2)
+
+        reporte = self.client.get(reverse("importar_errores", args=[resultado.clave_errores]))
+        contenido = b"".join(reporte.streaming_content).decode("utf-8")
+        self.assertIn("otra.png", contenido)
+
+    def test_consultas_por_lote_no_por_fila(self):
+        from Vendedores.importacion import importar_csv
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        filas = "".join(f"Ruana {i},lana,{i % 4},1000\n" for i in range(1200))
+        archivo = SimpleUploadedFile("p.csv", ("name,material,stock,price\n" + filas).encode("utf-8"))
+        with CaptureQueriesContext(connection) as ctx:
+            resultado = importar_csv(self.seller, archivo, lote=500)
+        self.assertEqual((resultado.creados, resultado.errores), (1200, []))
+        self.assertLess(len(ctx.captured_queries), 40)
+
+    def test_faltan_columnas(self):
+        response = self.subir("nombre,precio\nRuana,100\n")
+        resultado = response.context["resultado"]
+        self.assertEqual(resultado.creados, 0)
+        self.assertIn("name", resultado.errores[0].error)
+
+
+class AccionesMasivasTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username="vendedora", password="12345")
+        self.ruana = Product.objects.create(seller=self.seller, name="Ruana gris", material="lana", price=100, stock=2)
+        self.gorro = Product.objects.create(seller=self.seller, name="Gorro gris", material="lana", price=20, stock=0)
+        self.bolso = Product.objects.create(seller=self.seller, name="Bolso", material="cuero", price=300, stock=1)
+        otro = User.objects.create_user(username="otra", password="12345")
+        self.ajeno = Product.objects.create(seller=otro, name="Ruana ajena", price=50, stock=4)
+        Product.objects.filter(pk__in=[self.ruana.pk, self.ajeno.pk]).update(is_active=False)
+        self.client.login(username="vendedora", password="12345")
+
+    def accion(self, **datos):
+        return self.client.post(reverse("acciones_masivas"), datos, follow=True)
+
+    def mensajes(self, response):
+        return [str(m) for m in response.context["messages"]]
+
+    def test_activar_omite_sin_stock_y_productos_ajenos(self):
+        ids = [self.ruana.pk, self.gorro.pk, self.ajeno.pk]
+        response = self.accion(accion="activar", alcance="seleccion", ids=ids)
+        self.assertEqual(self.mensajes(response), ["1 producto(s) activado(s). 1 sin stock quedaron inactivos."])
+        activos = dict(Product.objects.values_list("name", "is_active"))
+        self.assertEqual(activos, {"Ruana gris": True, "Gorro gris": False, "Bolso": True, "Ruana ajena": False})
+
+    def test_precio_por_porcentaje_y_fijo(self):
+        from decimal import Decimal
+        from productos.services.estadisticas import estadisticas_de
+        self.accion(accion="porcentaje", porcentaje="-15", alcance="seleccion", ids=[self.ruana.pk, self.bolso.pk])
+        self.ruana.refresh_from_db()
+        self.bolso.refresh_from_db()
+        self.assertEqual((self.ruana.price, self.bolso.price), (Decimal("85.00"), Decimal("255.00")))
+        self.accion(accion="precio", precio="10", alcance="seleccion", ids=[self.gorro.pk, self.ajeno.pk])
+        self.ajeno.refresh_from_db()
+        self.assertEqual(self.ajeno.price, 50)
+        self.assertEqual(estadisticas_de(self.seller).valor_inventario, Decimal("425.00"))
+
+    def test_porcentaje_no_pasa_del_maximo_de_la_columna(self):
+        from decimal import Decimal
+        Product.objects.filter(pk=self.bolso.pk).update(price=Decimal("50000000"))
+        self.accion(accion="porcentaje", porcentaje="1000", alcance="seleccion", ids=[self.ruana.pk, self.bolso.pk])
+        precios = dict(Product.objects.filter(seller=self.seller).values_list("name", "price"))
+        self.assertEqual((precios["Bolso"], precios["Ruana gris"]), (Decimal("99999999.99"), Decimal("1100.00")))
+
+    def test_alcance_filtro_usa_los_filtros_del_listado(self):
+        response = self.accion(accion="desactivar", alcance="filtro", search="gris", orden="price")
+        self.assertEqual(response.redirect_chain[-1][0], reverse("mis_productos") + "?search=gris&orden=price")
+        self.assertEqual(self.mensajes(response), ["0 producto(s) desactivado(s)."])
+        response = self.accion(accion="desactivar", alcance="filtro", precio_min="200")
+        self.assertEqual(self.mensajes(response), ["1 producto(s) desactivado(s)."])
+        self.bolso.refresh_from_db()
+        self.assertFalse(self.bolso.is_active)
+
+    def test_eliminar_borra_dependientes_sin_señales(self):
+        from productos.models import Favorite
+        from productos.services.estadisticas import estadisticas_de
+        from productos.services.search import buscar_productos
+        Favorite.objects.create(user=self.seller, product=self.ruana)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.accion(accion="eliminar", alcance="filtro", search="ruana")
+        self.assertEqual(self.mensajes(response), ["1 producto(s) eliminado(s)."])
+        borrados = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('DELETE FROM "productos_product"')]
+        self.assertEqual(len(borrados), 1)
+        self.assertFalse(Favorite.objects.exists())
+        self.assertEqual(list(buscar_productos(Product.objects.all(), "ruana")), [self.ajeno])
+        self.assertEqual(estadisticas_de(self.seller).productos, 2)
+
+    def test_sin_seleccion_muestra_error(self):
+        response = self.accion(accion="eliminar", alcance="seleccion")
+        self.assertEqual(self.mensajes(response), ["No seleccionaste ningún producto."])
+        self.assertEqual(Product.objects.count(), 4)
+
+
+class PreciosTest(TestCase):
+
+    def setUp(self):
+        from productos.services import precios
+        cache.clear()
+        precios.descartar_tabla()
+        self.seller = User.objects.create_user(username="vendedora", password="12345")
+        self.ruana = Product.objects.create(seller=self.seller, name="Ruana", material="lana", price=0, stock=2, horas=10, experiencia="experto")
+        self.gorro = Product.objects.create(seller=self.seller, name="Gorro", material="lana", price=0, stock=1, horas=2)
+        self.manual = Product.objects.create(seller=self.seller, name="Bolso", material="lana", price=777, stock=1)
+
+    def tearDown(self):
+        from productos.services import precios
+        # La tabla en memoria no se entera del rollback del test
+        precios.descartar_tabla()
+
+    def test_factores_de_la_tabla_y_recarga(self):
+        from decimal import Decimal
+        from productos.models import FactorPrecio
+        from productos.services import precios
+        from Vendedores.views import calcular_precio_sugerido
+        self.assertEqual(calcular_precio_sugerido("lana", 10, "experto"), Decimal("6800.00"))
+        self.assertEqual(precios.precio_sugerido("madera", 1, ""), Decimal("1500.00"))
+        factor = FactorPrecio.objects.get(tipo="material", clave="lana")
+        factor.factor = Decimal("2")
+        factor.save()
+        self.assertEqual(calcular_precio_sugerido("lana", 10, "experto"), Decimal("8000.00"))
+        tabla = precios.tabla_precios()
+        self.assertEqual(
+            tabla.precios(["lana", "cuero", "lana"], [10, 0, 2], ["experto", "intermedio", ""]),
+            [tabla.precio("lana", 10, "experto"), Decimal("1800.00"), Decimal("3000.00")],
+        )
+
+    def test_redondeo_al_centavo_igual_con_y_sin_numpy(self):
+        from decimal import Decimal
+        from productos.services import precios
+        tabla = precios.TablaPrecios(
+            base=Decimal("1"), hora=Decimal("0.25"),
+            material={"lana": Decimal("1.005"), "cuero": Decimal("2.675")},
+            experiencia={"experto": Decimal("1.5")},
+        )
+        # En float 1.005 y 2.675 quedan apenas por debajo de la mitad
+        self.assertEqual(tabla.precio("lana", 0, ""), Decimal("1.01"))
+        self.assertEqual(tabla.precio("cuero", 0, ""), Decimal("2.68"))
+        self.assertEqual(tabla.precio("lana", 1, "experto"), Decimal("1.76"))
+        materiales = ["lana", "cuero", "madera"] * 4
+        horas = [0, 1, 2, None] * 3
+        experiencias = ["", "experto", "principiante"] * 4
+        self.assertEqual(
+            tabla.precios(materiales, horas, experiencias),
+            [tabla.precio(m, h, e) for m, h, e in zip(materiales, horas, experiencias)],
+        )
+
+    def test_cada_lote_se_guarda_aparte(self):
+        from decimal import Decimal
+        from productos.services import precios
+        llamadas = []
+
+        class TablaQueFalla(precios.TablaPrecios):
+            def precios(self, *args):
+                llamadas.append(1)
+                if len(llamadas) > 1:
+                    raise RuntimeError("se cortó")
+                return super().precios(*args)
+
+        tabla = TablaQueFalla(**vars(precios.tabla_precios()))
+        with self.assertRaises(RuntimeError):
+            precios.recalcular(aplicar=True, tabla=tabla, lote=1)
+        guardados = dict(Product.objects.values_list("name", "price"))
+        self.assertEqual((guardados["Ruana"], guardados["Gorro"]), (Decimal("6800.00"), Decimal("0.00")))
+
+    def test_precio_masivo_no_se_recalcula(self):
+        from decimal import Decimal
+        from productos.services import acciones, precios
+        precios.recalcular(aplicar=True)
+        acciones.cambiar_precio(Product.objects.filter(pk=self.ruana.pk), precio=Decimal("5000"))
+        acciones.cambiar_precio(Product.objects.filter(pk=self.gorro.pk), porcentaje=Decimal("10"))
+        self.assertEqual(precios.recalcular(aplicar=True).revisados, 0)
+        guardados = dict(Product.objects.values_list("name", "price"))
+        self.assertEqual((guardados["Ruana"], guardados["Gorro"]), (Decimal("5000.00"), Decimal("2420.00")))
+
+    def test_simulacion_y_aplicado(self):
+        from decimal import Decimal
+        from productos.models import FactorPrecio
+        from productos.services import precios
+        from productos.services.estadisticas import estadisticas_de
+        precios.recalcular(aplicar=True)
+        FactorPrecio.objects.filter(tipo="material", clave="lana").update(factor="1.5")
+        precios.descartar_tabla()
+
+        simulado = precios.recalcular()
+        self.assertEqual(simulado.revisados, 2)
+        self.assertEqual(
+            [(c.nombre, c.anterior, c.nuevo) for c in simulado.cambios],
+            [("Ruana", Decimal("6800.00"), Decimal("7250.00")), ("Gorro", Decimal("2200.00"), Decimal("2500.00"))],
+        )
+        self.ruana.refresh_from_db()
+        self.assertEqual(self.ruana.price, Decimal("6800.00"))
+
+        with CaptureQueriesContext(connection) as ctx:
+            aplicado = precios.recalcular(Product.objects.filter(seller=self.seller), aplicar=True)
+        self.assertEqual(len(aplicado.cambios), 2)
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "productos_product"')]
+        self.assertEqual(len(updates), 2)
+        precios_guardados = dict(Product.objects.values_list("name", "price"))
+        self.assertEqual(precios_guardados, {"Ruana": Decimal("7250.00"), "Gorro": Decimal("2500.00"), "Bolso": Decimal("777.00")})
+        self.assertEqual(estadisticas_de(self.seller).valor_inventario, Decimal("7250.00") * 2 + Decimal("2500.00") + 777)
+        self.assertEqual(precios.recalcular().cambios, [])
+
+    def test_comando_escribe_reporte_de_diferencias(self):
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, "diferencias.csv")
+            salida = StringIO()
+            call_command("recalcular_precios", reporte=ruta, stdout=salida)
+            with open(ruta, encoding="utf-8") as archivo:
+                lineas = archivo.read().splitlines()
+        self.assertIn("2 productos revisados, 2 cambiarían", salida.getvalue())
+        self.assertEqual(lineas[0], "producto_id,nombre,vendedor_id,material,anterior,nuevo,diferencia")
+        self.assertEqual(lineas[1], f"{self.ruana.pk},Ruana,{self.seller.pk},lana,0.00,6800.00,6800.00")
+        self.assertEqual(Product.objects.get(pk=self.ruana.pk).price, 0)
+
+
+class ProductApiTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username="vendedora", password="12345")
+        for i in range(7):
+            Product.objects.create(
+                seller=self.seller, name=f"Ruana {i}", description="Lana de oveja", material="lana" if i % 2 else "cuero",
+                color="Gris", price=1000 * (i + 1), stock=1,
+            )
+        Product.objects.create(seller=self.seller, name="Ruana agotada", material="lana", price=10, stock=0)
+
+    def get(self, **params):
+        return self.client.get(reverse("api_products"), params)
+
+    def test_recorre_todo_por_cursor_sin_repetir(self):
+        nombres, params = [], {"page_size": 3}
+        while True:
+            datos = self.get(**params).json()
+            nombres += [p["name"] for p in datos["results"]]
+            if not datos["next"]:
+                break
+            self.assertIn("page_size=3", datos["next"])
+            params = {"page_size": 3, "cursor": datos["next"].split("cursor=")[1]}
+        self.assertEqual(nombres, [f"Ruana {i}" for i in range(6, -1, -1)])
+        self.assertIsNotNone(datos["previous"])
+
+    def test_filtros_orden_y_campos(self):
+        datos = self.get(material="lana", price_min="2000", ordering="price", fields="id,name,price").json()
+        self.assertEqual([p["name"] for p in datos["results"]], ["Ruana 1", "Ruana 3", "Ruana 5"])
+        self.assertEqual(set(datos["results"][0]), {"id", "name", "price"})
+        self.assertEqual([p["name"] for p in self.get(q="ruana 4", fields="name").json()["results"]], ["Ruana 4"])
+
+    def test_no_publica_columnas_internas(self):
+        producto = self.get().json()["results"][0]
+        self.assertEqual(set(producto), {
+            "id", "name", "description", "category", "material", "color",
+            "price", "stock", "is_active", "created_at", "seller", "imagen", "link",
+        })
+        self.assertIsNone(producto["imagen"])
+        self.assertEqual(self.get(fields="horas").status_code, 400)
+
+    def test_solo_lee_las_columnas_pedidas(self):
+        with CaptureQueriesContext(connection) as ctx:
+            datos = self.get(fields="name,link", page_size=50).json()
+        self.assertEqual(len(datos["results"]), 7)
+        self.assertTrue(datos["results"][0]["link"].endswith("/"))
+        consultas = [q["sql"] for q in ctx.captured_queries if "productos_product" in q["sql"]]
+        self.assertEqual(len(consultas), 1)
+        self.assertNotIn("description", consultas[0])
+
+    def test_parametros_invalidos(self):
+        for params in (
+            {"fields": "name,clave"}, {"ordering": "stock"}, {"price_min": "barato"}, {"cursor": "x"},
+            {"price_min": "NaN"}, {"price_max": "Infinity"}, {"price_min": "-inf"},
+        ):
+            self.assertEqual(self.get(**params).status_code, 400, params)
+
+
+class ExportacionTest(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create_user(username="vendedora", password="12345")
+        for i in range(3):
+            Product.objects.create(
+                seller=self.seller, name=f"Ruana {i}", price="90000.50", stock=2,
+                description='Lana, "natural"\ny teñida', material="Lana",
+            )
+
+    def descargar(self, formato):
+        response = self.client.get(reverse("export_products") + f"?formato={formato}")
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_csv_y_json_en_streaming(self):
+        import csv
+        import io
+        import json
+        filas = list(csv.DictReader(io.StringIO(self.descargar("csv"))))
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[0]["description"], 'Lana, "natural"\ny teñida')
+        self.assertEqual(filas[0]["seller_username"], "vendedora")
+
+        datos = json.loads(self.descargar("json"))
+        self.assertEqual([d["name"] for d in datos], ["Ruana 0", "Ruana 1", "Ruana 2"])
+        self.assertEqual(datos[0]["price"], "90000.50")
+
+    def test_ndjson_una_fila_por_linea(self):
+        import json
+        lineas = self.descargar("ndjson").splitlines()
+        self.assertEqual([json.loads(l)["name"] for l in lineas], ["Ruana 0", "Ruana 1", "Ruana 2"])
+
+    def test_json_igual_al_de_json_dumps(self):
+        import json
+        from productos.services.reporting import JsonReportGenerator
+        filas = [{"a": 1, "b": "ñ"}, {"a": 2, "b": None}]
+        self.assertEqual(
+            JsonReportGenerator().generate(filas).decode("utf-8"),
+            json.dumps(filas, ensure_ascii=False, indent=2),
+        )
+        self.assertEqual(JsonReportGenerator().generate([]), b"[]")
+
+    def test_excel_en_streaming_con_celdas_tipadas(self):
+        import io
+        import zipfile
+        response = self.client.get(reverse("export_products") + "?formato=excel")
+        self.assertTrue(response.streaming)
+        libro = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertIsNone(libro.testzip())
+        hoja = libro.read("xl/worksheets/sheet1.xml").decode("utf-8")
+        self.assertEqual(hoja.count("<row "), 4)
+        self.assertIn('<c r="B2"><v>90000.50</v></c>', hoja)
+        self.assertIn('<c r="G2"><v>2</v></c>', hoja)
+        self.assertRegex(hoja, r'<c r="H2" s="1"><v>4\d{4}\.\d+</v></c>')
+        self.assertIn('<t xml:space="preserve">Lana, "natural"\ny teñida</t>', hoja)
+
+    def test_excel_entrega_pedazos_sin_armar_el_libro(self):
+        from productos.services.reporting_excel import ExcelReportGenerator
+        filas = ({"name": f"Ruana {i}", "price": i, "description": f"{i} " * 20} for i in range(20000))
+        pedazos = list(ExcelReportGenerator().stream(filas))
+        self.assertGreater(len(pedazos), 2)
+        self.assertLess(max(len(p) for p in pedazos), 256 * 1024)
+
+
+class AgregadosTest(TestCase):
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        ana = User.objects.create_user(username="ana", password="12345")
+        beto = User.objects.create_user(username="beto", password="12345")
+        Product.objects.create(seller=ana, name="Ruana", price="100.00", stock=3, category="Ropa", material="Lana")
+        Product.objects.create(seller=ana, name="Gorro", price="20.50", stock=10, category="Ropa", material="Lana")
+        viejo = Product.objects.create(seller=beto, name="Jarrón", price="50.00", stock=0, material="Barro")
+        Product.objects.filter(pk=viejo.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+    def test_por_vendedor_en_una_consulta(self):
+        from decimal import Decimal
+        from productos.services.agregados import filas_agregadas
+        # Marcado activo sin stock (p. ej. con un UPDATE directo): no cuenta como activo
+        Product.objects.filter(name="Jarrón").update(is_active=True)
+        with self.assertNumQueries(1):
+            filas = list(filas_agregadas("vendedor"))
+        self.assertEqual([f["grupo"] for f in filas], ["ana", "beto"])
+        ana, beto = filas
+        self.assertEqual((ana["productos"], ana["activos"], ana["unidades"]), (2, 2, 13))
+        self.assertEqual(ana["valor_inventario"], Decimal("505.00"))
+        self.assertIsInstance(ana["precio_promedio"], Decimal)
+        self.assertEqual(str(ana["precio_promedio"]), "60.25")
+        self.assertEqual((ana["stock_bajo"], ana["nuevos_7_dias"]), (1, 2))
+        self.assertEqual((beto["activos"], beto["stock_bajo"], beto["nuevos_7_dias"]), (0, 1, 0))
+
+    def test_montos_al_centavo(self):
+        from decimal import Decimal
+        from productos.services.agregados import filas_agregadas
+        carla = User.objects.create_user(username="carla", password="12345")
+        Product.objects.create(seller=carla, name="Botón", price="0.10", stock=3, material="Madera")
+        Product.objects.create(seller=carla, name="Aguja", price="0.25", stock=1, material="Madera")
+        fila = next(f for f in filas_agregadas("material") if f["grupo"] == "Madera")
+        self.assertEqual((str(fila["valor_inventario"]), str(fila["precio_promedio"])), ("0.55", "0.18"))
+        self.assertIsInstance(fila["valor_inventario"], Decimal)
+
+    def test_por_categoria_desde_la_exportacion(self):
+        import csv
+        import io
+        response = self.client.get(reverse("export_products") + "?agrupar=categoria&formato=csv")
+        self.assertIn("productos_por_categoria.csv", response["Content-Disposition"])
+        filas = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode("utf-8"))))
+        self.assertEqual([(f["grupo"], f["productos"]) for f in filas], [("Ropa", "2"), ("(sin valor)", "1")])
+
+        response = self.client.get(reverse("export_products") + "?agrupar=material&formato=pdf&material=Lana")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+
+class ReportesTest(TestCase):
+
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        cache.clear()
+        self.dir = tempfile.TemporaryDirectory()
+        self.override = override_settings(REPORTES_ROOT=self.dir.name, REPORT_IMPL="pdf")
+        self.override.enable()
+        self.seller = User.objects.create_user(username="vendedora", password="12345")
+        self.ruana = Product.objects.create(seller=self.seller, name="Ruana", price=90000, stock=2, material="Lana")
+        Product.objects.create(seller=self.seller, name="Gorro", price=15000, stock=2, material="Algodón")
+        self.client.login(username="vendedora", password="12345")
+
+    def tearDown(self):
+        self.override.disable()
+        self.dir.cleanup()
+
+    def test_pdf_se_encola_y_luego_se_sirve_desde_disco(self):
+        from productos.services.reportes import procesar_pendientes
+        response = self.client.get(reverse("export_products"))
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["id"]
+        # Pedirlo otra vez no crea otro trabajo
+        self.assertEqual(self.client.get(reverse("export_products")).json()["id"], job_id)
+        self.assertEqual(self.client.get(reverse("reporte_descargar", args=[job_id])).status_code, 409)
+
+        self.assertEqual(procesar_pendientes(), 1)
+        estado = self.client.get(reverse("reporte_estado", args=[job_id])).json()
+        self.assertEqual(estado["estado"], "listo")
+        response = self.client.get(reverse("export_products"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+        self.assertEqual(procesar_pendientes(), 0)
+
+    def test_cambiar_datos_o_filtros_genera_otro_reporte(self):
+        from productos.services.reportes import procesar_pendientes
+        primero = self.client.post(reverse("reporte_solicitar"), {"formato": "csv", "material": "Lana"}).json()
+        procesar_pendientes()
+        otra_vez = self.client.post(reverse("reporte_solicitar"), {"formato": "csv", "material": "Lana"})
+        self.assertEqual((otra_vez.status_code, otra_vez.json()["id"]), (200, primero["id"]))
+        contenido = b"".join(self.client.get(otra_vez.json()["descarga_url"]).streaming_content)
+        self.assertIn(b"Ruana", contenido)
+        self.assertNotIn(b"Gorro", contenido)
+
+        otro_filtro = self.client.post(reverse("reporte_solicitar"), {"formato": "csv"})
+        self.assertEqual(otro_filtro.status_code, 202)
+        self.ruana.price = 95000
+        self.ruana.save()
+        nuevo = self.client.post(reverse("reporte_solicitar"), {"formato": "csv", "material": "Lana"})
+        self.assertEqual(nuevo.status_code, 202)
+        self.assertNotEqual(nuevo.json()["id"], primero["id"])
+
+    def test_encolar_exige_sesion_y_tiene_limite(self):
+        from django.test import Client, override_settings
+        from productos.models import ReportJob
+        anonimo = Client()
+        self.assertEqual(anonimo.get(reverse("export_products")).status_code, 302)
+        self.assertEqual(anonimo.post(reverse("reporte_solicitar"), {"formato": "pdf"}).status_code, 302)
+        self.assertEqual(self.client.get(reverse("reporte_solicitar")).status_code, 405)
+        self.assertFalse(ReportJob.objects.exists())
+
+        job_id = self.client.post(reverse("reporte_solicitar"), {"formato": "pdf"}).json()["id"]
+        self.assertEqual(str(ReportJob.objects.get().token), job_id)
+        self.assertEqual(anonimo.get(reverse("reporte_estado", args=[job_id])).status_code, 302)
+        with override_settings(REPORTES_MAX_EN_COLA=2):
+            self.assertEqual(self.client.post(reverse("reporte_solicitar"), {"formato": "pdf", "material": "Lana"}).status_code, 202)
+            self.assertEqual(self.client.post(reverse("reporte_solicitar"), {"formato": "pdf", "color": "Gris"}).status_code, 429)
+            # Lo que ya está en cola se sigue devolviendo
+            self.assertEqual(self.client.post(reverse("reporte_solicitar"), {"formato": "pdf"}).json()["id"], job_id)
+
+    def test_trabajo_de_un_worker_caido_se_retoma(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from productos.models import ReportJob
+        from productos.services import reportes
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        job_id = self.client.post(reverse("reporte_solicitar"), {"formato": "pdf"}).json()["id"]
+        job = reportes.reclamar_trabajo()
+        self.assertEqual(str(job.token), job_id)
+        # El worker muere sin terminar: nadie más lo toma hasta que vence
+        self.assertIsNone(reportes.reclamar_trabajo())
+        ReportJob.objects.filter(pk=job.pk).update(actualizado=hace_una_hora)
+        self.assertEqual((reportes.reclamar_trabajo().pk, ReportJob.objects.get(pk=job.pk).intentos), (job.pk, 2))
+
+        # Sin reintentos queda en error y deja de ocupar lugar en la cola
+        ReportJob.objects.filter(pk=job.pk).update(intentos=reportes.MAX_INTENTOS, actualizado=hace_una_hora)
+        nuevo = self.client.post(reverse("reporte_solicitar"), {"formato": "pdf"}).json()["id"]
+        self.assertNotEqual(nuevo, job_id)
+        self.assertEqual(reportes.reclamar_trabajo().estado, "procesando")
+        self.assertEqual(ReportJob.objects.get(pk=job.pk).estado, "error")
+
+    def test_la_version_del_catalogo_sobrevive_a_la_cache(self):
+        from productos.services.catalogo import version_catalogo
+        antes = version_catalogo()
+        cache.clear()
+        self.assertEqual(version_catalogo(), antes)
+        self.ruana.save()
+        self.assertGreater(version_catalogo(), antes)
+
+    def test_pdf_en_paralelo_igual_al_secuencial(self):
+        import base64
+        import zlib
+        from productos.services.reporting_pdf import PDFReportGenerator
+        filas = [{"name": f"Ruana {i}", "price": i, "description": "lana tejida " * (i % 9)} for i in range(300)]
+        secuencial = PDFReportGenerator(invariant=True).generate(filas)
+        paralelo = PDFReportGenerator(workers=2, invariant=True)
+        paralelo.min_filas_paralelo = 10
+        self.assertEqual(paralelo.generate(filas), secuencial)
+
+        paginas = secuencial.count(b"/Type /Page\n")
+        self.assertGreater(paginas, 1)
+        streams = re.findall(rb"stream\r?\n(.*?)~>endstream", secuencial, re.S)
+        texto = b"".join(zlib.decompress(base64.a85decode(s, adobe=False)) for s in streams)
+        self.assertIn(f"(P\\341gina {paginas} de {paginas})".encode("latin-1"), texto)
@@ -21,6 +21,7 @@ urlpatterns = [
     path("producto/crear/", views.create_product, name="create_product"),
     path("", email_login_view, name="login"),  # Cambiado de landing_page a email_login_view
     path("home/", home, name="home"),
+    path("home/metricas-cache/", views.grid_cache_metrics, name="grid_cache_metrics"),
     path("register/", register_view, name="register"),
     path("login/", email_login_view, name="login"),
     path("logout/", CustomLogoutView.as_view(), name="logout"),
@@ -35,7 +36,16 @@ urlpatterns = [
     path("carrito/quitar/<int:pk>/", views.quitar_del_carrito, name="quitar_del_carrito"),
     path("carrito/limpiar/", views.limpiar_carrito, name="limpiar_carrito"),
     path("carrito/comprar/", views.comprar_carrito, name="comprar_carrito"),
+    path("carrito/fragmento/", views.carrito_fragmento, name="carrito_fragmento"),
+    path("carrito/api/agregar/<int:pk>/", views.carrito_api_agregar, name="carrito_api_agregar"),
+    path("carrito/api/quitar/<int:pk>/", views.carrito_api_quitar, name="carrito_api_quitar"),
+    path("carrito/api/fijar/<int:pk>/", views.carrito_api_fijar, name="carrito_api_fijar"),
+    path("carrito/api/lote/", views.carrito_api_lote, name="carrito_api_lote"),
+    path("carrito/api/limpiar/", views.carrito_api_limpiar, name="carrito_api_limpiar"),
     path("favoritos/toggle/<int:producto_id>/", toggle_favorite, name="toggle_favorite"),
     path("favoritos/", views.favoritos, name="favoritos"),
     path('export/', views.export_products_report, name='export_products'),
+    path('export/trabajos/', views.reporte_solicitar, name='reporte_solicitar'),
+    path('export/trabajos/<uuid:token>/', views.reporte_estado, name='reporte_estado'),
+    path('export/trabajos/<uuid:token>/descargar/', views.reporte_descargar, name='reporte_descargar'),
 ]
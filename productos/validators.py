@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from PIL import Image
+
+# 50 MP: alcanza para fotos de celular de 48 MP
+MAX_PIXELES = 50_000_000
+
+
+def max_pixeles():
+    return getattr(settings, "IMAGEN_MAX_PIXELES", MAX_PIXELES)
+
+
+def validar_pixeles(archivo):
+    """Rechaza imágenes nuevas con más píxeles que `IMAGEN_MAX_PIXELES`.
+
+    Solo lee la cabecera, así que no decodifica el bitmap.
+    """
+    if not archivo or getattr(archivo, "_committed", False):
+        return
+    limite = max_pixeles()
+    try:
+        archivo.seek(0)
+        with Image.open(archivo) as img:
+            ancho, alto = img.size
+    except Image.DecompressionBombError:
+        ancho, alto = limite + 1, 1
+    except Exception:
+        return  # el ImageField ya informa las imágenes inválidas
+    finally:
+        archivo.seek(0)
+    if ancho * alto > limite:
+        raise ValidationError(
+            "La imagen es demasiado grande (%(ancho)s×%(alto)s). Máximo %(mp)s megapíxeles.",
+            code="imagen_muy_grande",
+            params={"ancho": ancho, "alto": alto, "mp": limite // 1_000_000},
+        )
@@ -1,20 +1,33 @@
 # ────────── IMPORTS ──────────
+import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.db.models import Q
 from django.contrib.auth import login
-from django.contrib.auth.views import LogoutView
+from django.contrib.auth.views import LogoutView, redirect_to_login
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.core.paginator import Paginator
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_POST
 from urllib.parse import quote
 
 from .product_form import ProductForm
-from .models import Product, Profile, SellerProfile, Store
+from .models import EstadoReporte, Product, Profile, ReportJob, SellerProfile, Store
 from .forms import RegisterForm, UserUpdateForm, ProfileUpdateForm
 from .seller_forms import SellerProfileForm, StoreForm
 from .email_login_form import EmailLoginForm
+from .services import agregados, inventario, reportes
+from .services.carrito import Carrito
+from .services.catalogo import filtrar_catalogo, filtros_desde_query, productos_catalogo
+from .services.exportacion import filas_productos, respuesta_reporte
+from .services.facets import facetas_para, valores_de
+from .services.favoritos import cantidad as cantidad_favoritos
+from .services.favoritos import ids_favoritos
+from .services.favoritos import marcar as marcar_favorito
+from .services.grid_cache import metricas as metricas_grid
+from .services.grid_cache import obtener_grid
+from .services.paginacion import CursorInvalido, KeysetPaginator
 from django.conf import settings
 from django.http import HttpResponse
 from django.shortcuts import redirect
@@ -22,6 +35,8 @@ from django.contrib import messages
 
 from .models import Product
 
+from decimal import Decimal, InvalidOperation
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from .serializers import ProductSerializer
@@ -35,10 +50,84 @@ from .forms import ExternalAPIForm
 
 
 class ProductListAPIView(APIView):
+    """Productos activos, filtrados como en `home` y paginados por cursor.
+
+    Parámetros: los filtros de `home` (q, material, color, price_min,
+    price_max), `ordering` (uno de `ordenes`; por defecto los más recientes,
+    o por relevancia si hay `q`), `fields` (campos separados por coma),
+    `page_size` y `cursor`. Solo se leen de la base las columnas pedidas.
+    """
+    page_size = 50
+    max_page_size = 200
+    ordenes = ("-created_at", "created_at", "price", "-price", "name", "-name")
+
     def get(self, request):
-        products = Product.objects.filter(is_active=True)
-        serializer = ProductSerializer(products, many=True, context={'request': request})
-        return Response(serializer.data)
+        params = request.query_params
+        campos = self._campos(params.get("fields", ""))
+        filtros = filtros_desde_query(params)
+        for nombre in ("price_min", "price_max"):
+            if filtros[nombre]:
+                try:
+                    finito = Decimal(filtros[nombre]).is_finite()
+                except InvalidOperation:
+                    finito = False
+                # NaN e Infinity son Decimal válidos, pero no se pueden comparar en la base
+                if not finito:
+                    raise ValidationError({nombre: "Debe ser un número."})
+
+        productos = filtrar_catalogo(productos_catalogo(), filtros)
+        orden = params.get("ordering")
+        if orden:
+            if orden not in self.ordenes:
+                raise ValidationError({"ordering": f"Valores permitidos: {', '.join(self.ordenes)}."})
+            productos = productos.order_by(orden)
+        if campos is not None:
+            # Lo pedido, más las columnas de orden que van en el cursor
+            columnas = {"id"} | {c.lstrip("-") for c in productos.query.order_by}
+            columnas |= {c for c in campos if c != "link"}
+            modelo = {f.name for f in Product._meta.concrete_fields}
+            productos = productos.only(*(columnas & modelo))
+
+        paginator = KeysetPaginator(productos, self._tamano(params.get("page_size")))
+        cursor = params.get("cursor")
+        if cursor:
+            try:
+                paginator.decodificar(cursor)
+            except CursorInvalido:
+                raise ValidationError({"cursor": "Cursor inválido."})
+        page = paginator.get_page(cursor)
+        serializer = ProductSerializer(page.object_list, many=True, fields=campos, context={'request': request})
+        return Response({
+            "results": serializer.data,
+            "next": self._url(request, page.next_cursor),
+            "previous": self._url(request, page.previous_cursor),
+        })
+
+    def _campos(self, valor):
+        if not valor.strip():
+            return None
+        campos = [c.strip() for c in valor.split(",") if c.strip()]
+        disponibles = ProductSerializer().fields
+        desconocidos = [c for c in campos if c not in disponibles]
+        if desconocidos:
+            raise ValidationError({"fields": f"Campos desconocidos: {', '.join(desconocidos)}. Disponibles: {', '.join(disponibles)}."})
+        return campos
+
+    def _tamano(self, valor):
+        if not valor:
+            return self.page_size
+        try:
+            tamano = int(valor)
+        except ValueError:
+            raise ValidationError({"page_size": "Debe ser un entero."})
+        return max(1, min(tamano, self.max_page_size))
+
+    def _url(self, request, cursor):
+        if not cursor:
+            return None
+        params = request.query_params.copy()
+        params["cursor"] = cursor
+        return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
 
 class ExternalAPIFormView(FormView):
     template_name = "external_api/external_api.html"
@@ -90,99 +179,94 @@ def create_product(request):
         form = ProductForm()
     return render(request, 'productos/create_product.html', {'form': form})
 
-from django.utils.translation import gettext as _
+from datetime import timedelta
+from django.utils import timezone
+from django.utils.translation import gettext as _, get_language
+from django.template.loader import render_to_string
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 
 # ────────── VISTAS HOME ──────────
+# Los favoritos y el carrito se cambian por AJAX con el token de la cookie
+@ensure_csrf_cookie
 def home(request):
     """
     Vista principal que muestra barra de búsqueda,
     filtros y productos disponibles.
     """
-    query = request.GET.get("q", "")
-    material = request.GET.get("material", "")
-    color = request.GET.get("color", "")
-    price_min = request.GET.get("price_min", "")
-    price_max = request.GET.get("price_max", "")
-
-    productos = Product.objects.select_related('seller__sellerprofile').all()
-
-    if query:
-        productos = productos.filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query)
-        )
-
-    if material:
-        productos = productos.filter(material=material)
-
-    if color:
-        productos = productos.filter(color=color)
-
-    if price_min:
-        productos = productos.filter(price__gte=price_min)
-
-    if price_max:
-        productos = productos.filter(price__lte=price_max)
-
-    # Paginación
-    paginator = Paginator(productos, 20)  # 20 productos por página
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    filtros = filtros_desde_query(request.GET)
+    productos = filtrar_catalogo(
+        productos_catalogo().select_related('seller__sellerprofile'),
+        filtros,
+    )
+    # Paginación por cursor: sin OFFSET y con total aproximado (tope 1000)
+    paginator = KeysetPaginator(productos, 20, total_limite=1000)
+    # Cursores equivalentes (o inválidos) comparten la misma entrada de caché
+    cursor = paginator.normalizar(request.GET.get('cursor'))
+
+    def render_grid():
+        page_obj = paginator.get_page(cursor)
+        html = render_to_string("productos/product_grid.html", {
+            "page_obj": page_obj,
+            "productos": page_obj,
+            "current_filters": filtros,
+            # Para badges de productos nuevos
+            "seven_days_ago": timezone.now() - timedelta(days=7),
+        })
+        return {"html": html, "ids": [p.pk for p in page_obj]}
 
-    materiales = Product.objects.values_list("material", flat=True).distinct()
-    colores = Product.objects.values_list("color", flat=True).distinct()
+    # La grilla no depende del usuario: se cachea por filtros + cursor + idioma
+    grilla, grid_hit, grid_ms = obtener_grid(filtros, cursor, get_language(), render_grid)
 
-    # Para badges de productos nuevos
-    from datetime import timedelta
-    from django.utils import timezone
-    seven_days_ago = timezone.now() - timedelta(days=7)
+    # Opciones de filtros con conteos (desde la caché de facetas)
+    facetas = facetas_para(filtros)
 
     context = {
-        "page_obj": page_obj,
-        "productos": page_obj,
-        "current_filters": {
-            "q": query,
-            "material": material,
-            "color": color,
-            "precio_min": price_min,
-            "precio_max": price_max,
-        },
-        "materiales": materiales,
-        "colores": colores,
-        "seven_days_ago": seven_days_ago,
+        "grid_html": grilla["html"],
+        "current_filters": filtros,
+        "materiales": valores_de(facetas, "material"),
+        "colores": valores_de(facetas, "color"),
+        # Solo los de esta página, en una consulta
+        "favoritos_ids": sorted(ids_favoritos(request, grilla["ids"])),
     }
-    return render(request, "productos/home.html", context)
+    response = render(request, "productos/home.html", context)
+    response["Server-Timing"] = f'grid;desc="{"hit" if grid_hit else "miss"}";dur={grid_ms:.1f}'
+    return response
+
+
+@staff_member_required
+def grid_cache_metrics(request):
+    """Métricas de la caché de la grilla de `home` (solo staff)."""
+    return JsonResponse(metricas_grid())
 
 
 # ────────── FAVORITOS ──────────
-@csrf_exempt
 def toggle_favorite(request, producto_id):
-    """Toggle favorito para un producto usando AJAX y sesión."""
-    if request.method == "POST":
-        favoritos = request.session.get("favoritos", [])
-        if not isinstance(favoritos, list):
-            favoritos = []
-        
-        producto_id_str = str(producto_id)
-        if producto_id_str in favoritos:
-            favoritos.remove(producto_id_str)
-            favorito = False
-        else:
-            favoritos.append(producto_id_str)
-            favorito = True
-        
-        request.session["favoritos"] = favoritos
-        request.session.modified = True
-        return JsonResponse({"favorito": favorito})
-    return JsonResponse({"error": "Método no permitido"}, status=405)
+    """Marca o desmarca un favorito por AJAX.
+
+    Sin cuerpo alterna; con {"favorito": true/false} fija ese estado, así
+    un reintento no deshace el primer intento.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+    try:
+        cuerpo = _cuerpo_json(request) if request.content_type == "application/json" else {}
+        deseado = cuerpo.get("favorito")
+    except ValueError:
+        return JsonResponse({"error": "JSON inválido"}, status=400)
+    if deseado is not None and not isinstance(deseado, bool):
+        return JsonResponse({"error": "favorito debe ser true o false"}, status=400)
+    try:
+        favorito = marcar_favorito(request, producto_id, deseado)
+    except Product.DoesNotExist:
+        return JsonResponse({"error": "Producto no encontrado"}, status=404)
+    return JsonResponse({"favorito": favorito, "cantidad": cantidad_favoritos(request)})
 
 
 @login_required
 def favoritos(request):
     """Vista para mostrar productos favoritos del usuario."""
-    favoritos_ids = request.session.get("favoritos", [])
-    productos = Product.objects.filter(id__in=favoritos_ids)
+    productos = Product.objects.filter(favoritos__user=request.user).order_by("-favoritos__creado")
     return render(request, "productos/favoritos.html", {"productos": productos})
 
 
@@ -302,98 +386,161 @@ def product_detail(request, pk):
 
 
 # ────────── VISTAS CARRITO ──────────
-def ver_carrito(request):
-    """Ver el carrito de compras."""
-    carrito = request.session.get("carrito", {})
+def _avisar_problemas_carrito(request, resumen):
+    for linea in resumen.problemas:
+        if linea.problema == "no_disponible":
+            messages.warning(request, _("%(producto)s ya no está disponible.") % {"producto": linea.nombre})
+        else:
+            messages.warning(request, _("Solo quedan %(stock)s unidades de %(producto)s.") % {
+                "stock": linea.cantidad, "producto": linea.nombre,
+            })
 
-    if not isinstance(carrito, dict):
-        carrito = {}
-        request.session["carrito"] = carrito
-        request.session.modified = True
 
-    total = sum(item["precio"] * item["cantidad"] for item in carrito.values())
+def ver_carrito(request):
+    """Ver el carrito de compras."""
+    resumen = Carrito(request).revalidar(ajustar=True)
+    _avisar_problemas_carrito(request, resumen)
 
     return render(request, "carrito/ver_carrito.html", {
-        "carrito": carrito,
-        "total": total,
+        "carrito": resumen,
+        "total": resumen.total,
     })
 
 
+def _es_ajax(request):
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+
+def _agregar_json(carrito, pk, cantidad=1):
+    """Agrega y responde el delta; si el producto no se puede comprar lo deshace."""
+    carrito.agregar(pk, cantidad)
+    resumen = carrito.revalidar()
+    linea = next((l for l in resumen.lineas if l.producto_id == pk), None)
+    if linea is None:
+        carrito.eliminar(pk)
+        return JsonResponse({"ok": False, "success": False, "message": "El producto no está disponible."}, status=404)
+    datos = carrito.delta(resumen, [pk])
+    datos.update(success=True, message=f"Se agregó {linea.nombre} al carrito")
+    return JsonResponse(datos)
+
+
 def agregar_al_carrito(request, pk):
     """Agregar producto al carrito."""
-    carrito = request.session.get("carrito", {})
-
-    if not isinstance(carrito, dict):
-        carrito = {}
+    carrito = Carrito(request)
 
-    producto = get_object_or_404(Product, pk=pk)
-    producto_id = str(producto.pk)
+    # Si es una petición AJAX, devolver solo lo que cambió
+    if _es_ajax(request):
+        return _agregar_json(carrito, pk)
 
-    if producto_id in carrito:
-        carrito[producto_id]["cantidad"] += 1
-    else:
-        carrito[producto_id] = {
-            "nombre": producto.name,
-            "precio": float(producto.price),
-            "cantidad": 1,
-        }
-
-    request.session["carrito"] = carrito
-    request.session.modified = True
-
-    # Si es una petición AJAX, devolver JSON con HTML del carrito
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        from django.template.loader import render_to_string
-        total_items = sum(item["cantidad"] for item in carrito.values())
-        total = sum(item["precio"] * item["cantidad"] for item in carrito.values())
-        
-        # Renderizar el HTML del carrito
-        cart_html = render_to_string('carrito/cart_items.html', {
-            'carrito': carrito,
-            'total': total
-        }, request=request)
-        
-        return JsonResponse({
-            "success": True,
-            "message": f"Se agregó {producto.name} al carrito",
-            "total_items": total_items,
-            "cart_html": cart_html
-        })
-    
-    messages.success(request, _("Se agregó %(producto)s al carrito.") % {"producto": producto.name})
+    carrito.agregar(pk)
+    messages.success(request, _("Producto agregado al carrito."))
     return redirect("ver_carrito")
 
 
 def quitar_del_carrito(request, pk):
     """Quitar producto del carrito."""
-    carrito = request.session.get("carrito", {})
-
-    if not isinstance(carrito, dict):
-        carrito = {}
-
-    producto_id = str(pk)
+    carrito = Carrito(request)
+    presente = pk in carrito.items()
+    if presente:
+        carrito.quitar(pk)
 
-    if producto_id in carrito:
-        if carrito[producto_id]["cantidad"] > 1:
-            carrito[producto_id]["cantidad"] -= 1
-        else:
-            del carrito[producto_id]
+    if _es_ajax(request):
+        return JsonResponse(carrito.delta(carrito.revalidar(), [pk]))
 
-        request.session["carrito"] = carrito
-        request.session.modified = True
+    if presente:
         messages.warning(request, _("Producto eliminado del carrito."))
-
     return redirect("ver_carrito")
 
 
 def limpiar_carrito(request):
     """Limpiar todo el carrito."""
-    request.session["carrito"] = {}
-    request.session.modified = True
+    carrito = Carrito(request)
+    ids = list(carrito.items())
+    carrito.vaciar()
+    if _es_ajax(request):
+        return JsonResponse(carrito.delta(carrito.revalidar(), ids))
     messages.warning(request, _("El carrito fue vaciado."))
     return redirect("ver_carrito")
 
 
+# ────────── API CARRITO (AJAX) ──────────
+MAX_ITEMS_LOTE = 100
+
+
+def _cuerpo_json(request):
+    if not request.body:
+        return {}
+    datos = json.loads(request.body)
+    if not isinstance(datos, dict):
+        raise ValueError("se esperaba un objeto JSON")
+    return datos
+
+
+def _error_json(mensaje, status=400):
+    return JsonResponse({"ok": False, "error": mensaje}, status=status)
+
+
+@require_POST
+def carrito_api_agregar(request, pk):
+    try:
+        cantidad = int(_cuerpo_json(request).get("cantidad", 1))
+    except (TypeError, ValueError):
+        return _error_json("Cantidad inválida.")
+    if cantidad < 1:
+        return _error_json("Cantidad inválida.")
+    return _agregar_json(Carrito(request), pk, cantidad)
+
+
+@require_POST
+def carrito_api_quitar(request, pk):
+    try:
+        cantidad = int(_cuerpo_json(request).get("cantidad", 1))
+    except (TypeError, ValueError):
+        return _error_json("Cantidad inválida.")
+    carrito = Carrito(request)
+    carrito.quitar(pk, max(cantidad, 1))
+    return JsonResponse(carrito.delta(carrito.revalidar(), [pk]))
+
+
+@require_POST
+def carrito_api_fijar(request, pk):
+    try:
+        cantidad = int(_cuerpo_json(request)["cantidad"])
+    except (KeyError, TypeError, ValueError):
+        return _error_json("Cantidad inválida.")
+    carrito = Carrito(request)
+    carrito.fijar(pk, max(cantidad, 0))
+    return JsonResponse(carrito.delta(carrito.revalidar(), [pk]))
+
+
+@require_POST
+def carrito_api_lote(request):
+    """Fija varias cantidades a la vez: {"items": {"<producto_id>": cantidad, ...}}."""
+    try:
+        items = _cuerpo_json(request).get("items")
+        if not isinstance(items, dict) or len(items) > MAX_ITEMS_LOTE:
+            raise ValueError
+        cantidades = {int(pid): max(int(n), 0) for pid, n in items.items()}
+    except (TypeError, ValueError):
+        return _error_json("Formato inválido.")
+    carrito = Carrito(request)
+    carrito.fijar_varios(cantidades)
+    return JsonResponse(carrito.delta(carrito.revalidar(), list(cantidades)))
+
+
+@require_POST
+def carrito_api_limpiar(request):
+    carrito = Carrito(request)
+    ids = list(carrito.items())
+    carrito.vaciar()
+    return JsonResponse(carrito.delta(carrito.revalidar(), ids))
+
+
+def carrito_fragmento(request):
+    """HTML del carrito desplegable (cacheado por versión)."""
+    return HttpResponse(Carrito(request).fragmento(request))
+
+
 
 
 # ────────── VISTAS VENDEDOR / TIENDA ──────────
@@ -474,54 +621,108 @@ def edit_seller_and_store(request):
 
 
 def export_products_report(request):
-    """Exporta un reporte de productos como archivo (CSV o JSON según configuración).
+    """Exporta un reporte de productos como archivo (CSV, JSON, NDJSON... según configuración).
+
+    Usa la fábrica `get_report_generator()` en `productos/factories.py`; el
+    formato se puede pedir con `?formato=` y el catálogo filtrar con los
+    mismos parámetros de `home`. Si el reporte ya está generado para estos
+    datos se sirve desde disco; si no, los formatos de streaming se envían
+    al momento y los demás (PDF) se encolan (con sesión iniciada) y se
+    responde 202 con el trabajo a consultar.
 
-    Usa la fábrica `get_report_generator()` en `productos/factories.py`.
+    Con `?agrupar=vendedor|categoria|material` devuelve el reporte agregado
+    (una fila por grupo, calculado en la base), en cualquier formato.
     """
-    from .factories import get_report_generator
-    # usamos el modelo `Product` ya importado en este módulo
-    # Obtener más detalles de producto. Mapear seller__username -> seller_username
-    raw_rows = Product.objects.values(
-        "name",
-        "price",
-        "description",
-        "category",
-        "material",
-        "color",
-        "stock",
-        "created_at",
-        "seller__username",
+    from .factories import formato_reporte, get_report_generator
+    formato = formato_reporte(request.GET.get("formato"))
+    filtros = reportes.filtros_reporte(request.GET)
+    agrupacion = request.GET.get("agrupar")
+    if agrupacion in agregados.AGRUPACIONES:
+        generator = get_report_generator(
+            formato, columns=agregados.COLUMNAS_AGREGADO, title=f"Productos por {agrupacion}",
+        )
+        filas = agregados.filas_agregadas(agrupacion, reportes.productos_filtrados(filtros))
+        return respuesta_reporte(generator, filas, agregados.nombre_archivo(agrupacion, generator))
+    listo = reportes.reporte_listo(reportes.clave_reporte(formato, filtros))
+    if listo is not None:
+        return _descargar_reporte(listo)
+    generator = get_report_generator(formato)
+    if generator.streaming:
+        return respuesta_reporte(generator, reportes.filas_reporte(filtros))
+    # Encolar un trabajo cuesta CPU del worker: solo para usuarios con sesión
+    if not request.user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    return _pedir_reporte(request, formato, filtros)
+
+
+# ────────── REPORTES EN SEGUNDO PLANO ──────────
+def _estado_reporte(request, job, status=200):
+    datos = {
+        "id": str(job.token),
+        "formato": job.formato,
+        "estado": job.estado,
+        "estado_url": request.build_absolute_uri(reverse("reporte_estado", args=[job.token])),
+    }
+    if job.estado == EstadoReporte.LISTO:
+        datos["descarga_url"] = request.build_absolute_uri(reverse("reporte_descargar", args=[job.token]))
+    if job.estado == EstadoReporte.ERROR:
+        datos["error"] = job.error
+    return JsonResponse(datos, status=status)
+
+
+def _descargar_reporte(job):
+    return FileResponse(
+        open(reportes.ruta_archivo(job), "rb"),
+        as_attachment=True,
+        filename=reportes.nombre_descarga(job),
     )
 
-    rows = []
-    for r in raw_rows:
-        rows.append({
-            "name": r.get("name"),
-            "price": r.get("price"),
-            "description": r.get("description", ""),
-            "category": r.get("category", ""),
-            "material": r.get("material", ""),
-            "color": r.get("color", ""),
-            "stock": r.get("stock", 0),
-            # convertir created_at a ISO string para evitar problemas de serialización
-            "created_at": (r.get("created_at").isoformat() if r.get("created_at") else ""),
-            "seller_username": r.get("seller__username", ""),
-        })
 
-    generator = get_report_generator()
-    file_bytes = generator.generate(rows)
+def _pedir_reporte(request, formato, filtros):
+    """200 si ya está listo para estos datos, 202 si quedó en cola, 429 si el usuario tiene demasiados en cola."""
+    try:
+        job = reportes.solicitar(formato, filtros, request.user)
+    except reportes.DemasiadosReportes:
+        return JsonResponse(
+            {"error": f"Ya tienes {reportes.max_en_cola()} reportes en cola; espera a que terminen."},
+            status=429,
+        )
+    return _estado_reporte(request, job, status=200 if job.estado == EstadoReporte.LISTO else 202)
 
-    response = HttpResponse(file_bytes, content_type='application/octet-stream')
-    response['Content-Disposition'] = f'attachment; filename="{generator.filename()}"'
-    return response
 
-def _formatear_items_carrito_para_mensaje(carrito):
+@login_required
+@require_POST
+def reporte_solicitar(request):
+    """Pide un reporte con `formato` y los filtros de `home`."""
+    from .factories import formato_reporte
+    formato = formato_reporte(request.POST.get("formato"))
+    return _pedir_reporte(request, formato, reportes.filtros_reporte(request.POST))
+
+
+@login_required
+def reporte_estado(request, token):
+    job = get_object_or_404(ReportJob, token=token)
+    return _estado_reporte(request, job)
+
+
+@login_required
+def reporte_descargar(request, token):
+    job = get_object_or_404(ReportJob, token=token)
+    if job.estado != EstadoReporte.LISTO:
+        return _estado_reporte(request, job, status=409)
+    try:
+        return _descargar_reporte(job)
+    except FileNotFoundError:
+        # Se purgó el archivo: que se vuelva a pedir
+        raise Http404("El reporte ya no está disponible.")
+
+
+def _formatear_items_carrito_para_mensaje(lineas):
     partes = []
-    for _id, item in carrito.items():
-        cantidad = item.get("cantidad", 0)
-        nombre = item.get("nombre", "").strip()
-        if nombre:
-            partes.append(f"{cantidad} {nombre}")
+    for linea in lineas:
+        nombre = linea.nombre.strip()
+        if nombre and linea.cantidad:
+            partes.append(f"{linea.cantidad} {nombre}")
     if not partes:
         return ""
     if len(partes) == 1:
@@ -529,25 +730,39 @@ def _formatear_items_carrito_para_mensaje(carrito):
     return ", ".join(partes[:-1]) + " y " + partes[-1]
 
 
+@require_POST
 def comprar_carrito(request):
-    carrito = request.session.get("carrito", {})
-    if not isinstance(carrito, dict) or not carrito:
+    """Aparta el stock del carrito y lleva al comprador a WhatsApp (cambia estado: solo POST)."""
+    carrito = Carrito(request)
+    resumen = carrito.revalidar(ajustar=True)
+    if not resumen:
         messages.warning(request, "El carrito está vacío.")
         return redirect("home")
-
-    total = sum(item.get("precio", 0) * item.get("cantidad", 0)
-                for item in carrito.values())
-    items_texto = _formatear_items_carrito_para_mensaje(carrito)
-
-    mensaje = (
-        f"Hola, deseo comprar {items_texto}. "
-        f"Total: ${total:.2f}. ¿Podrían confirmarme disponibilidad y envío? Gracias."
-    )
+    if resumen.problemas:
+        # Precio o stock cambió desde que se agregó: que lo revise antes de pedir
+        _avisar_problemas_carrito(request, resumen)
+        return redirect("ver_carrito")
 
     numero = getattr(settings, "WHATSAPP_NUMBER", "")
     if not numero:
         messages.error(request, "Número de WhatsApp no configurado.")
         return redirect("ver_carrito")
 
+    # Se aparta el stock antes de enviar al comprador a WhatsApp
+    try:
+        vence = inventario.reservar(carrito.id, {linea.producto_id: linea.cantidad for linea in resumen})
+    except inventario.StockInsuficiente:
+        messages.warning(request, "Otro comprador se llevó las últimas unidades de un producto. Revisa tu carrito.")
+        return redirect("ver_carrito")
+
+    total = resumen.total
+    items_texto = _formatear_items_carrito_para_mensaje(resumen)
+
+    mensaje = (
+        f"Hola, deseo comprar {items_texto}. "
+        f"Total: ${total:.2f}. Reservado hasta las {timezone.localtime(vence):%H:%M}. "
+        "¿Podrían confirmarme el envío? Gracias."
+    )
+
     url = f"https://wa.me/{numero}?text={quote(mensaje)}"
     return redirect(url)